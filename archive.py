@@ -0,0 +1,138 @@
+# archive.py
+"""
+Archivado de las consultas antiguas en una base SQLite aparte.
+
+Uso (desde la carpeta del proyecto):
+    python archive.py --anios 5 --simular          # cuántas consultas se archivarían
+    python archive.py --anios 5
+    python archive.py --antes-de 2020-01-01 --archivo clinica_veterinaria_archivo.db
+    python archive.py --estado
+
+Las consultas anteriores al corte pasan, en lotes, de la tabla `consultas` a la tabla
+`consultas_archivo` de la base de archivo, que se adjunta a cada conexión con ATTACH.
+La tabla principal (y sus índices y la búsqueda de texto) queda con los datos de uso
+diario, así el historial, los borrados en cascada y la caché de páginas trabajan sobre
+menos datos. Las archivadas se leen solo cuando se pide el historial completo
+(get_consultas_by_mascota_id / get_consulta_by_id con historial_completo=True), siguen
+contando en los reportes y se borran junto con su mascota. No se pueden modificar.
+
+Todos los programas que escriben en la base (main.py, Django, scripts) deben abrirla con
+el mismo archivo (DatabaseManager(archivo=...)); si no, borrar una mascota dejaría sus
+consultas archivadas huérfanas y reconstruir las estadísticas las dejaría fuera. Las
+herramientas de consola lo reciben con --archivo (main.py, bulk_import.py, bulk_export.py,
+purge.py, reportes.py y backup.py).
+"""
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+
+from database import DatabaseManager
+from log_config import setup_logging
+from models import parse_fecha_iso
+from purge import fecha_de_corte
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_POR_DEFECTO = "clinica_veterinaria_archivo.db"
+
+
+def contar(db_manager, corte):
+    """Consultas de la base principal anteriores a `corte` ('YYYY-MM-DD'), las que se archivarían."""
+    return db_manager.fetchone("SELECT COUNT(*) FROM consultas WHERE fecha < ?", (corte,))[0]
+
+
+def estado(db_manager):
+    """Consultas en la base principal y en el archivo, con la fecha más antigua y la más reciente de cada una."""
+    resultado = {}
+    for nombre, tabla in (("activas", "consultas"), ("archivadas", "consultas_archivo")):
+        total, desde, hasta = db_manager.fetchone(f"SELECT COUNT(*), MIN(fecha), MAX(fecha) FROM {tabla}")
+        resultado[nombre] = {"consultas": total, "desde": desde, "hasta": hasta}
+    return resultado
+
+
+def archivar(db_manager, corte, lote=1000, pausa=0.01, progress=None):
+    """
+    Mueve al archivo, en lotes de `lote`, las consultas anteriores a `corte` ('YYYY-MM-DD',
+    exclusiva). Devuelve un resumen con las previstas, las archivadas, los lotes y los
+    segundos. `progress(archivadas, previstas)` se llama después de cada lote.
+    """
+    if lote <= 0:
+        raise ValueError("lote debe ser mayor que cero")
+    previstas = contar(db_manager, corte)
+    resumen = {"corte": corte, "previstas": previstas, "archivadas": 0, "lotes": 0}
+    inicio = time.perf_counter()
+    while True:
+        # idx_consultas_fecha: cada lote empieza por las más antiguas que aún quedan
+        ids = [row[0] for row in db_manager.fetchall(
+            "SELECT id FROM consultas WHERE fecha < ? ORDER BY fecha LIMIT ?", (corte, lote))]
+        if not ids:
+            break
+        movidas = db_manager.archive_consultas(ids)
+        if movidas is None:
+            raise sqlite3.DatabaseError("No se pudo archivar un lote de consultas (ver el log).")
+        if not movidas:
+            break  # Todas cambiaron mientras se copiaban: quedan para el próximo archivado
+        resumen["archivadas"] += movidas
+        resumen["lotes"] += 1
+        if progress:
+            progress(resumen["archivadas"], previstas)
+        time.sleep(pausa)  # Aquí entran las escrituras que estaban esperando
+
+    resumen["segundos"] = time.perf_counter() - inicio
+    logger.info("Archivado (corte %s): %s consultas movidas al archivo.", corte, resumen["archivadas"],
+                extra={"operacion": "archivar", "filas": resumen["archivadas"],
+                       "duracion_ms": round(resumen["segundos"] * 1000, 1)})
+    return resumen
+
+
+def _fecha(valor):
+    try:
+        return parse_fecha_iso(valor).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError("Use el formato AAAA-MM-DD, por ejemplo 2020-01-01.")
+
+
+def _mostrar_progreso(archivadas, previstas):
+    print(f"  {archivadas}/{previstas} consultas archivadas", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archivado de consultas antiguas de la Clínica Veterinaria.")
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument("--anios", type=int, help="Archiva las consultas con más de estos años")
+    accion.add_argument("--antes-de", type=_fecha, help="Archiva las consultas anteriores a esta fecha (AAAA-MM-DD)")
+    accion.add_argument("--estado", action="store_true", help="Muestra cuántas consultas hay en cada base")
+    parser.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos principal")
+    parser.add_argument("--archivo", default=ARCHIVO_POR_DEFECTO, help="Base de datos de archivo")
+    parser.add_argument("--lote", type=int, default=1000, help="Consultas por lote")
+    parser.add_argument("--simular", action="store_true", help="Solo cuenta las consultas que se archivarían")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    db_manager = DatabaseManager(args.db, archivo=args.archivo)
+    try:
+        if args.estado:
+            for nombre, datos in estado(db_manager).items():
+                print(f"{nombre:<11} {datos['consultas']:>10} consultas "
+                      f"({datos['desde'] or '-'} a {datos['hasta'] or '-'})")
+            return 0
+        corte = args.antes_de or fecha_de_corte(args.anios)
+        if args.simular:
+            print(f"Se archivarían {contar(db_manager, corte)} consultas anteriores a {corte}.")
+            return 0
+        resumen = archivar(db_manager, corte, args.lote, progress=_mostrar_progreso)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"El archivado se detuvo: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db_manager.close_connection()
+
+    print(f"{resumen['archivadas']} consultas anteriores a {resumen['corte']} movidas a {args.archivo} "
+          f"en {resumen['lotes']} lotes ({resumen['segundos']:.2f} s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# async_database.py
+"""
+Contraparte asíncrona de DatabaseManager para las vistas ASGI de Django.
+
+sqlite3 es bloqueante, así que cada operación se ejecuta en un ThreadPoolExecutor acotado
+cuyos hilos usan las conexiones del pool de DatabaseManager. Un semáforo limita cuántas
+operaciones pueden estar en curso o en cola: cuando está lleno, las corrutinas esperan
+(back-pressure) en lugar de acumular trabajo sin límite en el executor, y si la espera
+supera `acquire_timeout` se lanza BaseDatosSaturadaError para que la vista responda 503.
+"""
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager
+
+
+class BaseDatosSaturadaError(Exception):
+    """No se obtuvo turno para usar la base de datos dentro del tiempo de espera."""
+
+
+class AsyncDatabaseManager:
+    def __init__(self, db_manager=None, db_name="clinica_veterinaria.db", max_workers=8,
+                 max_pendientes=64, acquire_timeout=5.0):
+        self.db_manager = db_manager or DatabaseManager(db_name, max_lectores=max_workers)
+        self.max_pendientes = max_pendientes
+        self.acquire_timeout = acquire_timeout
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="clinica-db")
+        # Los semáforos de asyncio pertenecen a un event loop: uno por loop
+        self._semaforos = weakref.WeakKeyDictionary()
+
+    def _semaforo(self):
+        loop = asyncio.get_running_loop()
+        semaforo = self._semaforos.get(loop)
+        if semaforo is None:
+            semaforo = self._semaforos[loop] = asyncio.Semaphore(self.max_pendientes)
+        return semaforo
+
+    async def run(self, funcion, *args, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) en el executor respetando el límite de operaciones."""
+        semaforo = self._semaforo()
+        try:
+            await asyncio.wait_for(semaforo.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise BaseDatosSaturadaError(
+                f"Más de {self.max_pendientes} operaciones pendientes durante {self.acquire_timeout} s."
+            ) from None
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(funcion, *args, **kwargs))
+        finally:
+            semaforo.release()
+
+    async def run_in_transaction(self, funcion, *args, **kwargs):
+        """
+        Ejecuta funcion(db_manager, *args, **kwargs) dentro de una transacción, en un único
+        hilo del executor (una transacción no puede repartirse entre varios awaits).
+        """
+        def en_transaccion():
+            with self.db_manager.transaction():
+                return funcion(self.db_manager, *args, **kwargs)
+        return await self.run(en_transaccion)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.db_manager.close_connection()
+
+    # --- CRUD Propietario ---
+    async def insert_propietario(self, propietario):
+        return await self.run(self.db_manager.insert_propietario, propietario)
+
+    async def get_propietario_by_nombre(self, nombre):
+        return await self.run(self.db_manager.get_propietario_by_nombre, nombre)
+
+    async def get_propietario_by_id(self, propietario_id):
+        return await self.run(self.db_manager.get_propietario_by_id, propietario_id)
+
+    async def get_all_propietarios(self):
+        return await self.run(self.db_manager.get_all_propietarios)
+
+    async def get_propietarios_page(self, after_id=0, limit=100):
+        return await self.run(self.db_manager.get_propietarios_page, after_id, limit)
+
+    async def update_propietario(self, propietario_id, new_data):
+        return await self.run(self.db_manager.update_propietario, propietario_id, new_data)
+
+    async def delete_propietario(self, propietario_id):
+        return await self.run(self.db_manager.delete_propietario, propietario_id)
+
+    # --- CRUD Mascota ---
+    async def insert_mascota(self, mascota):
+        return await self.run(self.db_manager.insert_mascota, mascota)
+
+    async def get_all_mascotas(self):
+        return await self.run(self.db_manager.get_all_mascotas)
+
+    async def get_mascotas_page(self, after_id=0, limit=100):
+        return await self.run(self.db_manager.get_mascotas_page, after_id, limit)
+
+    async def get_mascota_by_id(self, mascota_id):
+        return await self.run(self.db_manager.get_mascota_by_id, mascota_id)
+
+    async def update_mascota(self, mascota_id, new_data):
+        return await self.run(self.db_manager.update_mascota, mascota_id, new_data)
+
+    async def delete_mascota(self, mascota_id):
+        return await self.run(self.db_manager.delete_mascota, mascota_id)
+
+    # --- CRUD Consulta ---
+    async def insert_consulta(self, consulta):
+        return await self.run(self.db_manager.insert_consulta, consulta)
+
+    async def get_consultas_by_mascota_id(self, mascota_id, historial_completo=False):
+        return await self.run(self.db_manager.get_consultas_by_mascota_id, mascota_id, historial_completo)
+
+    async def get_consultas_page_by_mascota_id(self, mascota_id, before=None, limit=50):
+        return await self.run(self.db_manager.get_consultas_page_by_mascota_id, mascota_id, before, limit)
+
+    async def get_consulta_by_id(self, consulta_id, historial_completo=False):
+        return await self.run(self.db_manager.get_consulta_by_id, consulta_id, historial_completo)
+
+    async def update_consulta(self, consulta_id, new_data):
+        return await self.run(self.db_manager.update_consulta, consulta_id, new_data)
+
+    async def delete_consulta(self, consulta_id):
+        return await self.run(self.db_manager.delete_consulta, consulta_id)
+
+    async def get_expediente_propietario(self, propietario_id, ultimas_consultas=None, historial_completo=False):
+        return await self.run(self.db_manager.get_expediente_propietario, propietario_id, ultimas_consultas,
+                              historial_completo)
+
+    async def update_many(self, tabla, cambios):
+        return await self.run(self.db_manager.update_many, tabla, list(cambios))
+
+    async def search_consultas(self, texto, fecha_desde=None, fecha_hasta=None, limit=20, offset=0):
+        return await self.run(self.db_manager.search_consultas, texto, fecha_desde, fecha_hasta, limit, offset)
+
+    async def get_consultas_por_especie_mes(self, mes_desde=None, mes_hasta=None, especie=None):
+        return await self.run(self.db_manager.get_consultas_por_especie_mes, mes_desde, mes_hasta, especie)
+
+    async def get_mascotas_por_propietario(self, top=20):
+        return await self.run(self.db_manager.get_mascotas_por_propietario, top)
+
+    async def get_top_diagnosticos(self, top=10):
+        return await self.run(self.db_manager.get_top_diagnosticos, top)
+
+    async def get_data_versions(self):
+        return await self.run(self.db_manager.get_data_versions)
@@ -0,0 +1,276 @@
+# backup.py
+"""Copias de seguridad en caliente de la base de la clínica.
+
+Uso (desde la carpeta del proyecto):
+    python backup.py snapshot                  # una copia en backups/ y aplica la retención
+    python backup.py programar --cada 3600     # una copia por hora hasta Ctrl+C
+    python backup.py listar
+    python backup.py verificar backups/clinica_veterinaria-20250101-120000-000.db
+    python backup.py restaurar backups/clinica_veterinaria-20250101-120000-000.db
+
+Usa la API de backup en línea de SQLite y copia las páginas en pasos pequeños. La fuente
+es una conexión lectora del pool con una transacción de lectura abierta de principio a fin:
+con WAL la copia es la instantánea de ese momento, las escrituras (de este u otros
+procesos) siguen sin esperar a la copia y la copia no se reinicia por ellas. Si hay base
+de archivo (archive.py) se copia también, junto al snapshot, de la misma transacción. Cada
+snapshot se verifica con PRAGMA integrity_check antes de quedar con su nombre final.
+"""
+import argparse
+import glob
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import schema
+from database import DatabaseManager
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Sufijo de la copia de la base de archivo que acompaña a un snapshot
+SUFIJO_ARCHIVO = "-archivo.db"
+
+
+def destino_del_archivo(snapshot):
+    """Ruta de la copia de la base de archivo que acompaña al snapshot `snapshot`."""
+    return snapshot[:-len(".db")] + SUFIJO_ARCHIVO
+
+
+def _restaurar_copia(copia, destino):
+    origen = sqlite3.connect(f"file:{copia}?mode=ro", uri=True)
+    conn = sqlite3.connect(destino)
+    try:
+        origen.backup(conn)
+    finally:
+        conn.close()
+        origen.close()
+
+
+class BackupManager:
+    def __init__(self, db_manager, directorio="backups", conservar=7, paginas_por_paso=256, pausa=0.002):
+        self.db_manager = db_manager
+        self.directorio = directorio
+        self.conservar = conservar
+        self.paginas_por_paso = paginas_por_paso
+        self.pausa = pausa
+        self._prefijo = os.path.splitext(os.path.basename(db_manager.db_name))[0]
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # --- Snapshots ---
+    def _copiar(self, destino, destino_archivo=None):
+        """
+        Copia la base en `destino` (y la de archivo en `destino_archivo`) paso a paso y
+        devuelve las métricas de la copia. `max_paso_ms` es el paso más largo: lo más que
+        la copia retuvo el disco de una vez.
+        """
+        pool = self.db_manager.pool
+        if pool.en_memoria or pool.holds_writer():
+            # Sin lectoras propias, la fuente sería la escritora tomada durante toda la copia
+            raise RuntimeError("No se puede hacer una copia de una base en memoria ni dentro de una transacción.")
+        metricas = {"pasos": 0, "paginas": 0, "bytes": 0, "max_paso_ms": 0.0}
+        with pool.reading() as conn:
+            # La transacción de lectura fija la instantánea. Se lee primero la base principal:
+            # archive.py copia al archivo antes de borrar de la principal, así una consulta
+            # que se archiva mientras tanto queda en alguna de las dos copias (en el peor
+            # caso en ambas, y la consulta del historial completo la muestra una vez)
+            conn.execute("BEGIN")
+            conn.execute("SELECT COUNT(*) FROM main.sqlite_master").fetchone()
+            if destino_archivo:
+                conn.execute(f"SELECT COUNT(*) FROM {schema.ARCHIVO}.sqlite_master").fetchone()
+            inicio = paso = time.perf_counter()
+            paginas = 0
+
+            def progreso(estado, restantes, total):
+                nonlocal paso, paginas
+                metricas["pasos"] += 1
+                metricas["max_paso_ms"] = max(metricas["max_paso_ms"], (time.perf_counter() - paso) * 1000)
+                paginas = total
+                if restantes:
+                    time.sleep(self.pausa)  # Deja el disco libre un momento para las escrituras
+                paso = time.perf_counter()
+
+            copias = [("main", destino)] + ([(schema.ARCHIVO, destino_archivo)] if destino_archivo else [])
+            for nombre, path in copias:
+                destino_conn = sqlite3.connect(path)
+                try:
+                    paso = time.perf_counter()
+                    conn.backup(destino_conn, pages=self.paginas_por_paso, progress=progreso, name=nombre)
+                    # La copia queda como un único archivo independiente (sin -wal)
+                    destino_conn.execute("PRAGMA journal_mode = DELETE")
+                    metricas["paginas"] += paginas
+                    metricas["bytes"] += paginas * destino_conn.execute("PRAGMA page_size").fetchone()[0]
+                finally:
+                    destino_conn.close()
+            metricas["segundos"] = time.perf_counter() - inicio
+        metricas["mb_por_segundo"] = metricas["bytes"] / 1e6 / metricas["segundos"] if metricas["segundos"] else 0.0
+        return metricas
+
+    def crear_snapshot(self):
+        """Crea, verifica y registra un snapshot; aplica la retención. Devuelve sus métricas."""
+        os.makedirs(self.directorio, exist_ok=True)
+        marca = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        destino = os.path.join(self.directorio, f"{self._prefijo}-{marca}.db")
+        # El snapshot y la copia de su archivo: se guarda primero la copia, así un snapshot
+        # con nombre final siempre tiene la suya
+        destinos = [destino_del_archivo(destino), destino] if self.db_manager.archivo else [destino]
+        temporales = [path + ".tmp" for path in destinos]
+        try:
+            metricas = self._copiar(temporales[-1], temporales[0] if self.db_manager.archivo else None)
+            for temporal, path in zip(temporales, destinos):
+                errores = self.verificar(temporal)
+                if errores:
+                    raise sqlite3.DatabaseError(f"La copia no pasó integrity_check: {'; '.join(errores[:5])}")
+            for temporal, path in zip(temporales, destinos):
+                os.replace(temporal, path)
+        except BaseException:
+            for temporal in temporales:
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+            raise
+        metricas["archivo"] = destino
+        metricas["copia_archivo"] = destinos[0] if self.db_manager.archivo else None
+        logger.info("Snapshot %s creado: %s páginas, %.1f MB/s, paso máximo %.1f ms.", destino,
+                    metricas["paginas"], metricas["mb_por_segundo"], metricas["max_paso_ms"],
+                    extra={"operacion": "snapshot", "duracion_ms": round(metricas["segundos"] * 1000, 1)})
+        metricas["eliminados"] = self.aplicar_retencion()
+        return metricas
+
+    def listar(self):
+        """Snapshots existentes, del más reciente al más antiguo."""
+        patron = os.path.join(glob.escape(self.directorio), f"{glob.escape(self._prefijo)}-*.db")
+        return sorted((path for path in glob.glob(patron) if not path.endswith(SUFIJO_ARCHIVO)), reverse=True)
+
+    def aplicar_retencion(self):
+        """Borra los snapshots más antiguos y conserva los `conservar` más recientes."""
+        eliminados = self.listar()[self.conservar:]
+        for path in eliminados:
+            os.remove(path)
+            if os.path.exists(destino_del_archivo(path)):
+                os.remove(destino_del_archivo(path))
+            logger.info("Snapshot %s eliminado por la política de retención.", path)
+        return eliminados
+
+    @staticmethod
+    def verificar(path):
+        """Ejecuta PRAGMA integrity_check sobre un snapshot. Devuelve la lista de errores (vacía si está bien)."""
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            resultado = [fila[0] for fila in conn.execute("PRAGMA integrity_check")]
+        finally:
+            conn.close()
+        return [] if resultado == ["ok"] else resultado
+
+    def restaurar(self, path):
+        """
+        Reemplaza el contenido de la base por el de un snapshot verificado (y el de la base de
+        archivo por su copia, si la hay). Se hace con la conexión escritora tomada de
+        principio a fin, así ninguna escritura se mezcla.
+        """
+        copia_archivo = destino_del_archivo(path)
+        restaurar_archivo = self.db_manager.archivo and os.path.exists(copia_archivo)
+        for snapshot in [path] + ([copia_archivo] if restaurar_archivo else []):
+            errores = self.verificar(snapshot)
+            if errores:
+                raise sqlite3.DatabaseError(f"El snapshot no pasó integrity_check: {'; '.join(errores[:5])}")
+        origen = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            with self.db_manager.pool.writing() as conn:
+                origen.backup(conn)
+                if restaurar_archivo:
+                    _restaurar_copia(copia_archivo, self.db_manager.archivo)
+        finally:
+            origen.close()
+        self.db_manager.clear_cache()
+        self.db_manager.create_tables()  # Un snapshot anterior puede necesitar migraciones
+        logger.warning("Base de datos restaurada desde %s.", path)
+
+    # --- Programación ---
+    def iniciar_programacion(self, intervalo):
+        """Crea un snapshot cada `intervalo` segundos en un hilo en segundo plano."""
+        self._detener.clear()
+
+        def ciclo():
+            while not self._detener.wait(intervalo):
+                try:
+                    self.crear_snapshot()
+                except (OSError, sqlite3.Error) as e:
+                    logger.error("Error en el snapshot programado: %s", e)
+
+        self._hilo = threading.Thread(target=ciclo, name="clinica-backup", daemon=True)
+        self._hilo.start()
+        return self._hilo
+
+    def detener_programacion(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+
+def _mostrar_metricas(metricas):
+    print(f"Snapshot: {metricas['archivo']}")
+    if metricas["copia_archivo"]:
+        print(f"Copia de la base de archivo: {metricas['copia_archivo']}")
+    print(f"  {metricas['paginas']} páginas ({metricas['bytes'] / 1e6:.1f} MB) en {metricas['segundos']:.2f} s "
+          f"-> {metricas['mb_por_segundo']:.1f} MB/s, {metricas['pasos']} pasos")
+    print(f"  Paso más largo de la copia: {metricas['max_paso_ms']:.1f} ms")
+    for path in metricas["eliminados"]:
+        print(f"  Eliminado por retención: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copias de seguridad de la Clínica Veterinaria.")
+    parser.add_argument("accion", choices=("snapshot", "programar", "listar", "verificar", "restaurar"))
+    parser.add_argument("archivo", nargs="?", help="Snapshot a verificar o restaurar")
+    parser.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos")
+    parser.add_argument("--archivo", dest="base_archivo",
+                        help="Base de archivo de consultas antiguas (ver archive.py): se copia con cada snapshot")
+    parser.add_argument("--directorio", default="backups", help="Carpeta de los snapshots")
+    parser.add_argument("--conservar", type=int, default=7, help="Snapshots que se conservan")
+    parser.add_argument("--paginas-por-paso", type=int, default=256, help="Páginas copiadas en cada paso")
+    parser.add_argument("--cada", type=float, default=3600, help="Segundos entre snapshots (programar)")
+    args = parser.parse_args(argv)
+
+    if args.accion in ("verificar", "restaurar") and not args.archivo:
+        parser.error(f"'{args.accion}' necesita el archivo del snapshot")
+
+    setup_logging()
+    if args.accion == "verificar":
+        errores = BackupManager.verificar(args.archivo)
+        print("Snapshot íntegro." if not errores else "\n".join(errores))
+        return 0 if not errores else 1
+
+    db_manager = DatabaseManager(args.db, archivo=args.base_archivo)
+    backups = BackupManager(db_manager, args.directorio, args.conservar, args.paginas_por_paso)
+    try:
+        if args.accion == "snapshot":
+            _mostrar_metricas(backups.crear_snapshot())
+        elif args.accion == "listar":
+            for path in backups.listar():
+                print(f"{path}  ({os.path.getsize(path) / 1e6:.1f} MB)")
+        elif args.accion == "restaurar":
+            backups.restaurar(args.archivo)
+            print(f"Base de datos restaurada desde {args.archivo}.")
+        else:
+            print(f"Un snapshot cada {args.cada:.0f} s en '{args.directorio}'. Ctrl+C para terminar.")
+            try:
+                while True:
+                    _mostrar_metricas(backups.crear_snapshot())
+                    time.sleep(args.cada)
+            except KeyboardInterrupt:
+                pass
+    except (OSError, RuntimeError, sqlite3.Error) as e:
+        print(f"La operación se detuvo: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db_manager.close_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
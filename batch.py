@@ -0,0 +1,301 @@
+# batch.py
+"""
+Modo por lotes (sin interacción) del sistema veterinario.
+
+Lee comandos JSON, uno por línea, de un archivo o de la entrada estándar:
+    {"op": "registrar_mascota", "nombre": "Luna", "especie": "gato", "raza": "Siamés", "edad": 3,
+     "propietario": "Ana Pérez", "telefono": "555-1234", "direccion": "Calle 1"}
+    {"op": "registrar_consulta", "id_mascota": 7, "fecha": "2025-06-05", "motivo": "Vacuna", "diagnostico": "Sano"}
+    {"op": "actualizar_mascota", "id": 7, "datos": {"edad": 4}}
+    {"op": "historia_clinica", "id_mascota": 7, "completo": true}
+    {"op": "expediente_propietario", "id": 3, "ultimas": 5}
+
+y escribe en la salida estándar un resultado JSON por comando:
+    {"linea": 1, "op": "registrar_mascota", "ok": true, "resultado": {...}}
+    {"linea": 2, "op": "registrar_consulta", "ok": false, "error": "..."}
+
+Los comandos se agrupan en transacciones de `tamano_grupo` comandos. Cada comando se
+ejecuta dentro de un SAVEPOINT: si falla, se deshace solo ese comando y el grupo sigue.
+Los resultados de un grupo se escriben después de su commit, así un resultado "ok"
+siempre corresponde a datos confirmados. Con `todo_o_nada` el archivo entero es una única
+transacción que se deshace si falla cualquier comando.
+"""
+import json
+import logging
+import sqlite3
+import sys
+import time
+from datetime import date
+
+from database import COLUMNAS_ACTUALIZABLES
+from models import Consulta, Mascota, Propietario, parse_fecha_iso
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorComando(Exception):
+    """El comando no se pudo ejecutar; el mensaje se devuelve en el resultado."""
+
+
+def _a_dict(entidad):
+    return {campo: getattr(entidad, campo) for campo in type(entidad).__slots__}
+
+
+def _json_default(valor):
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if hasattr(type(valor), "__slots__"):
+        return _a_dict(valor)
+    raise TypeError(f"{type(valor).__name__} no es serializable")
+
+
+def _requerido(args, campo):
+    valor = args.get(campo)
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        raise ErrorComando(f"Falta el campo '{campo}'.")
+    return valor
+
+
+def _texto(args, campo):
+    """Campo de texto obligatorio, sin espacios al principio ni al final."""
+    valor = _requerido(args, campo)
+    if not isinstance(valor, str):
+        raise ErrorComando(f"'{campo}' debe ser un texto.")
+    return valor.strip()
+
+
+def _entero(args, campo, minimo=None):
+    valor = _requerido(args, campo)
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise ErrorComando(f"'{campo}' debe ser un entero.")
+    if minimo is not None and valor < minimo:
+        raise ErrorComando(f"'{campo}' no puede ser menor que {minimo}.")
+    return valor
+
+
+def _entero_opcional(args, campo, por_defecto, minimo):
+    """Como _entero, pero un campo ausente (o null) toma el valor `por_defecto`."""
+    return por_defecto if args.get(campo) is None else _entero(args, campo, minimo)
+
+
+def _fecha(args, campo):
+    try:
+        return parse_fecha_iso(_requerido(args, campo))
+    except (TypeError, ValueError):
+        raise ErrorComando(f"'{campo}' debe tener el formato AAAA-MM-DD.")
+
+
+def _existe(entidad, descripcion):
+    if entidad is None:
+        raise ErrorComando(f"No existe {descripcion}.")
+    return entidad
+
+
+def _ok(valor, mensaje):
+    if not valor:
+        raise ErrorComando(mensaje)
+    return valor
+
+
+# --- Operaciones ---
+# Cada operación recibe (db_manager, args) y devuelve un valor serializable a JSON o
+# lanza ErrorComando. Aplican las mismas reglas que los formularios de services.py.
+
+def registrar_propietario(db, args):
+    nombre = _texto(args, "nombre")
+    if db.get_propietario_by_nombre(nombre):
+        raise ErrorComando(f"El propietario '{nombre}' ya existe.")
+    return _ok(db.insert_propietario(Propietario(nombre, args.get("telefono"), args.get("direccion"))),
+               "No se pudo registrar el propietario.")
+
+
+def registrar_mascota(db, args):
+    """Registra la mascota y, si su dueño (por nombre) no existe, también al dueño."""
+    nombre_propietario = _texto(args, "propietario")
+    propietario = db.get_propietario_by_nombre(nombre_propietario)
+    if propietario is None:
+        propietario = _ok(db.insert_propietario(
+            Propietario(nombre_propietario, args.get("telefono"), args.get("direccion"))),
+            "No se pudo registrar el dueño.")
+    mascota = Mascota(_texto(args, "nombre"), args.get("especie"), args.get("raza"),
+                      _entero(args, "edad", minimo=0), propietario.id, propietario_nombre=propietario.nombre)
+    return _ok(db.insert_mascota(mascota), "No se pudo registrar la mascota.")
+
+
+def registrar_consulta(db, args):
+    mascota_id = _entero(args, "id_mascota")
+    _existe(db.get_mascota_by_id(mascota_id), f"la mascota con ID {mascota_id}")
+    consulta = Consulta(_fecha(args, "fecha"), args.get("motivo"), args.get("diagnostico"), mascota_id)
+    return _ok(db.insert_consulta(consulta), "No se pudo registrar la consulta.")
+
+
+def _actualizar(metodo, tabla, descripcion):
+    def operacion(db, args):
+        entidad_id = _entero(args, "id")
+        datos = args.get("datos")
+        if not isinstance(datos, dict) or not datos:
+            raise ErrorComando("'datos' debe ser un objeto con los campos a cambiar.")
+        desconocidos = set(datos).difference(COLUMNAS_ACTUALIZABLES[tabla])
+        if desconocidos:
+            raise ErrorComando(f"Campos no actualizables: {', '.join(sorted(desconocidos))}. "
+                               f"Permitidos: {', '.join(COLUMNAS_ACTUALIZABLES[tabla])}.")
+        if "fecha" in datos:
+            datos = {**datos, "fecha": _fecha(datos, "fecha")}
+        if "edad" in datos:
+            _entero(datos, "edad", minimo=0)
+        return _ok(getattr(db, metodo)(entidad_id, datos), f"No se pudo actualizar {descripcion} {entidad_id}.")
+    return operacion
+
+
+def _eliminar(metodo, descripcion):
+    def operacion(db, args):
+        entidad_id = _entero(args, "id")
+        return _ok(getattr(db, metodo)(entidad_id), f"No existe {descripcion} {entidad_id}.")
+    return operacion
+
+
+def historia_clinica(db, args):
+    mascota_id = _entero(args, "id_mascota")
+    mascota = _existe(db.get_mascota_by_id(mascota_id), f"la mascota con ID {mascota_id}")
+    completo = bool(args.get("completo"))
+    return {"mascota": mascota, "consultas": db.get_consultas_by_mascota_id(mascota_id, historial_completo=completo)}
+
+
+def expediente_propietario(db, args):
+    propietario_id = _entero(args, "id")
+    ultimas = _entero_opcional(args, "ultimas", None, minimo=1)
+    return _existe(db.get_expediente_propietario(propietario_id, ultimas, historial_completo=bool(args.get("completo"))),
+                   f"el propietario con ID {propietario_id}")
+
+
+def buscar_consultas(db, args):
+    desde = _fecha(args, "desde") if args.get("desde") else None
+    hasta = _fecha(args, "hasta") if args.get("hasta") else None
+    return db.search_consultas(_texto(args, "texto"), desde, hasta, limit=_entero_opcional(args, "limite", 20, minimo=1))
+
+
+def buscar_propietarios(db, args):
+    """Propietarios con nombre parecido (sin tildes, con errores de tipeo), del más parecido al menos."""
+    return [{"propietario": propietario, "similitud": round(similitud, 3)}
+            for propietario, similitud in db.search_propietarios(_texto(args, "texto"), limit=_entero_opcional(args, "limite", 5, minimo=1))]
+
+
+def _listar(metodo):
+    def operacion(db, args):
+        return getattr(db, metodo)(_entero_opcional(args, "despues_de", 0, minimo=0),
+                                   _entero_opcional(args, "limite", 100, minimo=1))
+    return operacion
+
+
+def reporte(db, args):
+    top = _entero_opcional(args, "top", 10, minimo=1)
+    return {
+        "consultas_por_especie_mes": db.get_consultas_por_especie_mes(args.get("desde"), args.get("hasta")),
+        "mascotas_por_propietario": db.get_mascotas_por_propietario(top),
+        "top_diagnosticos": db.get_top_diagnosticos(top),
+    }
+
+
+OPERACIONES = {
+    "registrar_propietario": registrar_propietario,
+    "registrar_mascota": registrar_mascota,
+    "registrar_consulta": registrar_consulta,
+    "actualizar_propietario": _actualizar("update_propietario", "propietarios", "el propietario"),
+    "actualizar_mascota": _actualizar("update_mascota", "mascotas", "la mascota"),
+    "actualizar_consulta": _actualizar("update_consulta", "consultas", "la consulta"),
+    "eliminar_propietario": _eliminar("delete_propietario", "el propietario"),
+    "eliminar_mascota": _eliminar("delete_mascota", "la mascota"),
+    "eliminar_consulta": _eliminar("delete_consulta", "la consulta"),
+    "historia_clinica": historia_clinica,
+    "expediente_propietario": expediente_propietario,
+    "buscar_consultas": buscar_consultas,
+    "buscar_propietarios": buscar_propietarios,
+    "listar_propietarios": _listar("get_propietarios_page"),
+    "listar_mascotas": _listar("get_mascotas_page"),
+    "reporte": reporte,
+}
+
+
+class BatchRunner:
+    def __init__(self, db_manager, tamano_grupo=100, todo_o_nada=False, salida=None):
+        if tamano_grupo <= 0:
+            raise ValueError("tamano_grupo debe ser mayor que cero")
+        self.db_manager = db_manager
+        self.tamano_grupo = tamano_grupo
+        self.todo_o_nada = todo_o_nada
+        self.salida = salida or sys.stdout
+
+    def _ejecutar(self, numero, linea):
+        """Ejecuta un comando dentro de su propio SAVEPOINT y devuelve el resultado."""
+        resultado = {"linea": numero}
+        try:
+            comando = json.loads(linea)
+            if not isinstance(comando, dict):
+                raise ErrorComando("Cada línea debe ser un objeto JSON.")
+            resultado["op"] = op = comando.get("op")
+            if "ref" in comando:
+                resultado["ref"] = comando["ref"]
+            operacion = OPERACIONES.get(op)
+            if operacion is None:
+                raise ErrorComando(f"Operación desconocida: {op!r}.")
+        except (ValueError, ErrorComando) as e:
+            resultado.update(ok=False, error=str(e))
+            return resultado
+
+        with self.db_manager.transaction():
+            try:
+                resultado["resultado"] = operacion(self.db_manager, comando)
+                resultado["ok"] = True
+            except (ErrorComando, ValueError, TypeError, sqlite3.Error) as e:
+                # Un error de SQLite (restricción, base bloqueada...) falla solo este comando
+                self.db_manager.set_rollback()
+                resultado.update(ok=False, error=str(e))
+            except Exception as e:
+                # Un error inesperado también falla solo este comando: el resto del grupo sigue
+                logger.error("Error inesperado en la línea %s (%s): %s", numero, op, e, exc_info=True)
+                self.db_manager.set_rollback()
+                resultado.update(ok=False, error=f"Error inesperado: {e}")
+        return resultado
+
+    def _escribir(self, resultados):
+        for resultado in resultados:
+            self.salida.write(json.dumps(resultado, ensure_ascii=False, default=_json_default))
+            self.salida.write("\n")
+        self.salida.flush()
+
+    def ejecutar(self, lineas):
+        """Ejecuta todos los comandos de `lineas` y devuelve un resumen (totales, errores, comandos/s)."""
+        resumen = {"comandos": 0, "ok": 0, "errores": 0, "transacciones": 0}
+        inicio = time.perf_counter()
+        pendientes = []
+        lineas = ((n, l) for n, l in enumerate(lineas, 1) if l.strip())
+        fin = False
+        while not fin:
+            with self.db_manager.transaction():
+                resumen["transacciones"] += 1
+                for numero, linea in lineas:
+                    resultado = self._ejecutar(numero, linea)
+                    pendientes.append(resultado)
+                    resumen["comandos"] += 1
+                    resumen["ok" if resultado["ok"] else "errores"] += 1
+                    if self.todo_o_nada and not resultado["ok"]:
+                        self.db_manager.set_rollback()
+                        for anterior in pendientes:
+                            anterior["deshecho"] = True
+                        fin = True
+                        break
+                    if not self.todo_o_nada and len(pendientes) >= self.tamano_grupo:
+                        break
+                else:
+                    fin = True
+            self._escribir(pendientes)
+            pendientes = []
+
+        resumen["segundos"] = time.perf_counter() - inicio
+        resumen["comandos_por_segundo"] = resumen["comandos"] / resumen["segundos"] if resumen["segundos"] else 0.0
+        if self.todo_o_nada and resumen["errores"]:
+            resumen["deshecho"] = True
+        logger.info("Lote ejecutado: %s comandos, %s con error.", resumen["comandos"], resumen["errores"],
+                    extra={"operacion": "batch", "filas": resumen["comandos"],
+                           "duracion_ms": round(resumen["segundos"] * 1000, 1)})
+        return resumen
@@ -0,0 +1,285 @@
+# benchmark.py
+"""
+Benchmark reproducible de DatabaseManager sobre clínicas sintéticas.
+
+Uso:
+    python benchmark.py --tamano 10k
+    python benchmark.py --tamano 100k --salida resultados_100k.json --comparar resultados_anteriores.json
+    python benchmark.py --tamano 1m --db /tmp/clinica_1m.db   # reutiliza la base si ya existe
+
+Genera propietarios -> mascotas -> consultas con un reparto realista (la mayoría de los
+dueños tiene 1 o 2 mascotas y las consultas por mascota siguen una cola larga), mide cada
+operación CRUD, los listados, la historia clínica, la búsqueda y los borrados en cascada,
+y guarda los resultados en JSON (con el commit de git) para comparar entre versiones.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from database import DatabaseManager
+from models import Propietario, Mascota, Consulta
+
+TAMANOS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Jorge", "Lucía", "Andrés", "Sofía", "Pedro",
+           "Valentina", "Camilo", "Daniela", "Juan", "Paula", "Miguel", "Laura", "Diego", "Sara", "Esteban"]
+APELLIDOS = ["García", "Rodríguez", "Martínez", "López", "Gómez", "Pérez", "Sánchez", "Ramírez", "Torres",
+             "Díaz", "Vargas", "Castro", "Rojas", "Moreno", "Muñoz", "Cano", "Cerquera", "Eusse", "Suárez", "Arias"]
+ESPECIES = [("perro", 55), ("gato", 35), ("ave", 4), ("conejo", 4), ("reptil", 2)]
+RAZAS = {
+    "perro": ["Criollo", "Labrador", "Pastor Alemán", "Bulldog", "Poodle", "Beagle"],
+    "gato": ["Criollo", "Siamés", "Persa", "Angora", "Bengalí"],
+    "ave": ["Canario", "Periquito", "Loro"],
+    "conejo": ["Enano", "Belier", "Rex"],
+    "reptil": ["Iguana", "Tortuga", "Gecko"],
+}
+NOMBRES_MASCOTA = ["Firulais", "Luna", "Max", "Rocky", "Kira", "Toby", "Nala", "Simba", "Coco", "Lola",
+                   "Bruno", "Mía", "Zeus", "Canela", "Manchas", "Pelusa", "Thor", "Frida", "Oreo", "Milo"]
+CONSULTAS_TIPO = [
+    ("Control anual y vacunación", "Paciente sano, vacunas al día"),
+    ("Rascado constante de orejas", "Otitis externa"),
+    ("Vómito y diarrea", "Gastroenteritis aguda"),
+    ("Cojera pata trasera", "Esguince leve"),
+    ("Caída de pelo", "Dermatitis alérgica"),
+    ("Decaimiento y fiebre", "Infección respiratoria"),
+    ("Desparasitación", "Parásitos intestinales tratados"),
+    ("Control de peso", "Sobrepeso moderado"),
+    ("Herida en la piel", "Laceración superficial"),
+    ("Tos persistente", "Traqueobronquitis infecciosa"),
+]
+
+
+# --- Generación de datos sintéticos ---
+def generar_clinica(db_manager, total_consultas, semilla=42, lote=10_000):
+    """
+    Llena la base con ~total_consultas consultas y devuelve los conteos generados.
+    Con la misma semilla siempre se obtiene exactamente la misma clínica.
+    """
+    rnd = random.Random(semilla)
+    n_propietarios = max(total_consultas // 12, 1)
+    hoy = date(2025, 1, 1)
+    especies, pesos = zip(*ESPECIES)
+
+    filas = []
+    for i in range(n_propietarios):
+        nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {i}"
+        filas.append((nombre, f"3{rnd.randrange(10**9):09d}", f"Calle {rnd.randrange(1, 200)} # {rnd.randrange(1, 100)}"))
+    with db_manager.transaction():
+        for i in range(0, len(filas), lote):
+            db_manager.insert_propietarios_bulk(filas[i:i + lote])
+    ids_propietarios = [row[0] for row in db_manager.fetchall("SELECT id FROM propietarios ORDER BY id")]
+
+    filas = []
+    for propietario_id in ids_propietarios:
+        for _ in range(rnd.choices((1, 2, 3, 4), weights=(55, 30, 10, 5))[0]):
+            especie = rnd.choices(especies, weights=pesos)[0]
+            filas.append((rnd.choice(NOMBRES_MASCOTA), especie, rnd.choice(RAZAS[especie]),
+                          rnd.randrange(0, 16), propietario_id))
+    with db_manager.transaction():
+        for i in range(0, len(filas), lote):
+            db_manager.insert_mascotas_bulk(filas[i:i + lote])
+    ids_mascotas = [row[0] for row in db_manager.fetchall("SELECT id FROM mascotas ORDER BY id")]
+
+    # Cola larga: unas pocas mascotas concentran muchas consultas
+    pesos_mascotas = [rnd.paretovariate(1.5) for _ in ids_mascotas]
+    generadas = 0
+    while generadas < total_consultas:
+        n = min(lote, total_consultas - generadas)
+        elegidas = rnd.choices(ids_mascotas, weights=pesos_mascotas, k=n)
+        filas = []
+        for mascota_id in elegidas:
+            motivo, diagnostico = rnd.choice(CONSULTAS_TIPO)
+            fecha = hoy - timedelta(days=rnd.randrange(0, 3650))
+            filas.append((fecha.isoformat(), motivo, diagnostico, mascota_id))
+        with db_manager.transaction():
+            db_manager.insert_consultas_bulk(filas)
+        generadas += n
+
+    return {"propietarios": len(ids_propietarios), "mascotas": len(ids_mascotas), "consultas": generadas}
+
+
+# --- Medición ---
+def medir(funcion, argumentos):
+    """Ejecuta funcion(*args) para cada tupla de `argumentos` y resume los tiempos en ms."""
+    tiempos = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "n": len(tiempos),
+        "total_ms": round(sum(tiempos), 3),
+        "media_ms": round(statistics.fmean(tiempos), 4),
+        "p50_ms": round(tiempos[len(tiempos) // 2], 4),
+        "p95_ms": round(tiempos[min(int(len(tiempos) * 0.95), len(tiempos) - 1)], 4),
+        "max_ms": round(tiempos[-1], 4),
+    }
+
+
+def _consumir(iterable):
+    for _ in iterable:
+        pass
+
+
+def ejecutar_benchmarks(db_manager, repeticiones=200, semilla=7):
+    rnd = random.Random(semilla)
+    ids = {tabla: [row[0] for row in db_manager.fetchall(f"SELECT id FROM {tabla} ORDER BY id")]
+           for tabla in ("propietarios", "mascotas", "consultas")}
+    nombres = [row[0] for row in db_manager.fetchall("SELECT nombre FROM propietarios ORDER BY id")]
+    nombres = rnd.sample(nombres, min(repeticiones, len(nombres)))
+
+    def muestra(tabla, k=repeticiones):
+        return rnd.sample(ids[tabla], min(k, len(ids[tabla])))
+
+    resultados = {}
+    pocas = max(repeticiones // 50, 3)  # Para operaciones que recorren tablas completas
+
+    # Lecturas por ID sin caché (la caché se limpia antes de cada lectura) y con caché caliente
+    def sin_cache(funcion):
+        def envoltura(*args):
+            db_manager.clear_cache()
+            return funcion(*args)
+        return envoltura
+
+    for entidad, funcion, tabla in (("propietario", db_manager.get_propietario_by_id, "propietarios"),
+                                    ("mascota", db_manager.get_mascota_by_id, "mascotas"),
+                                    ("consulta", db_manager.get_consulta_by_id, "consultas")):
+        elegidos = [(i,) for i in muestra(tabla)]
+        resultados[f"get_{entidad}_by_id"] = medir(sin_cache(funcion), elegidos)
+        medir(funcion, elegidos)
+        resultados[f"get_{entidad}_by_id_cache"] = medir(funcion, elegidos)
+
+    resultados["get_propietario_by_nombre"] = medir(db_manager.get_propietario_by_nombre, [(n,) for n in nombres])
+    resultados["get_consultas_by_mascota_id"] = medir(db_manager.get_consultas_by_mascota_id, [(i,) for i in muestra("mascotas")])
+    resultados["search_consultas"] = medir(db_manager.search_consultas,
+                                           [(texto,) for texto in rnd.choices(["otitis", "vacunas", "dermatitis alérgica", "tos"], k=repeticiones)])
+
+    # Listados
+    resultados["get_propietarios_page"] = medir(db_manager.get_propietarios_page, [(i, 100) for i in muestra("propietarios")])
+    resultados["get_mascotas_page"] = medir(db_manager.get_mascotas_page, [(i, 100) for i in muestra("mascotas")])
+    resultados["get_all_propietarios"] = medir(db_manager.get_all_propietarios, [()] * pocas)
+    resultados["get_all_mascotas"] = medir(db_manager.get_all_mascotas, [()] * pocas)
+    resultados["iter_propietarios"] = medir(lambda: _consumir(db_manager.iter_propietarios()), [()] * pocas)
+    resultados["iter_mascotas"] = medir(lambda: _consumir(db_manager.iter_mascotas()), [()] * pocas)
+
+    # Escrituras (cada una con su propio commit, como en el uso interactivo)
+    ejecucion = time.time_ns()  # Nombres únicos aunque se reutilice la base
+    propietario_base = ids["propietarios"][0]
+    mascota_base = ids["mascotas"][0]
+    resultados["insert_propietario"] = medir(
+        lambda i: db_manager.insert_propietario(Propietario(f"Benchmark {ejecucion} {i}", "300", "Calle 1")),
+        [(i,) for i in range(repeticiones)])
+    resultados["insert_mascota"] = medir(
+        lambda: db_manager.insert_mascota(Mascota("Bench", "perro", "Criollo", 3, propietario_base)), [()] * repeticiones)
+    resultados["insert_consulta"] = medir(
+        lambda: db_manager.insert_consulta(Consulta(date(2025, 1, 1), "Control", "Sano", mascota_base)), [()] * repeticiones)
+    resultados["update_propietario"] = medir(
+        lambda i: db_manager.update_propietario(i, {"telefono": "301"}), [(i,) for i in muestra("propietarios")])
+    resultados["update_mascota"] = medir(
+        lambda i: db_manager.update_mascota(i, {"edad": 5}), [(i,) for i in muestra("mascotas")])
+    resultados["update_consulta"] = medir(
+        lambda i: db_manager.update_consulta(i, {"diagnostico": "Revisado"}), [(i,) for i in muestra("consultas")])
+
+    # Borrados al final: modifican el conjunto de datos
+    resultados["delete_consulta"] = medir(db_manager.delete_consulta, [(i,) for i in muestra("consultas")])
+    resultados["delete_mascota_cascada"] = medir(db_manager.delete_mascota, [(i,) for i in muestra("mascotas")])
+    resultados["delete_propietario_cascada"] = medir(db_manager.delete_propietario, [(i,) for i in muestra("propietarios")])
+    return resultados
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, anterior, tolerancia=0.20):
+    """Devuelve las operaciones cuya mediana empeoró más que `tolerancia` (0.20 = 20%)."""
+    regresiones = []
+    for operacion, datos in actual["resultados"].items():
+        previo = anterior.get("resultados", {}).get(operacion)
+        if previo and previo["p50_ms"] > 0:
+            cambio = datos["p50_ms"] / previo["p50_ms"] - 1
+            if cambio > tolerancia:
+                regresiones.append((operacion, previo["p50_ms"], datos["p50_ms"], cambio))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de DatabaseManager con datos sintéticos.")
+    parser.add_argument("--tamano", choices=TAMANOS, default="10k", help="Cantidad de consultas sintéticas")
+    parser.add_argument("--db", help="Archivo de base de datos (se reutiliza si ya tiene datos)")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmark_<tamano>.json)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para detectar regresiones")
+    args = parser.parse_args(argv)
+
+    directorio_temporal = None
+    db_path = args.db
+    if not db_path:
+        directorio_temporal = tempfile.TemporaryDirectory()
+        db_path = os.path.join(directorio_temporal.name, "benchmark.db")
+
+    db_manager = DatabaseManager(db_path)
+    try:
+        existentes = db_manager.fetchone("SELECT COUNT(*) FROM consultas")[0]
+        inicio = time.perf_counter()
+        if existentes:
+            conteos = {tabla: db_manager.fetchone(f"SELECT COUNT(*) FROM {tabla}")[0]
+                       for tabla in ("propietarios", "mascotas", "consultas")}
+            print(f"Reutilizando {db_path}: {conteos}")
+        else:
+            conteos = generar_clinica(db_manager, TAMANOS[args.tamano], args.semilla)
+            print(f"Clínica sintética generada en {time.perf_counter() - inicio:.1f} s: {conteos}")
+        generacion_s = time.perf_counter() - inicio
+
+        resultados = ejecutar_benchmarks(db_manager, args.repeticiones)
+    finally:
+        db_manager.close_connection()
+        if directorio_temporal:
+            directorio_temporal.cleanup()
+
+    informe = {
+        "commit": _commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "tamano": args.tamano,
+        "conteos": conteos,
+        "generacion_s": round(generacion_s, 3),
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    salida = args.salida or f"benchmark_{args.tamano}.json"
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+
+    print(f"{'Operación':<32}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for operacion, datos in resultados.items():
+        print(f"{operacion:<32}{datos['p50_ms']:>10.3f}{datos['p95_ms']:>10.3f}{datos['max_ms']:>10.3f}")
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(informe, json.load(f))
+        for operacion, antes, ahora, cambio in regresiones:
+            print(f"REGRESIÓN {operacion}: {antes:.3f} ms -> {ahora:.3f} ms (+{cambio:.0%})")
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
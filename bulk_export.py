@@ -0,0 +1,253 @@
+# bulk_export.py
+"""Exportación de propietarios, mascotas e historias clínicas a CSV, JSONL o Parquet.
+
+Uso (desde la carpeta del proyecto):
+    python bulk_export.py propietarios propietarios.csv
+    python bulk_export.py mascotas mascotas.jsonl.gz
+    python bulk_export.py consultas historias.parquet --desde 2024-01-01 --hasta 2024-12-31
+    python bulk_export.py consultas historias.csv --archivo clinica_veterinaria_archivo.db
+
+El formato se deduce de la extensión (.csv, .jsonl, .parquet); con .gz al final se
+comprime con gzip. Las filas se leen del cursor de SQLite por lotes y se escriben a medida
+que llegan, así la memoria usada no depende del tamaño de la exportación. Con una base de
+archivo (archive.py) las consultas archivadas se exportan junto con las de la principal.
+
+Las columnas llevan los nombres que acepta bulk_import.py, pero id_propietario e id_mascota
+son los IDs de la base de origen: en otra base no corresponden a las mismas filas (o no
+existen). Para importar ahí, quitar esas columnas y dejar que el importador resuelva
+propietario y mascota por nombre (columnas `propietario` y `mascota`).
+Parquet (columnar, para análisis) requiere el paquete opcional pyarrow.
+"""
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+from database import DatabaseManager
+from log_config import setup_logging
+from models import parse_fecha_iso
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("csv", "jsonl", "parquet")
+
+# Sentencia y columnas de cada entidad. Las consultas salen agrupadas por mascota y en
+# orden cronológico (lo da el índice idx_consultas_mascota_fecha, sin ordenar en memoria).
+# {archivadas} se reemplaza por _CONSULTAS_ARCHIVADAS o por nada.
+EXPORTACIONES = {
+    "propietarios": (
+        "SELECT id, nombre, telefono, direccion FROM propietarios ORDER BY id",
+        ("id", "nombre", "telefono", "direccion"),
+    ),
+    "mascotas": (
+        """
+        SELECT m.id, m.nombre, m.especie, m.raza, m.edad, m.id_propietario, p.nombre
+        FROM mascotas m
+        LEFT JOIN propietarios p ON m.id_propietario = p.id
+        ORDER BY m.id
+        """,
+        ("id", "nombre", "especie", "raza", "edad", "id_propietario", "propietario"),
+    ),
+    "consultas": (
+        """
+        SELECT c.id, c.fecha, c.motivo, c.diagnostico, c.id_mascota, m.nombre, m.especie,
+               m.id_propietario, p.nombre
+        FROM consultas c
+        JOIN mascotas m ON c.id_mascota = m.id
+        LEFT JOIN propietarios p ON m.id_propietario = p.id
+        WHERE (:desde IS NULL OR c.fecha >= :desde) AND (:hasta IS NULL OR c.fecha <= :hasta)
+        {archivadas}
+        ORDER BY 5, 2
+        """,
+        ("id", "fecha", "motivo", "diagnostico", "id_mascota", "mascota", "especie",
+         "id_propietario", "propietario"),
+    ),
+}
+
+# Consultas de la base de archivo. Con ORDER BY sobre el UNION ALL, SQLite recorre las dos
+# tablas por su índice (mascota, fecha) y las intercala, sin ordenar el resultado completo.
+# Una consulta copiada al archivo pero aún no borrada de la principal sale una sola vez.
+_CONSULTAS_ARCHIVADAS = """
+        UNION ALL
+        SELECT a.id, a.fecha, a.motivo, a.diagnostico, a.id_mascota, m.nombre, m.especie,
+               m.id_propietario, p.nombre
+        FROM consultas_archivo a
+        JOIN mascotas m ON a.id_mascota = m.id
+        LEFT JOIN propietarios p ON m.id_propietario = p.id
+        WHERE (:desde IS NULL OR a.fecha >= :desde) AND (:hasta IS NULL OR a.fecha <= :hasta)
+          AND NOT EXISTS (SELECT 1 FROM consultas c WHERE c.id = a.id)
+"""
+
+# Tipos de las columnas en Parquet (las demás son texto)
+_ENTERAS = {"id", "edad", "id_propietario", "id_mascota"}
+
+
+def detectar_formato(path):
+    """Devuelve (formato, comprimir) según la extensión del archivo."""
+    nombre = path.lower()
+    comprimir = nombre.endswith(".gz")
+    if comprimir:
+        nombre = nombre[:-3]
+    for formato in FORMATOS:
+        if nombre.endswith("." + formato):
+            return formato, comprimir
+    raise ValueError(f"No se reconoce el formato de '{path}'. Use .csv, .jsonl o .parquet (opcionalmente .gz).")
+
+
+def _abrir_texto(path, comprimir):
+    if comprimir:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _escribir_csv(filas, columnas, path, comprimir, contar):
+    with _abrir_texto(path, comprimir) as f:
+        escritor = csv.writer(f)
+        escritor.writerow(columnas)
+        escritor.writerows(map(contar, filas))
+
+
+def _escribir_jsonl(filas, columnas, path, comprimir, contar):
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    with _abrir_texto(path, comprimir) as f:
+        for fila in map(contar, filas):
+            f.write(dumps(dict(zip(columnas, fila))))
+            f.write("\n")
+
+
+def _escribir_parquet(filas, columnas, path, comprimir, contar, filas_por_grupo=65536):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("La exportación a Parquet requiere pyarrow (pip install pyarrow).") from None
+    if comprimir:
+        raise ValueError("Parquet ya se comprime internamente: use la extensión .parquet sin .gz.")
+
+    esquema = pa.schema([
+        (c, pa.date32() if c == "fecha" else pa.int64() if c in _ENTERAS else pa.string())
+        for c in columnas
+    ])
+    conversion = [parse_fecha_iso if c == "fecha" else None for c in columnas]
+
+    def grupo(lote):
+        columnas_lote = [list(valores) for valores in zip(*lote)]
+        for i, convertir in enumerate(conversion):
+            if convertir:
+                columnas_lote[i] = [convertir(v) if v else None for v in columnas_lote[i]]
+        return pa.record_batch(columnas_lote, schema=esquema)
+
+    # Un row group por lote: en memoria solo hay `filas_por_grupo` filas a la vez
+    with pq.ParquetWriter(path, esquema, compression="zstd") as escritor:
+        lote = []
+        for fila in map(contar, filas):
+            lote.append(fila)
+            if len(lote) >= filas_por_grupo:
+                escritor.write_batch(grupo(lote))
+                lote = []
+        if lote:
+            escritor.write_batch(grupo(lote))
+
+
+_ESCRITORES = {"csv": _escribir_csv, "jsonl": _escribir_jsonl, "parquet": _escribir_parquet}
+
+
+def exportar(db_manager, entidad, path, fecha_desde=None, fecha_hasta=None, progress=None, cada=100_000,
+             historial_completo=True):
+    """
+    Exporta `entidad` a `path` y devuelve un resumen con filas, bytes y segundos.
+    `fecha_desde`/`fecha_hasta` ('YYYY-MM-DD', inclusivas) solo se aplican a las consultas.
+    Si el manager tiene base de archivo, las consultas archivadas se incluyen salvo con
+    `historial_completo=False`.
+    Se escribe en un archivo temporal que reemplaza al destino al terminar, así una
+    exportación interrumpida no deja un archivo a medias con el nombre final.
+    """
+    if entidad not in EXPORTACIONES:
+        raise ValueError(f"Entidad desconocida: {entidad}. Opciones: {', '.join(EXPORTACIONES)}")
+    formato, comprimir = detectar_formato(path)
+    sql, columnas = EXPORTACIONES[entidad]
+    params = ()
+    if entidad == "consultas":
+        archivadas = _CONSULTAS_ARCHIVADAS if historial_completo and db_manager.archivo else ""
+        sql = sql.format(archivadas=archivadas)
+        params = {"desde": fecha_desde, "hasta": fecha_hasta}
+
+    inicio = time.perf_counter()
+    total = 0
+
+    def contar(fila):
+        nonlocal total
+        total += 1
+        if progress and total % cada == 0:
+            progress(entidad, total, total / (time.perf_counter() - inicio))
+        return fila
+
+    temporal = path + ".tmp"
+    filas = db_manager.iter_rows(sql, params)
+    try:
+        _ESCRITORES[formato](filas, columnas, temporal, comprimir, contar)
+        os.replace(temporal, path)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    finally:
+        filas.close()  # Devuelve la conexión lectora al pool aunque la escritura falle
+
+    segundos = time.perf_counter() - inicio
+    resumen = {"entidad": entidad, "destino": path, "formato": formato, "comprimido": comprimir,
+               "filas": total, "bytes": os.path.getsize(path), "segundos": segundos}
+    logger.info("Exportación de %s a %s terminada: %s filas, %s bytes.", entidad, path, total, resumen["bytes"],
+                extra={"operacion": f"exportar_{entidad}", "filas": total, "duracion_ms": round(segundos * 1000, 1)})
+    return resumen
+
+
+def _fecha(valor):
+    try:
+        return parse_fecha_iso(valor).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError("Use el formato AAAA-MM-DD, por ejemplo 2024-06-30.")
+
+
+def _mostrar_progreso(entidad, filas, filas_por_segundo):
+    print(f"  {entidad}: {filas} filas escritas ({filas_por_segundo:.0f} filas/s)", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportación de datos de la Clínica Veterinaria.")
+    parser.add_argument("entidad", choices=tuple(EXPORTACIONES))
+    parser.add_argument("archivo", help="Destino .csv, .jsonl o .parquet (.csv.gz / .jsonl.gz para comprimir)")
+    parser.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos de origen")
+    parser.add_argument("--desde", type=_fecha, help="Primera fecha de consulta (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=_fecha, help="Última fecha de consulta (AAAA-MM-DD)")
+    parser.add_argument("--archivo", dest="base_archivo",
+                        help="Base de archivo de consultas antiguas: sus consultas se exportan también")
+    parser.add_argument("--sin-archivadas", action="store_true",
+                        help="Con --archivo, exporta solo las consultas de la base principal")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    db_manager = DatabaseManager(args.db, archivo=args.base_archivo)
+    try:
+        resumen = exportar(db_manager, args.entidad, args.archivo, args.desde, args.hasta, _mostrar_progreso,
+                           historial_completo=not args.sin_archivadas)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"La exportación se detuvo: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db_manager.close_connection()
+
+    print(
+        f"{resumen['entidad']}: {resumen['filas']} filas exportadas a {resumen['destino']} "
+        f"({resumen['bytes'] / 1024:.0f} KiB) en {resumen['segundos']:.2f} s."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
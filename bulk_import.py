@@ -0,0 +1,293 @@
+# bulk_import.py
+"""Importación masiva de propietarios, mascotas y consultas desde archivos CSV o JSONL.
+
+Uso (desde la carpeta del proyecto):
+    python bulk_import.py propietarios propietarios.csv
+    python bulk_import.py mascotas mascotas.jsonl --crear-propietarios
+    python bulk_import.py consultas historico.csv --chunk-size 5000
+
+Columnas esperadas por entidad:
+    propietarios: nombre, telefono, direccion
+    mascotas:     nombre, especie, raza, edad, propietario (nombre) o id_propietario
+    consultas:    fecha (YYYY-MM-DD o dd-mm-aaaa), motivo, diagnostico,
+                  id_mascota o bien propietario + mascota (nombres)
+
+Cada bloque de filas se inserta con executemany dentro de una única transacción,
+junto con el punto de control de la importación. Si el proceso se interrumpe,
+al volver a ejecutarlo se continúa desde el último bloque confirmado.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from database import DatabaseManager
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+ENTIDADES = ("propietarios", "mascotas", "consultas")
+
+
+def leer_registros(path):
+    """
+    Genera los registros de un archivo CSV (con cabecera) o JSONL como diccionarios. Una
+    línea JSONL que no es JSON válido se genera tal cual (texto): el importador la rechaza
+    como a cualquier otro registro que no es un objeto.
+    """
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if linea:
+                    try:
+                        yield json.loads(linea)
+                    except ValueError:
+                        yield linea
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _entero(valor):
+    valor = _texto(valor)
+    return int(valor) if valor is not None else None
+
+
+def _ids_explicitos(bloque, campo):
+    """IDs numéricos indicados en `campo`; los inválidos se rechazan después, fila por fila."""
+    ids = set()
+    for registro in bloque:
+        try:
+            valor = _entero(registro.get(campo))
+        except ValueError:
+            continue
+        if valor is not None:
+            ids.add(valor)
+    return ids
+
+
+def _fecha_iso(valor):
+    """Normaliza una fecha 'YYYY-MM-DD' o 'dd-mm-aaaa' al formato guardado en la base de datos."""
+    valor = _texto(valor)
+    if valor is None:
+        raise ValueError("fecha vacía")
+    for formato in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(valor, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"fecha inválida: {valor}")
+
+
+class BulkImporter:
+    """Carga archivos grandes en bloques transaccionales con punto de control reanudable."""
+
+    def __init__(self, db_manager, chunk_size=1000, crear_propietarios=False, progress=None):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size debe ser mayor que cero")
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+        self.crear_propietarios = crear_propietarios
+        self.progress = progress
+
+    # --- Punto de control ---
+    @staticmethod
+    def _fuente(path):
+        return os.path.abspath(path)
+
+    def get_checkpoint(self, entidad, path):
+        """Devuelve cuántas filas del archivo ya fueron importadas y confirmadas."""
+        row = self.db_manager.fetchone(
+            "SELECT filas_procesadas FROM import_checkpoints WHERE fuente = ? AND entidad = ?",
+            (self._fuente(path), entidad)
+        )
+        return row[0] if row else 0
+
+    def _guardar_checkpoint(self, entidad, path, filas):
+        self.db_manager.execute(
+            "INSERT OR REPLACE INTO import_checkpoints (fuente, entidad, filas_procesadas, actualizado) "
+            "VALUES (?, ?, ?, ?)",
+            (self._fuente(path), entidad, filas, datetime.now().isoformat(timespec="seconds"))
+        )
+
+    def reset_checkpoint(self, entidad, path):
+        self.db_manager.execute(
+            "DELETE FROM import_checkpoints WHERE fuente = ? AND entidad = ?",
+            (self._fuente(path), entidad)
+        )
+
+    # --- Importación ---
+    def importar(self, entidad, path, reanudar=True):
+        """Importa un archivo completo y devuelve un resumen con filas insertadas, rechazadas y filas/s."""
+        if entidad not in ENTIDADES:
+            raise ValueError(f"Entidad desconocida: {entidad}. Opciones: {', '.join(ENTIDADES)}")
+        procesar = getattr(self, f"_procesar_{entidad}")
+
+        if not reanudar:
+            self.reset_checkpoint(entidad, path)
+        ya_procesadas = self.get_checkpoint(entidad, path)
+        if ya_procesadas:
+            logger.info("Reanudando importación de %s desde %s: %s filas ya confirmadas.", entidad, path, ya_procesadas)
+
+        resumen = {"entidad": entidad, "fuente": path, "omitidas_por_checkpoint": ya_procesadas,
+                   "procesadas": 0, "insertadas": 0, "rechazadas": 0}
+        inicio = time.perf_counter()
+        posicion = 0
+        bloque = []
+
+        for registro in leer_registros(path):
+            posicion += 1
+            if posicion <= ya_procesadas:
+                continue
+            bloque.append(registro)
+            if len(bloque) >= self.chunk_size:
+                self._confirmar_bloque(procesar, entidad, path, bloque, posicion, resumen, inicio)
+                bloque = []
+        if bloque:
+            self._confirmar_bloque(procesar, entidad, path, bloque, posicion, resumen, inicio)
+
+        resumen["segundos"] = time.perf_counter() - inicio
+        resumen["filas_por_segundo"] = resumen["procesadas"] / resumen["segundos"] if resumen["segundos"] else 0.0
+        logger.info(
+            "Importación de %s desde %s terminada: %s insertadas, %s rechazadas, %.0f filas/s.",
+            entidad, path, resumen['insertadas'], resumen['rechazadas'], resumen['filas_por_segundo'],
+            extra={"operacion": f"importar_{entidad}", "filas": resumen['procesadas'],
+                   "duracion_ms": round(resumen["segundos"] * 1000, 1)},
+        )
+        return resumen
+
+    def _confirmar_bloque(self, procesar, entidad, path, bloque, posicion, resumen, inicio):
+        registros = [r for r in bloque if isinstance(r, dict)]
+        no_objetos = len(bloque) - len(registros)
+        if no_objetos:
+            logger.warning("%s registros de %s rechazados en importación: no son objetos JSON.", no_objetos, entidad)
+        try:
+            with self.db_manager.transaction():
+                insertadas, rechazadas = procesar(registros)
+                rechazadas += no_objetos
+                self._guardar_checkpoint(entidad, path, posicion)
+        except sqlite3.Error as e:
+            logger.error("Error al importar %s (filas hasta %s): %s", entidad, posicion, e)
+            raise
+        resumen["procesadas"] += len(bloque)
+        resumen["insertadas"] += insertadas
+        resumen["rechazadas"] += rechazadas
+        if self.progress:
+            transcurrido = time.perf_counter() - inicio
+            self.progress(entidad, posicion, resumen["procesadas"] / transcurrido if transcurrido else 0.0)
+
+    def _procesar_propietarios(self, bloque):
+        filas, rechazadas = [], 0
+        for registro in bloque:
+            nombre = _texto(registro.get("nombre"))
+            if not nombre:
+                rechazadas += 1
+                continue
+            filas.append((nombre, _texto(registro.get("telefono")), _texto(registro.get("direccion"))))
+        insertadas = self.db_manager.insert_propietarios_bulk(filas)
+        # Los nombres duplicados se ignoran por la restricción UNIQUE y cuentan como rechazados
+        return insertadas, rechazadas + len(filas) - insertadas
+
+    def _procesar_mascotas(self, bloque):
+        nombres = {_texto(r.get("propietario")) for r in bloque if not _texto(r.get("id_propietario"))}
+        nombres.discard(None)
+        if self.crear_propietarios and nombres:
+            self.db_manager.insert_propietarios_bulk([(n, None, None) for n in nombres])
+        ids_propietarios = self.db_manager.get_propietario_ids_by_nombres(nombres)
+        existentes = self.db_manager.get_existing_ids("propietarios", _ids_explicitos(bloque, "id_propietario"))
+
+        filas, rechazadas = [], 0
+        for registro in bloque:
+            try:
+                nombre = _texto(registro.get("nombre"))
+                propietario_id = _entero(registro.get("id_propietario"))
+                if propietario_id is None:
+                    propietario_id = ids_propietarios.get(_texto(registro.get("propietario")))
+                elif propietario_id not in existentes:
+                    raise ValueError(f"no existe el propietario con ID {propietario_id}")
+                if not nombre or propietario_id is None:
+                    raise ValueError("mascota sin nombre o sin propietario conocido")
+                filas.append((nombre, _texto(registro.get("especie")), _texto(registro.get("raza")),
+                              _entero(registro.get("edad")), propietario_id))
+            except ValueError as e:
+                rechazadas += 1
+                logger.warning("Mascota rechazada en importación (%s): %s", e, registro)
+        return self.db_manager.insert_mascotas_bulk(filas), rechazadas
+
+    def _procesar_consultas(self, bloque):
+        pares = set()
+        for registro in bloque:
+            if not _texto(registro.get("id_mascota")):
+                pares.add((_texto(registro.get("propietario")), _texto(registro.get("mascota"))))
+        ids_mascotas = self.db_manager.get_mascota_ids_by_propietario_y_nombre(pares) if pares else {}
+        existentes = self.db_manager.get_existing_ids("mascotas", _ids_explicitos(bloque, "id_mascota"))
+
+        filas, rechazadas = [], 0
+        for registro in bloque:
+            try:
+                mascota_id = _entero(registro.get("id_mascota"))
+                if mascota_id is None:
+                    mascota_id = ids_mascotas.get((_texto(registro.get("propietario")), _texto(registro.get("mascota"))))
+                elif mascota_id not in existentes:
+                    raise ValueError(f"no existe la mascota con ID {mascota_id}")
+                if mascota_id is None:
+                    raise ValueError("consulta sin mascota conocida")
+                filas.append((_fecha_iso(registro.get("fecha")), _texto(registro.get("motivo")),
+                              _texto(registro.get("diagnostico")), mascota_id))
+            except ValueError as e:
+                rechazadas += 1
+                logger.warning("Consulta rechazada en importación (%s): %s", e, registro)
+        return self.db_manager.insert_consultas_bulk(filas), rechazadas
+
+
+def _mostrar_progreso(entidad, filas, filas_por_segundo):
+    print(f"  {entidad}: {filas} filas leídas ({filas_por_segundo:.0f} filas/s)", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importación masiva para la Clínica Veterinaria.")
+    parser.add_argument("entidad", choices=ENTIDADES)
+    parser.add_argument("archivo", help="Archivo .csv (con cabecera) o .jsonl")
+    parser.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos de destino")
+    parser.add_argument("--archivo", dest="base_archivo", help="Base de datos de archivo de consultas antiguas (ver archive.py)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Filas por transacción")
+    parser.add_argument("--crear-propietarios", action="store_true",
+                        help="Registra los propietarios desconocidos al importar mascotas")
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="Ignora el punto de control y empieza desde la primera fila")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    db_manager = DatabaseManager(args.db, archivo=args.base_archivo)
+    try:
+        importer = BulkImporter(db_manager, args.chunk_size, args.crear_propietarios, _mostrar_progreso)
+        resumen = importer.importar(args.entidad, args.archivo, reanudar=not args.reiniciar)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"La importación se detuvo: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db_manager.close_connection()
+
+    print(
+        f"{resumen['entidad']}: {resumen['insertadas']} insertadas, {resumen['rechazadas']} rechazadas, "
+        f"{resumen['omitidas_por_checkpoint']} ya importadas previamente, "
+        f"{resumen['filas_por_segundo']:.0f} filas/s en {resumen['segundos']:.2f} s."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
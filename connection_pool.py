@@ -0,0 +1,180 @@
+# connection_pool.py
+"""
+Pool de conexiones SQLite para usar la base desde varios hilos a la vez.
+
+- Una única conexión escritora por proceso, serializada con un candado reentrante:
+  SQLite admite un solo escritor, así que los hilos del mismo proceso hacen cola aquí
+  en lugar de competir por el bloqueo del archivo y recibir "database is locked".
+- Un conjunto acotado de conexiones lectoras (query_only) que se prestan y devuelven.
+  Con journal_mode=WAL los lectores no bloquean al escritor ni el escritor a los lectores.
+- busy_timeout cubre la espera frente a OTROS procesos (CLI, Django, tareas programadas).
+  Para que también cubra las transacciones que leen antes de escribir, DatabaseManager.transaction()
+  las abre con BEGIN IMMEDIATE.
+- espera_lectora acota la espera de una lectora libre cuando todas están prestadas.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    def __init__(self, db_name, max_lectores=8, busy_timeout=5.0, espera_lectora=30.0):
+        self.db_name = db_name
+        self.max_lectores = max_lectores
+        self.busy_timeout = busy_timeout
+        self.espera_lectora = espera_lectora
+        # Una base en memoria es distinta para cada conexión: todo va por la escritora
+        self.en_memoria = db_name == ":memory:" or str(db_name).startswith("file::memory:")
+        self._write_lock = threading.RLock()
+        self._write_owner = None
+        self._write_depth = 0
+        self._writer = None
+        self._lectores_libres = queue.LifoQueue()
+        self._lectores_creados = []
+        # Cambia en cada close_all(): una lectora prestada antes se cierra al devolverse
+        self._generacion = 0
+        self._lock = threading.Lock()
+        self._on_connect = []
+        self._on_init = []
+
+    def add_connect_hook(self, hook):
+        """Registra una función hook(conn) que se ejecuta sobre cada conexión nueva."""
+        self._on_connect.append(hook)
+
+    def add_init_hook(self, hook):
+        """
+        Registra una función hook(conn) que se ejecuta sobre la conexión escritora al abrirla,
+        antes de que se abra ninguna lectora (p. ej. para dejar el esquema al día).
+        """
+        self._on_init.append(hook)
+
+    def _open(self, solo_lectura):
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON;") # Habilita la integridad referencial
+        if not self.en_memoria:
+            conn.execute("PRAGMA journal_mode = WAL")
+            # En WAL, NORMAL no puede corromper la base; solo sincroniza a disco en cada checkpoint
+            conn.execute("PRAGMA synchronous = NORMAL")
+        if solo_lectura:
+            conn.execute("PRAGMA query_only = ON")
+        for hook in self._on_connect:
+            hook(conn)
+        return conn
+
+    # --- Escritura ---
+    @property
+    def writer(self):
+        """Conexión escritora (se abre la primera vez que se necesita)."""
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    conn = self._open(solo_lectura=False)
+                    try:
+                        for hook in self._on_init:
+                            hook(conn)
+                    except BaseException:
+                        conn.close()
+                        raise
+                    self._writer = conn
+        return self._writer
+
+    def holds_writer(self):
+        """True si el hilo actual tiene tomada la conexión escritora."""
+        return self._write_owner == threading.get_ident()
+
+    @contextmanager
+    def writing(self):
+        """Presta la conexión escritora en exclusiva al hilo actual (reentrante)."""
+        with self._write_lock:
+            self._write_owner = threading.get_ident()
+            self._write_depth += 1
+            try:
+                yield self.writer
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._write_owner = None
+
+    # --- Lectura ---
+    @contextmanager
+    def reading(self):
+        """
+        Presta una conexión lectora. Si el hilo está dentro de una transacción de escritura
+        se usa la escritora, para que vea sus propios cambios aún no confirmados.
+        """
+        if self.en_memoria or self.holds_writer():
+            with self.writing() as conn:
+                yield conn
+            return
+
+        conn, generacion = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._devolver(conn, generacion)
+
+    def _checkout(self):
+        """(conexión lectora, generación del pool en que se prestó)."""
+        with self._lock:
+            libres, generacion = self._lectores_libres, self._generacion
+        try:
+            return libres.get_nowait(), generacion
+        except queue.Empty:
+            pass
+        self.writer  # La escritora (y sus hooks de inicio) va siempre antes que la primera lectora
+        with self._lock:
+            if len(self._lectores_creados) < self.max_lectores:
+                conn = self._open(solo_lectura=True)
+                self._lectores_creados.append(conn)
+                return conn, self._generacion
+            libres, generacion = self._lectores_libres, self._generacion
+        # Pool agotado: se espera a que otro hilo devuelva una conexión. La espera es
+        # acotada porque un hilo que ya retiene lectoras (un generador de iter_rows sin
+        # agotar, por ejemplo) y pide otra podría estar esperándose a sí mismo.
+        try:
+            return libres.get(timeout=self.espera_lectora), generacion
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No se liberó ninguna conexión lectora en {self.espera_lectora} s "
+                f"(max_lectores={self.max_lectores}); ¿algún hilo retiene varias a la vez?") from None
+
+    def _devolver(self, conn, generacion):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            vigente = generacion == self._generacion
+            if vigente:
+                self._lectores_libres.put(conn)
+        if not vigente:
+            # El pool se cerró mientras estaba prestada
+            self._cerrar(conn)
+
+    def close_all(self):
+        """
+        Cierra la escritora y las lectoras libres. Las lectoras prestadas en este momento
+        siguen en uso y se cierran cuando se devuelven.
+        """
+        with self._lock:
+            conexiones = [self._writer] if self._writer else []
+            while True:
+                try:
+                    conexiones.append(self._lectores_libres.get_nowait())
+                except queue.Empty:
+                    break
+            self._lectores_creados = []
+            self._lectores_libres = queue.LifoQueue()
+            self._writer = None
+            self._generacion += 1
+        for conn in conexiones:
+            self._cerrar(conn)
+
+    @staticmethod
+    def _cerrar(conn):
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error("Error al cerrar conexión del pool: %s", e)
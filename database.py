@@ -1,281 +1,1200 @@
 # database.py
+import copy
+import json
 import sqlite3
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from datetime import date
-from models import Propietario, Mascota, Consulta
+from functools import lru_cache
+from models import Propietario, Mascota, Consulta, Expediente, ExpedienteMascota
+from connection_pool import ConnectionPool
+from entity_cache import EntityCache
+from name_index import NameIndex
+from query_stats import QueryStats
+import schema
+
+logger = logging.getLogger(__name__)
+
+# Columnas que aceptan los update_* y update_many, en el orden canónico de la cláusula SET
+COLUMNAS_ACTUALIZABLES = {
+    "propietarios": ("nombre", "telefono", "direccion"),
+    "mascotas": ("nombre", "especie", "raza", "edad", "id_propietario"),
+    "consultas": ("fecha", "motivo", "diagnostico", "id_mascota"),
+}
+
+
+@lru_cache(maxsize=None)
+def _sql_update(tabla, columnas):
+    """
+    UPDATE de `columnas` (tupla en orden canónico). Cada combinación de columnas produce
+    siempre el mismo texto, así sqlite3 reutiliza la sentencia ya preparada.
+    """
+    return f"UPDATE {tabla} SET {', '.join(f'{c} = ?' for c in columnas)} WHERE id = ?"
+
+
+def _preparar_update(tabla, entidad_id, new_data):
+    """Devuelve (sql, params) para actualizar `new_data` en la fila `entidad_id` de `tabla`."""
+    permitidas = COLUMNAS_ACTUALIZABLES[tabla]
+    desconocidas = set(new_data).difference(permitidas)
+    if desconocidas:
+        raise ValueError(f"Columnas no actualizables en {tabla}: {', '.join(sorted(desconocidas))}")
+    columnas = tuple(c for c in permitidas if c in new_data)
+    valores = [new_data[c] for c in columnas]
+    if "fecha" in new_data and isinstance(new_data["fecha"], date):
+        valores[columnas.index("fecha")] = new_data["fecha"].strftime("%Y-%m-%d")
+    valores.append(entidad_id)
+    return _sql_update(tabla, columnas), tuple(valores)
+
 
 class DatabaseManager:
-    def __init__(self, db_name="clinica_veterinaria.db"):
+    def __init__(self, db_name="clinica_veterinaria.db", max_lectores=8, cache_size=1024, cache_ttl=300.0,
+                 slow_query_ms=100.0, slow_query_log="consultas_lentas.log", archivo=None):
         self.db_name = db_name
-        self.conn = None
-        self.cursor = None
-        self.connect()
-        self.create_tables()
+        # Base con las consultas antiguas (ver archive.py); se adjunta a cada conexión
+        self.archivo = archivo
+        self.pool = ConnectionPool(db_name, max_lectores=max_lectores)
+        if archivo:
+            self.pool.add_connect_hook(self._adjuntar_archivo)
+        self._local = threading.local()  # Estado de transacción propio de cada hilo
+        # Hooks hook(sql, params, elapsed_ms, filas, conn) llamados tras cada sentencia
+        self.query_stats = QueryStats(slow_query_ms, slow_query_log)
+        self._query_hooks = [self.query_stats.record]
+        # Cachés de lectura para las búsquedas por ID (ver _cached_get / _invalidar)
+        self.cache_propietarios = EntityCache(cache_size, cache_ttl)
+        self.cache_mascotas = EntityCache(cache_size, cache_ttl)
+        self.cache_consultas = EntityCache(cache_size, cache_ttl)
+        # Índice de nombres de propietarios para search_propietarios(), construido en la
+        # primera búsqueda; _indice_version es la versión de `cambios` que refleja
+        self._indice_propietarios = None
+        self._indice_version = None
+        self._indice_lock = threading.Lock()
+        # No se abre nada aquí: la conexión y la verificación del esquema se hacen en la
+        # primera operación, así construir el manager (y arrancar el menú) no toca el disco.
+        self.migraciones_aplicadas = None
+        self.pool.add_init_hook(self._al_abrir)
+
+    def _al_abrir(self, conn):
+        """Hook de la conexión escritora: migra el esquema (sin DDL si ya está al día)."""
+        self.migraciones_aplicadas = schema.migrate(conn)
+        if self.archivo:
+            conn.execute(f"PRAGMA {schema.ARCHIVO}.journal_mode = WAL")
+            schema.preparar_archivo(conn)
+        logger.info("Conexión a la base de datos %s establecida.", self.db_name)
+        if self.migraciones_aplicadas:
+            logger.info("Esquema actualizado a la versión %s (%s migraciones).",
+                        schema.SCHEMA_VERSION, self.migraciones_aplicadas)
+
+    def _adjuntar_archivo(self, conn):
+        conn.execute(f"ATTACH DATABASE ? AS {schema.ARCHIVO}", (self.archivo,))
+        conn.execute(f"PRAGMA {schema.ARCHIVO}.synchronous = NORMAL")
 
     def connect(self):
+        """Abre ya la conexión (y verifica el esquema) en lugar de esperar a la primera operación."""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
-            logging.info(f"Conexión a la base de datos {self.db_name} establecida.")
+            self.pool.writer
         except sqlite3.Error as e:
-            logging.error(f"Error al conectar a la base de datos: {e}")
+            logger.error("Error al conectar a la base de datos: %s", e)
             print(f"Error al conectar a la base de datos: {e}")
 
+    @property
+    def conn(self):
+        """Conexión escritora. Preferir execute()/fetchall() o transaction(), que son seguros entre hilos."""
+        return self.pool.writer
+
     def close_connection(self):
-        if self.conn:
-            self.conn.close()
-            logging.info(f"Conexión a la base de datos {self.db_name} cerrada.")
+        self.pool.close_all()
+        logger.info("Conexión a la base de datos %s cerrada.", self.db_name)
+
+    # --- Ejecución de sentencias (lectores del pool / escritor serializado) ---
+    # Todas las sentencias pasan por aquí, así los hooks de instrumentación las ven todas.
+    def add_query_hook(self, hook):
+        self._query_hooks.append(hook)
+
+    def _notify(self, sql, params, inicio, filas, conn):
+        self._notify_ms(sql, params, (time.perf_counter() - inicio) * 1000, filas, conn)
+
+    def _notify_ms(self, sql, params, elapsed_ms, filas, conn):
+        for hook in self._query_hooks:
+            hook(sql, params, elapsed_ms, filas, conn)
+
+    def fetchone(self, sql, params=()):
+        with self.pool.reading() as conn:
+            inicio = time.perf_counter()
+            row = conn.execute(sql, params).fetchone()
+            self._notify(sql, params, inicio, 1 if row else 0, conn)
+            return row
+
+    def fetchall(self, sql, params=()):
+        with self.pool.reading() as conn:
+            inicio = time.perf_counter()
+            rows = conn.execute(sql, params).fetchall()
+            self._notify(sql, params, inicio, len(rows), conn)
+            return rows
+
+    def iter_rows(self, sql, params=(), batch_size=1000):
+        """
+        Genera las filas de una consulta leyendo `batch_size` por vez (fetchmany), sin
+        materializar el resultado. Retiene una conexión lectora hasta agotar o cerrar el generador.
+        El tiempo registrado es el de execute y fetchmany, sin el que el consumidor tarda con cada lote.
+        """
+        with self.pool.reading() as conn:
+            inicio = time.perf_counter()
+            cursor = conn.execute(sql, params)
+            transcurrido = time.perf_counter() - inicio
+            filas = 0
+            try:
+                while True:
+                    inicio = time.perf_counter()
+                    lote = cursor.fetchmany(batch_size)
+                    transcurrido += time.perf_counter() - inicio
+                    if not lote:
+                        break
+                    filas += len(lote)
+                    yield from lote
+            finally:
+                cursor.close()
+                self._notify_ms(sql, params, transcurrido * 1000, filas, conn)
+
+    def fetchall_snapshot(self, sentencias):
+        """
+        Ejecuta varias consultas [(sql, params)] sobre la misma instantánea de la base (una
+        transacción de lectura en una sola conexión) y devuelve la lista de filas de cada una:
+        una escritura de otro hilo no puede quedar a medias entre una consulta y la siguiente.
+        """
+        with self.pool.reading() as conn:
+            propia = not conn.in_transaction  # Dentro de transaction() ya se lee su propia instantánea
+            if propia:
+                conn.execute("BEGIN")
+            try:
+                resultados = []
+                for sql, params in sentencias:
+                    inicio = time.perf_counter()
+                    rows = conn.execute(sql, params).fetchall()
+                    self._notify(sql, params, inicio, len(rows), conn)
+                    resultados.append(rows)
+                return resultados
+            finally:
+                if propia:
+                    conn.rollback()
+
+    def execute(self, sql, params=()):
+        """Ejecuta una escritura y devuelve el cursor (lastrowid, rowcount). Confirma salvo dentro de transaction()."""
+        return self._write(sql, params, lambda conn: conn.execute(sql, params))
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        primeros = seq_of_params[0] if seq_of_params else ()
+        return self._write(sql, primeros, lambda conn: conn.executemany(sql, seq_of_params))
+
+    def _write(self, sql, params, operacion):
+        with self.pool.writing() as conn:
+            inicio = time.perf_counter()
+            try:
+                cursor = operacion(conn)
+                self._commit()
+            except sqlite3.Error:
+                if not self.in_transaction:
+                    conn.rollback()
+                raise
+            self._notify(sql, params, inicio, cursor.rowcount, conn)
+            return cursor
+
+    @staticmethod
+    def _log_operacion(operacion, entidad_id, inicio, mensaje, *args):
+        """Registro estructurado (operacion, entidad_id, duracion_ms) de una escritura."""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(mensaje, *args, extra={
+                "operacion": operacion,
+                "entidad_id": entidad_id,
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            })
+
+    # --- Transacciones ---
+    @property
+    def _tx_rollback(self):
+        """Un indicador de rollback por cada nivel de transacción abierto en este hilo."""
+        pila = getattr(self._local, "tx_rollback", None)
+        if pila is None:
+            pila = self._local.tx_rollback = []
+        return pila
+
+    @property
+    def _confirmaciones(self):
+        """Acciones de _al_confirmar() pendientes del commit de la transacción de este hilo."""
+        pendientes = getattr(self._local, "confirmaciones", None)
+        if pendientes is None:
+            pendientes = self._local.confirmaciones = []
+        return pendientes
+
+    @property
+    def in_transaction(self):
+        return bool(self._tx_rollback)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa varias operaciones en una sola transacción (un único commit).
+        Dentro del bloque los métodos CRUD no confirman por su cuenta. Los bloques
+        anidados usan SAVEPOINT, de modo que pueden deshacerse sin afectar al exterior.
+        Si el bloque lanza una excepción, o se llama a set_rollback(), se deshace.
+        El hilo conserva la conexión escritora durante todo el bloque.
+
+        La transacción exterior empieza con BEGIN IMMEDIATE: toma el bloqueo de escritura
+        de entrada (esperando hasta busy_timeout si otro proceso escribe). Con un BEGIN
+        diferido, un bloque que lee y después escribe partiría de una instantánea de
+        lectura, y si otro proceso confirma entremedio la escritura falla en el acto con
+        "database is locked" (SQLITE_BUSY_SNAPSHOT), sin pasar por busy_timeout.
+        """
+        with self.pool.writing() as conn:
+            pila = self._tx_rollback
+            nivel = len(pila)
+            savepoint = f"sp_{nivel}" if nivel else None
+            if savepoint:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            elif not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            pila.append(False)
+            confirmaciones = self._confirmaciones
+            marca = len(confirmaciones)
+            confirmada = False
+            try:
+                yield self
+            except BaseException:
+                pila.pop()
+                del confirmaciones[marca:]
+                self._end_transaction(conn, savepoint, commit=False)
+                raise
+            else:
+                commit = not pila.pop()
+                if not commit:
+                    del confirmaciones[marca:]
+                self._end_transaction(conn, savepoint, commit=commit)
+                confirmada = True
+            finally:
+                if not pila:
+                    self._aplicar_invalidaciones_pendientes()
+                    self._aplicar_confirmaciones(confirmada)
+
+    def _end_transaction(self, conn, savepoint, commit):
+        if savepoint is None:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+                logger.info("Transacción deshecha.")
+        else:
+            if not commit:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+
+    def _al_confirmar(self, accion):
+        """
+        Ejecuta `accion()` cuando los cambios ya están confirmados: en seguida fuera de una
+        transacción, o tras el commit final dentro de ella. Si la transacción (o el
+        savepoint en que se registró) se deshace, no se ejecuta.
+        """
+        if self.in_transaction:
+            self._confirmaciones.append(accion)
+        else:
+            accion()
+
+    def _aplicar_confirmaciones(self, confirmada):
+        pendientes = self._confirmaciones[:]
+        self._local.confirmaciones = None
+        if confirmada:
+            for accion in pendientes:
+                accion()
+
+    def set_rollback(self):
+        """Marca la transacción (o savepoint) más interna para deshacerse al salir del bloque."""
+        if not self._tx_rollback:
+            raise RuntimeError("set_rollback() solo puede usarse dentro de transaction().")
+        self._tx_rollback[-1] = True
+
+    def _commit(self):
+        """Confirma los cambios, salvo que haya una transacción abierta que lo haga al final."""
+        if not self._tx_rollback:
+            self.pool.writer.commit()
+
+    # --- Caché de entidades ---
+    def _cached_get(self, cache, entidad_id, cargar):
+        """Devuelve una copia de la entidad cacheada o la carga con `cargar(id)` y la guarda."""
+        entidad = cache.get(entidad_id)
+        if entidad is not None:
+            return copy.copy(entidad)
+        generacion = cache.generation
+        entidad = cargar(entidad_id)
+        # Dentro de una transacción los datos aún pueden deshacerse: no se cachean
+        if entidad is not None and not self.in_transaction:
+            cache.put(entidad_id, copy.copy(entidad), generacion)
+        return entidad
+
+    def _invalidar(self, invalidacion):
+        """
+        Ejecuta `invalidacion()` ya y, dentro de una transacción, otra vez al terminarla:
+        así no sobrevive una lectura de otro hilo hecha antes del commit.
+        """
+        invalidacion()
+        if self.in_transaction:
+            pendientes = getattr(self._local, "invalidaciones", None)
+            if pendientes is None:
+                pendientes = self._local.invalidaciones = []
+            pendientes.append(invalidacion)
+
+    def _aplicar_invalidaciones_pendientes(self):
+        pendientes = getattr(self._local, "invalidaciones", None)
+        self._local.invalidaciones = None
+        for invalidacion in pendientes or ():
+            invalidacion()
+
+    def _invalidar_propietario(self, propietario_id, mascota_ids=()):
+        """Invalida un propietario, sus mascotas (guardan su nombre) y las consultas de `mascota_ids`."""
+        mascota_ids = set(mascota_ids)
+        def invalidacion():
+            self.cache_propietarios.invalidate(propietario_id)
+            self.cache_mascotas.invalidate_where(lambda m: m.propietario_id == propietario_id or m.id in mascota_ids)
+            if mascota_ids:
+                self.cache_consultas.invalidate_where(lambda c: c.mascota_id in mascota_ids)
+        self._invalidar(invalidacion)
+
+    def _invalidar_mascota(self, mascota_id):
+        """Invalida una mascota y sus consultas (guardan el nombre de la mascota)."""
+        def invalidacion():
+            self.cache_mascotas.invalidate(mascota_id)
+            self.cache_consultas.invalidate_where(lambda c: c.mascota_id == mascota_id)
+        self._invalidar(invalidacion)
+
+    def _invalidar_ids(self, tabla, ids, mascota_ids=()):
+        """
+        Invalidación en bloque tras update_many/delete_many (una pasada por caché, no una por
+        ID). `mascota_ids` son las mascotas de los propietarios `ids` que borró el cascade.
+        """
+        ids = set(ids)
+        mascota_ids = set(mascota_ids)
+        def invalidacion():
+            if tabla == "propietarios":
+                self.cache_propietarios.invalidate_where(lambda p: p.id in ids)
+                self.cache_mascotas.invalidate_where(lambda m: m.propietario_id in ids)
+                if mascota_ids:
+                    self.cache_consultas.invalidate_where(lambda c: c.mascota_id in mascota_ids)
+            elif tabla == "mascotas":
+                self.cache_mascotas.invalidate_where(lambda m: m.id in ids)
+                self.cache_consultas.invalidate_where(lambda c: c.mascota_id in ids)
+            else:
+                self.cache_consultas.invalidate_where(lambda c: c.id in ids)
+        self._invalidar(invalidacion)
+
+    def _invalidar_consulta(self, consulta_id):
+        self._invalidar(lambda: self.cache_consultas.invalidate(consulta_id))
+
+    def clear_cache(self):
+        for cache in (self.cache_propietarios, self.cache_mascotas, self.cache_consultas):
+            cache.clear()
+        with self._indice_lock:
+            self._indice_propietarios = None
+
+    def cache_stats(self):
+        """Aciertos, fallos y ocupación de cada caché, para dimensionarlas."""
+        return {
+            "propietarios": self.cache_propietarios.stats(),
+            "mascotas": self.cache_mascotas.stats(),
+            "consultas": self.cache_consultas.stats(),
+        }
 
     def create_tables(self):
+        """Crea o actualiza el esquema. Si ya está en la versión actual no ejecuta DDL."""
         try:
-            self.cursor.execute("PRAGMA foreign_keys = ON;") # Habilita la integridad referencial
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS propietarios (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT NOT NULL UNIQUE,
-                    telefono TEXT,
-                    direccion TEXT
-                )
-            """)
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS mascotas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT NOT NULL,
-                    especie TEXT,
-                    raza TEXT,
-                    edad INTEGER,
-                    id_propietario INTEGER,
-                    FOREIGN KEY (id_propietario) REFERENCES propietarios(id) ON DELETE CASCADE
-                )
-            """)
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS consultas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    fecha TEXT NOT NULL,
-                    motivo TEXT,
-                    diagnostico TEXT,
-                    id_mascota INTEGER,
-                    FOREIGN KEY (id_mascota) REFERENCES mascotas(id) ON DELETE CASCADE
-                )
-            """)
-            self.conn.commit()
-            logging.info("Tablas creadas o ya existentes.")
+            with self.pool.writing() as conn:
+                aplicadas = schema.migrate(conn)
+            if aplicadas:
+                self.migraciones_aplicadas = aplicadas
+                logger.info("Esquema actualizado a la versión %s (%s migraciones).", schema.SCHEMA_VERSION, aplicadas)
         except sqlite3.Error as e:
-            logging.error(f"Error al crear tablas: {e}")
+            logger.error("Error al crear tablas: %s", e)
             print(f"Error al crear tablas: {e}")
 
     # --- CRUD Propietario (Sin cambios) ---
     def insert_propietario(self, propietario):
+        inicio = time.perf_counter()
         try:
-            self.cursor.execute(
+            cursor = self.execute(
                 "INSERT INTO propietarios (nombre, telefono, direccion) VALUES (?, ?, ?)",
                 (propietario.nombre, propietario.telefono, propietario.direccion)
             )
-            self.conn.commit()
-            propietario.id = self.cursor.lastrowid
-            logging.info(f"Propietario '{propietario.nombre}' insertado con ID: {propietario.id}")
+            propietario.id = cursor.lastrowid
+            self._sincronizar_indice(1, lambda indice, i=propietario.id, n=propietario.nombre: indice.add(i, n))
+            self._log_operacion("insert_propietario", propietario.id, inicio,
+                                "Propietario '%s' insertado con ID: %s", propietario.nombre, propietario.id)
             return propietario
         except sqlite3.IntegrityError:
-            logging.warning(f"Intento de insertar propietario duplicado: {propietario.nombre}")
+            logger.warning("Intento de insertar propietario duplicado: %s", propietario.nombre)
             return None
         except sqlite3.Error as e:
-            logging.error(f"Error al insertar propietario: {e}")
+            logger.error("Error al insertar propietario: %s", e)
             return None
 
     def get_propietario_by_nombre(self, nombre):
         try:
-            self.cursor.execute("SELECT id, nombre, telefono, direccion FROM propietarios WHERE nombre LIKE ?", (nombre,))
-            row = self.cursor.fetchone()
-            return Propietario(row[1], row[2], row[3], row[0]) if row else None
+            row = self.fetchone("SELECT id, nombre, telefono, direccion FROM propietarios WHERE nombre LIKE ?", (nombre,))
+            return Propietario.from_row(row) if row else None
         except sqlite3.Error as e:
-            logging.error(f"Error al buscar propietario por nombre: {e}")
+            logger.error("Error al buscar propietario por nombre: %s", e)
             return None
 
+    def search_propietarios(self, texto, limit=5, umbral=0.6):
+        """
+        Propietarios con nombre parecido a `texto` sin importar tildes, mayúsculas ni errores
+        de tipeo ("Jose Perez" encuentra a "José Pérez"), como [(propietario, similitud)] de
+        mayor a menor similitud (1.0 es el mismo nombre). Ver name_index.py.
+        """
+        try:
+            parecidos = self._indice_al_dia().search(texto, limit, umbral)
+            if not parecidos:
+                return []
+            rows = self.fetchall(
+                "SELECT id, nombre, telefono, direccion FROM propietarios WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps([propietario_id for propietario_id, _, _ in parecidos]),))
+        except sqlite3.Error as e:
+            logger.error("Error al buscar propietarios parecidos a '%s': %s", texto, e)
+            return []
+        propietarios = {row[0]: Propietario.from_row(row) for row in rows}
+        return [(propietarios[propietario_id], similitud)
+                for propietario_id, _, similitud in parecidos if propietario_id in propietarios]
+
+    def _indice_al_dia(self):
+        """
+        Índice de nombres de propietarios. Las escrituras de este manager lo actualizan al
+        confirmarse (_sincronizar_indice); si la versión de `cambios` no es la esperada,
+        otro proceso (u otra vía, como una importación masiva) cambió los propietarios y se
+        reconstruye.
+
+        Dentro de transaction() las lecturas ven cambios sin confirmar, así que no se compara
+        ni se guarda su versión: se usa el índice ya construido (que no incluye lo escrito en
+        la transacción) o, si aún no hay, uno provisorio que no se conserva.
+        """
+        with self._indice_lock:
+            indice, version_indice = self._indice_propietarios, self._indice_version
+        if self.in_transaction:
+            return indice if indice is not None else self._construir_indice()[0]
+        version = self.fetchone("SELECT version FROM cambios WHERE tabla = 'propietarios'")[0]
+        if indice is not None and version == version_indice:
+            return indice
+        # Se construye sin el candado, para no frenar a las escrituras que sincronizan el
+        # índice al confirmar (y retienen mientras tanto la conexión escritora)
+        indice, version = self._construir_indice()
+        with self._indice_lock:
+            self._indice_propietarios, self._indice_version = indice, version
+        return indice
+
+    def _construir_indice(self):
+        """(índice, versión de `cambios`) leídos de la misma instantánea de la base."""
+        inicio = time.perf_counter()
+        version, nombres = self.fetchall_snapshot([
+            ("SELECT version FROM cambios WHERE tabla = 'propietarios'", ()),
+            ("SELECT id, nombre FROM propietarios", ()),
+        ])
+        indice = NameIndex()
+        for propietario_id, nombre in nombres:
+            indice.add(propietario_id, nombre)
+        logger.info("Índice de nombres de propietarios construido (%s nombres).", len(indice), extra={
+            "operacion": "indice_propietarios",
+            "filas": len(indice),
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3),
+        })
+        return indice, version[0][0]
+
+    def _sincronizar_indice(self, filas, cambio=None):
+        """
+        Tras el commit aplica `cambio(indice)` al índice de nombres y suma `filas` (las que
+        contaron los triggers de `cambios`) a su versión. Sin `cambio` solo suma: para
+        escrituras que no tocan los nombres.
+        """
+        def aplicar():
+            with self._indice_lock:
+                if self._indice_propietarios is not None:
+                    if cambio:
+                        cambio(self._indice_propietarios)
+                    self._indice_version += filas
+        if filas:
+            self._al_confirmar(aplicar)
+
     def get_propietario_by_id(self, propietario_id):
+        return self._cached_get(self.cache_propietarios, propietario_id, self._load_propietario)
+
+    def _load_propietario(self, propietario_id):
         try:
-            self.cursor.execute("SELECT id, nombre, telefono, direccion FROM propietarios WHERE id = ?", (propietario_id,))
-            row = self.cursor.fetchone()
-            return Propietario(row[1], row[2], row[3], row[0]) if row else None
+            row = self.fetchone("SELECT id, nombre, telefono, direccion FROM propietarios WHERE id = ?", (propietario_id,))
+            return Propietario.from_row(row) if row else None
         except sqlite3.Error as e:
-            logging.error(f"Error al buscar propietario por ID: {e}")
+            logger.error("Error al buscar propietario por ID: %s", e)
             return None
 
     def get_all_propietarios(self):
         try:
-            self.cursor.execute("SELECT id, nombre, telefono, direccion FROM propietarios")
-            rows = self.cursor.fetchall()
-            return [Propietario(row[1], row[2], row[3], row[0]) for row in rows]
+            rows = self.fetchall("SELECT id, nombre, telefono, direccion FROM propietarios")
+            return list(map(Propietario.from_row, rows))
         except sqlite3.Error as e:
-            logging.error(f"Error al obtener todos los propietarios: {e}")
+            logger.error("Error al obtener todos los propietarios: %s", e)
             return []
 
-    def update_propietario(self, propietario_id, new_data):
+    def get_propietarios_page(self, after_id=0, limit=100):
+        """Devuelve hasta `limit` propietarios con ID mayor que `after_id` (paginación por clave)."""
         try:
-            set_clause = ", ".join([f"{k} = ?" for k in new_data.keys()])
-            values = list(new_data.values())
-            values.append(propietario_id)
-            self.cursor.execute(f"UPDATE propietarios SET {set_clause} WHERE id = ?", tuple(values))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            rows = self.fetchall(
+                "SELECT id, nombre, telefono, direccion FROM propietarios WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            )
+            return list(map(Propietario.from_row, rows))
         except sqlite3.Error as e:
-            logging.error(f"Error al actualizar propietario: {e}")
+            logger.error("Error al obtener página de propietarios: %s", e)
+            return []
+
+    def iter_propietarios(self, page_size=500):
+        """Recorre todos los propietarios por páginas, con memoria constante."""
+        return self._iter_pages(self.get_propietarios_page, page_size)
+
+    def update_propietario(self, propietario_id, new_data):
+        inicio = time.perf_counter()
+        try:
+            if not new_data:
+                return True  # No hay nada que actualizar
+            cursor = self.execute(*_preparar_update("propietarios", propietario_id, new_data))
+            self._invalidar_propietario(propietario_id)
+            if cursor.rowcount and "nombre" in new_data:
+                nombre = new_data["nombre"]
+                self._sincronizar_indice(cursor.rowcount, lambda indice: indice.add(propietario_id, nombre))
+            else:
+                self._sincronizar_indice(cursor.rowcount)
+            if cursor.rowcount:
+                self._log_operacion("update_propietario", propietario_id, inicio, "Propietario ID %s actualizado.", propietario_id)
+            return cursor.rowcount > 0
+        except (sqlite3.Error, ValueError) as e:
+            logger.error("Error al actualizar propietario: %s", e)
             return False
 
     def delete_propietario(self, propietario_id):
+        inicio = time.perf_counter()
         try:
-            self.cursor.execute("DELETE FROM propietarios WHERE id = ?", (propietario_id,))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            with self.transaction():
+                # ON DELETE CASCADE borra también sus mascotas y las consultas de éstas
+                mascota_ids = [row[0] for row in self.fetchall(
+                    "SELECT id FROM mascotas WHERE id_propietario = ?", (propietario_id,))]
+                cursor = self.execute("DELETE FROM propietarios WHERE id = ?", (propietario_id,))
+                self._invalidar_propietario(propietario_id, mascota_ids)
+                self._sincronizar_indice(cursor.rowcount, lambda indice: indice.remove(propietario_id))
+            if cursor.rowcount:
+                self._log_operacion("delete_propietario", propietario_id, inicio, "Propietario ID %s eliminado.", propietario_id)
+            return cursor.rowcount > 0
         except sqlite3.Error as e:
-            logging.error(f"Error al eliminar propietario: {e}")
+            logger.error("Error al eliminar propietario: %s", e)
             return False
 
     # --- CRUD Mascota (Sin cambios) ---
     def insert_mascota(self, mascota):
+        inicio = time.perf_counter()
         try:
-            self.cursor.execute(
+            cursor = self.execute(
                 "INSERT INTO mascotas (nombre, especie, raza, edad, id_propietario) VALUES (?, ?, ?, ?, ?)",
                 (mascota.nombre, mascota.especie, mascota.raza, mascota.edad, mascota.propietario_id)
             )
-            self.conn.commit()
-            mascota.id = self.cursor.lastrowid
-            logging.info(f"Mascota '{mascota.nombre}' insertada con ID: {mascota.id}")
+            mascota.id = cursor.lastrowid
+            self._log_operacion("insert_mascota", mascota.id, inicio,
+                                "Mascota '%s' insertada con ID: %s", mascota.nombre, mascota.id)
             return mascota
         except sqlite3.Error as e:
-            logging.error(f"Error al insertar mascota: {e}")
+            logger.error("Error al insertar mascota: %s", e)
             return None
 
     def get_all_mascotas(self):
         try:
-            self.cursor.execute("""
+            rows = self.fetchall("""
                 SELECT m.id, m.nombre, m.especie, m.raza, m.edad, m.id_propietario, p.nombre
                 FROM mascotas m
                 JOIN propietarios p ON m.id_propietario = p.id
             """)
-            rows = self.cursor.fetchall()
-            return [Mascota(row[1], row[2], row[3], row[4], row[5], row[0], row[6]) for row in rows]
+            return list(map(Mascota.from_row, rows))
+        except sqlite3.Error as e:
+            logger.error("Error al obtener todas las mascotas: %s", e)
+            return []
+
+    def get_mascotas_page(self, after_id=0, limit=100):
+        """Devuelve hasta `limit` mascotas con ID mayor que `after_id` (paginación por clave)."""
+        try:
+            rows = self.fetchall("""
+                SELECT m.id, m.nombre, m.especie, m.raza, m.edad, m.id_propietario, p.nombre
+                FROM mascotas m
+                JOIN propietarios p ON m.id_propietario = p.id
+                WHERE m.id > ?
+                ORDER BY m.id
+                LIMIT ?
+            """, (after_id, limit))
+            return list(map(Mascota.from_row, rows))
         except sqlite3.Error as e:
-            logging.error(f"Error al obtener todas las mascotas: {e}")
+            logger.error("Error al obtener página de mascotas: %s", e)
             return []
 
+    def iter_mascotas(self, page_size=500):
+        """Recorre todas las mascotas por páginas, con memoria constante."""
+        return self._iter_pages(self.get_mascotas_page, page_size)
+
+    @staticmethod
+    def _iter_pages(get_page, page_size):
+        # Cada página usa su propia lectura corta: no se mantiene abierta una
+        # instantánea de lectura mientras el llamador procesa los resultados.
+        after_id = 0
+        while True:
+            page = get_page(after_id, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
     def get_mascota_by_id(self, mascota_id):
+        return self._cached_get(self.cache_mascotas, mascota_id, self._load_mascota)
+
+    def _load_mascota(self, mascota_id):
         try:
-            self.cursor.execute("""
+            row = self.fetchone("""
                 SELECT m.id, m.nombre, m.especie, m.raza, m.edad, m.id_propietario, p.nombre
                 FROM mascotas m
                 JOIN propietarios p ON m.id_propietario = p.id
                 WHERE m.id = ?
             """, (mascota_id,))
-            row = self.cursor.fetchone()
-            return Mascota(row[1], row[2], row[3], row[4], row[5], row[0], row[6]) if row else None
+            return Mascota.from_row(row) if row else None
         except sqlite3.Error as e:
-            logging.error(f"Error al buscar mascota por ID: {e}")
+            logger.error("Error al buscar mascota por ID: %s", e)
             return None
 
     def update_mascota(self, mascota_id, new_data):
+        inicio = time.perf_counter()
         try:
-            set_clause = ", ".join([f"{k} = ?" for k in new_data.keys()])
-            values = list(new_data.values())
-            values.append(mascota_id)
-            self.cursor.execute(f"UPDATE mascotas SET {set_clause} WHERE id = ?", tuple(values))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
-        except sqlite3.Error as e:
-            logging.error(f"Error al actualizar mascota: {e}")
+            if not new_data:
+                return True  # No hay nada que actualizar
+            cursor = self.execute(*_preparar_update("mascotas", mascota_id, new_data))
+            self._invalidar_mascota(mascota_id)
+            if cursor.rowcount:
+                self._log_operacion("update_mascota", mascota_id, inicio, "Mascota ID %s actualizada.", mascota_id)
+            return cursor.rowcount > 0
+        except (sqlite3.Error, ValueError) as e:
+            logger.error("Error al actualizar mascota: %s", e)
             return False
 
     def delete_mascota(self, mascota_id):
+        inicio = time.perf_counter()
         try:
-            self.cursor.execute("DELETE FROM mascotas WHERE id = ?", (mascota_id,))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            cursor = self.execute("DELETE FROM mascotas WHERE id = ?", (mascota_id,))
+            self._invalidar_mascota(mascota_id)
+            if cursor.rowcount:
+                self._log_operacion("delete_mascota", mascota_id, inicio, "Mascota ID %s eliminada.", mascota_id)
+            return cursor.rowcount > 0
         except sqlite3.Error as e:
-            logging.error(f"Error al eliminar mascota: {e}")
+            logger.error("Error al eliminar mascota: %s", e)
             return False
 
     # --- CRUD Consulta (Con correcciones) ---
     def insert_consulta(self, consulta):
+        inicio = time.perf_counter()
         try:
-            self.cursor.execute(
+            cursor = self.execute(
                 "INSERT INTO consultas (fecha, motivo, diagnostico, id_mascota) VALUES (?, ?, ?, ?)",
                 (consulta.fecha.strftime("%Y-%m-%d"), consulta.motivo, consulta.diagnostico, consulta.mascota_id)
             )
-            self.conn.commit()
-            consulta.id = self.cursor.lastrowid
-            logging.info(f"Consulta para mascota ID {consulta.mascota_id} registrada con ID: {consulta.id}")
+            consulta.id = cursor.lastrowid
+            self._log_operacion("insert_consulta", consulta.id, inicio,
+                                "Consulta para mascota ID %s registrada con ID: %s", consulta.mascota_id, consulta.id)
             return consulta
         except sqlite3.Error as e:
-            logging.error(f"Error al insertar consulta: {e}")
+            logger.error("Error al insertar consulta: %s", e)
             return None
 
-    def get_consultas_by_mascota_id(self, mascota_id):
+    def get_consultas_by_mascota_id(self, mascota_id, historial_completo=False):
+        """
+        Historial de la mascota, de la consulta más reciente a la más antigua. Con
+        `historial_completo` (y una base de archivo configurada) incluye las archivadas.
+        """
         try:
-            self.cursor.execute("""
+            if historial_completo and self.archivo:
+                # Una consulta copiada al archivo pero aún no borrada de la principal
+                # (archivado interrumpido) aparece una sola vez
+                rows = self.fetchall("""
+                    SELECT c.id, c.fecha, c.motivo, c.diagnostico, c.id_mascota, m.nombre
+                    FROM (
+                        SELECT id, fecha, motivo, diagnostico, id_mascota FROM consultas WHERE id_mascota = ?
+                        UNION ALL
+                        SELECT id, fecha, motivo, diagnostico, id_mascota FROM consultas_archivo
+                        WHERE id_mascota = ? AND id NOT IN (SELECT id FROM consultas WHERE id_mascota = ?)
+                    ) c
+                    JOIN mascotas m ON c.id_mascota = m.id
+                    ORDER BY c.fecha DESC
+                """, (mascota_id, mascota_id, mascota_id))
+                return list(map(Consulta.from_row, rows))
+            rows = self.fetchall("""
                 SELECT c.id, c.fecha, c.motivo, c.diagnostico, c.id_mascota, m.nombre
                 FROM consultas c
                 JOIN mascotas m ON c.id_mascota = m.id
                 WHERE c.id_mascota = ?
                 ORDER BY c.fecha DESC
             """, (mascota_id,))
-            rows = self.cursor.fetchall()
-            return [Consulta(row[1], row[2], row[3], row[4], row[0], row[5]) for row in rows]
+            return list(map(Consulta.from_row, rows))
         except sqlite3.Error as e:
-            logging.error(f"Error al obtener consultas por ID de mascota: {e}")
+            logger.error("Error al obtener consultas por ID de mascota: %s", e)
             return []
 
-    def get_consulta_by_id(self, consulta_id):
+    def get_consultas_page_by_mascota_id(self, mascota_id, before=None, limit=50):
+        """
+        Página del historial de una mascota, de la más reciente a la más antigua.
+        `before` es la clave (fecha 'YYYY-MM-DD', id) de la última consulta de la página anterior.
+        """
+        fecha, consulta_id = before if before else (None, None)
+        try:
+            rows = self.fetchall("""
+                SELECT c.id, c.fecha, c.motivo, c.diagnostico, c.id_mascota, m.nombre
+                FROM consultas c
+                JOIN mascotas m ON c.id_mascota = m.id
+                WHERE c.id_mascota = ?
+                  AND (? IS NULL OR (c.fecha, c.id) < (?, ?))
+                ORDER BY c.fecha DESC, c.id DESC
+                LIMIT ?
+            """, (mascota_id, fecha, fecha, consulta_id, limit))
+            return list(map(Consulta.from_row, rows))
+        except sqlite3.Error as e:
+            logger.error("Error al obtener página de consultas de la mascota %s: %s", mascota_id, e)
+            return []
+
+    def get_consulta_by_id(self, consulta_id, historial_completo=False):
+        """Consulta por ID; con `historial_completo` también la busca entre las archivadas."""
+        consulta = self._cached_get(self.cache_consultas, consulta_id, self._load_consulta)
+        if consulta is None and historial_completo and self.archivo:
+            # No se cachea: la caché solo guarda consultas de la base principal
+            consulta = self._load_consulta_archivada(consulta_id)
+        return consulta
+
+    def _load_consulta(self, consulta_id):
         try:
-            self.cursor.execute("""
+            row = self.fetchone("""
                 SELECT c.id, c.fecha, c.motivo, c.diagnostico, c.id_mascota, m.nombre
                 FROM consultas c
                 JOIN mascotas m ON c.id_mascota = m.id
                 WHERE c.id = ?
             """, (consulta_id,))
-            row = self.cursor.fetchone()
-            return Consulta(row[1], row[2], row[3], row[4], row[0], row[5]) if row else None
+            return Consulta.from_row(row) if row else None
         except sqlite3.Error as e:
-            logging.error(f"Error al buscar consulta por ID: {e}")
+            logger.error("Error al buscar consulta por ID: %s", e)
+            return None
+
+    def _load_consulta_archivada(self, consulta_id):
+        try:
+            row = self.fetchone("""
+                SELECT a.id, a.fecha, a.motivo, a.diagnostico, a.id_mascota, m.nombre
+                FROM consultas_archivo a
+                JOIN mascotas m ON a.id_mascota = m.id
+                WHERE a.id = ?
+            """, (consulta_id,))
+            return Consulta.from_row(row) if row else None
+        except sqlite3.Error as e:
+            logger.error("Error al buscar consulta archivada por ID: %s", e)
             return None
 
     def update_consulta(self, consulta_id, new_data):
         """
         ✅ CORREGIDO: Actualiza una consulta de forma segura.
         """
+        inicio = time.perf_counter()
         try:
-            # No se modifica el diccionario original, se construye la consulta de forma segura
-            fields_to_update = []
-            values = []
-            for key, value in new_data.items():
-                fields_to_update.append(f"{key} = ?")
-                # Se asegura que la fecha se formatee a texto si es un objeto 'date'
-                if key == 'fecha' and isinstance(value, date):
-                    values.append(value.strftime("%Y-%m-%d"))
-                else:
-                    values.append(value)
-            
-            if not fields_to_update:
+            if not new_data:
                 return True # No hay nada que actualizar
 
-            set_clause = ", ".join(fields_to_update)
-            sql_query = f"UPDATE consultas SET {set_clause} WHERE id = ?"
-            values.append(consulta_id)
+            # Solo columnas permitidas; la fecha (date) se guarda como texto 'YYYY-MM-DD'
+            cursor = self.execute(*_preparar_update("consultas", consulta_id, new_data)) # Confirma, salvo dentro de transaction()
+            self._invalidar_consulta(consulta_id)
+            if cursor.rowcount:
+                self._log_operacion("update_consulta", consulta_id, inicio, "Consulta ID %s actualizada.", consulta_id)
 
-            self.cursor.execute(sql_query, tuple(values))
-            self.conn.commit() # Confirma la transacción
-            
-            return self.cursor.rowcount > 0
-        except sqlite3.Error as e:
-            logging.error(f"Error al actualizar consulta: {e}")
+            return cursor.rowcount > 0
+        except (sqlite3.Error, ValueError) as e:
+            logger.error("Error al actualizar consulta: %s", e)
             return False
 
     def delete_consulta(self, consulta_id):
         """
         ✅ CORREGIDO: Elimina una consulta y asegura que se guarde el cambio.
         """
+        inicio = time.perf_counter()
+        try:
+            cursor = self.execute("DELETE FROM consultas WHERE id = ?", (consulta_id,)) # Confirma, salvo dentro de transaction()
+            self._invalidar_consulta(consulta_id)
+            if cursor.rowcount:
+                self._log_operacion("delete_consulta", consulta_id, inicio, "Consulta ID %s eliminada.", consulta_id)
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error("Error al eliminar consulta: %s", e)
+            return False
+
+    # --- Expediente de un propietario ---
+    def get_expediente_propietario(self, propietario_id, ultimas_consultas=None, historial_completo=False):
+        """
+        Propietario con todas sus mascotas y las consultas de cada una, como Expediente, en
+        tres consultas fijas (propietario, mascotas, consultas) sin importar cuántas mascotas
+        tenga, todas sobre la misma instantánea. Con `ultimas_consultas` trae solo las N más
+        recientes de cada mascota (ExpedienteMascota.total_consultas sigue contando todas).
+        Con `historial_completo` incluye las archivadas. None si el propietario no existe.
+        """
+        if ultimas_consultas is not None and ultimas_consultas < 1:
+            raise ValueError("ultimas_consultas debe ser mayor que cero")
+        archivadas = ""
+        if historial_completo and self.archivo:
+            archivadas = """
+                UNION ALL
+                SELECT a.id, a.fecha, a.motivo, a.diagnostico, a.id_mascota FROM consultas_archivo a
+                WHERE a.id_mascota IN (SELECT id FROM sus_mascotas)
+                  AND NOT EXISTS (SELECT 1 FROM consultas c WHERE c.id = a.id)
+            """
+        parametros = {"id": propietario_id, "limite": ultimas_consultas}
+        try:
+            propietarios, mascotas, consultas = self.fetchall_snapshot([
+                ("SELECT id, nombre, telefono, direccion FROM propietarios WHERE id = :id", parametros),
+                ("""
+                    SELECT m.id, m.nombre, m.especie, m.raza, m.edad, m.id_propietario, p.nombre
+                    FROM mascotas m
+                    JOIN propietarios p ON m.id_propietario = p.id
+                    WHERE m.id_propietario = :id
+                    ORDER BY m.id
+                """, parametros),
+                # La ventana numera las consultas de cada mascota de la más reciente a la más
+                # antigua (idx_consultas_mascota_fecha) y el límite se aplica por mascota
+                (f"""
+                    WITH sus_mascotas AS (
+                        SELECT id, nombre FROM mascotas WHERE id_propietario = :id
+                    ), historial AS (
+                        SELECT id, fecha, motivo, diagnostico, id_mascota FROM consultas
+                        WHERE id_mascota IN (SELECT id FROM sus_mascotas)
+                        {archivadas}
+                    ), numeradas AS (
+                        SELECT *,
+                               ROW_NUMBER() OVER (PARTITION BY id_mascota ORDER BY fecha DESC, id DESC) AS orden,
+                               COUNT(*) OVER (PARTITION BY id_mascota) AS total
+                        FROM historial
+                    )
+                    SELECT n.id, n.fecha, n.motivo, n.diagnostico, n.id_mascota, m.nombre, n.total
+                    FROM numeradas n
+                    JOIN sus_mascotas m ON m.id = n.id_mascota
+                    WHERE :limite IS NULL OR n.orden <= :limite
+                    ORDER BY n.id_mascota, n.orden
+                """, parametros),
+            ])
+        except sqlite3.Error as e:
+            logger.error("Error al obtener el expediente del propietario ID %s: %s", propietario_id, e)
+            return None
+        if not propietarios:
+            return None
+        fichas = {row[0]: ExpedienteMascota(Mascota.from_row(row)) for row in mascotas}
+        for row in consultas:
+            ficha = fichas[row[4]]
+            ficha.consultas.append(Consulta.from_row(row[:6]))
+            ficha.total_consultas = row[6]
+        return Expediente(Propietario.from_row(propietarios[0]), list(fichas.values()))
+
+    # --- Actualización en bloque ---
+    def update_many(self, tabla, cambios):
+        """
+        Aplica muchas actualizaciones parciales en una sola transacción y devuelve el número
+        de filas modificadas (None si falla; en ese caso no se aplica ninguna).
+
+        `cambios` es un iterable de (id, new_data) sobre `tabla` ('propietarios', 'mascotas'
+        o 'consultas'). Los cambios que tocan las mismas columnas comparten una sentencia
+        preparada y se ejecutan con executemany. Por ejemplo, reasignar mascotas a otro dueño:
+
+            db.update_many("mascotas", [(m_id, {"id_propietario": nuevo_id}) for m_id in ids])
+        """
+        inicio = time.perf_counter()
+        try:
+            grupos = {}
+            ids = []
+            cambia_nombres = False
+            for entidad_id, new_data in cambios:
+                if new_data:
+                    sql, params = _preparar_update(tabla, entidad_id, new_data)
+                    grupos.setdefault(sql, []).append(params)
+                    ids.append(entidad_id)
+                    cambia_nombres = cambia_nombres or "nombre" in new_data
+            with self.transaction():
+                modificadas = sum(self.executemany(sql, params).rowcount for sql, params in grupos.items())
+                self._invalidar_ids(tabla, ids)
+                # Si cambian nombres, el índice se reconstruye en la próxima búsqueda
+                if tabla == "propietarios" and not cambia_nombres:
+                    self._sincronizar_indice(modificadas)
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            logger.error("Error en la actualización en bloque de %s: %s", tabla, e)
+            return None
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s filas de %s actualizadas en bloque.", modificadas, tabla, extra={
+                "operacion": f"update_many_{tabla}",
+                "filas": modificadas,
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            })
+        return modificadas
+
+    def delete_many(self, tabla, ids):
+        """
+        Borra las filas `ids` de `tabla` en una sola transacción y devuelve cuántas borró
+        (None si falla; en ese caso no se borra ninguna). ON DELETE CASCADE borra también las
+        mascotas y consultas que dependen de ellas; las claves foráneas están indexadas, así
+        que cada cascade es una búsqueda por índice.
+        """
+        if tabla not in COLUMNAS_ACTUALIZABLES:
+            raise ValueError(f"Tabla desconocida: {tabla}")
+        ids = list(ids)
+        if not ids:
+            return 0
+        inicio = time.perf_counter()
+        try:
+            with self.transaction():
+                mascota_ids = ()
+                if tabla == "propietarios":
+                    mascota_ids = [row[0] for row in self.fetchall(
+                        "SELECT id FROM mascotas WHERE id_propietario IN (SELECT value FROM json_each(?))",
+                        (json.dumps(ids),))]
+                borradas = self.executemany(f"DELETE FROM {tabla} WHERE id = ?", [(i,) for i in ids]).rowcount
+                self._invalidar_ids(tabla, ids, mascota_ids)
+                if tabla == "propietarios":
+                    def quitar(indice):
+                        for propietario_id in ids:
+                            indice.remove(propietario_id)
+                    self._sincronizar_indice(borradas, quitar)
+        except sqlite3.Error as e:
+            logger.error("Error en el borrado en bloque de %s: %s", tabla, e)
+            return None
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s filas de %s eliminadas en bloque.", borradas, tabla, extra={
+                "operacion": f"delete_many_{tabla}",
+                "filas": borradas,
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            })
+        return borradas
+
+    def archive_consultas(self, ids):
+        """
+        Mueve las consultas `ids` a la base de archivo y devuelve cuántas movió (None si
+        falla). Se copian y confirman primero en el archivo y después se borran de la
+        principal: con WAL un commit que abarca dos archivos no es atómico ante un corte de
+        luz, y así lo peor que puede pasar es una copia repetida (que las lecturas
+        descartan y el siguiente archivado borra), nunca una consulta perdida.
+        Las consultas archivadas siguen contando en las tablas de resumen.
+        """
+        if not self.archivo:
+            raise ValueError("No hay una base de archivo configurada (DatabaseManager(archivo=...)).")
+        if self.in_transaction:
+            raise RuntimeError("archive_consultas() no puede usarse dentro de transaction().")
+        ids = list(ids)
+        if not ids:
+            return 0
+        inicio = time.perf_counter()
+        lista = json.dumps(ids)
+        try:
+            with self.transaction():
+                self.execute("""
+                    INSERT OR REPLACE INTO consultas_archivo (id, fecha, motivo, diagnostico, id_mascota)
+                    SELECT id, fecha, motivo, diagnostico, id_mascota FROM consultas
+                    WHERE id IN (SELECT value FROM json_each(?))
+                """, (lista,))
+            with self.transaction():
+                # Solo las que están en el archivo tal cual (otro hilo pudo modificar alguna
+                # entre las dos transacciones); son también las que se vuelven a sumar
+                lista = json.dumps([row[0] for row in self.fetchall("""
+                    SELECT c.id FROM consultas c
+                    WHERE c.id IN (SELECT value FROM json_each(?))
+                      AND EXISTS (SELECT 1 FROM consultas_archivo a
+                                  WHERE a.id = c.id AND a.fecha IS c.fecha AND a.motivo IS c.motivo
+                                    AND a.diagnostico IS c.diagnostico AND a.id_mascota IS c.id_mascota)
+                """, (lista,))])
+                movidas = self.execute(
+                    "DELETE FROM consultas WHERE id IN (SELECT value FROM json_each(?))", (lista,)).rowcount
+                # El borrado las descontó de los resúmenes (triggers): se vuelven a sumar
+                for sentencia in schema.STATS_ARCHIVO_IDS:
+                    self.execute(sentencia, (lista,))
+                self._invalidar_ids("consultas", ids)
+        except sqlite3.Error as e:
+            logger.error("Error al archivar consultas: %s", e)
+            return None
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s consultas archivadas.", movidas, extra={
+                "operacion": "archive_consultas",
+                "filas": movidas,
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            })
+        return movidas
+
+    # --- Versión de los datos ---
+    def get_data_versions(self):
+        """
+        Devuelve {tabla: (version, actualizado)} según la tabla `cambios`, que los triggers
+        actualizan en cada escritura. Sirve para los ETag de la API y para invalidar cachés.
+        """
+        try:
+            return {tabla: (version, actualizado)
+                    for tabla, version, actualizado in self.fetchall("SELECT tabla, version, actualizado FROM cambios")}
+        except sqlite3.Error as e:
+            logger.error("Error al leer la versión de los datos: %s", e)
+            return {}
+
+    # --- Reportes (tablas de resumen mantenidas por triggers, ver schema.py migración 6) ---
+    def get_consultas_por_especie_mes(self, mes_desde=None, mes_hasta=None, especie=None):
+        """
+        Devuelve [(especie, mes 'YYYY-MM', total)] ordenado por mes y especie.
+        Los límites de mes son inclusivos; una mascota sin especie aparece como ''.
+        """
         try:
-            self.cursor.execute("DELETE FROM consultas WHERE id = ?", (consulta_id,))
-            self.conn.commit() # Confirma la transacción
-            return self.cursor.rowcount > 0
+            return self.fetchall("""
+                SELECT especie, mes, total FROM stats_consultas_especie_mes
+                WHERE (? IS NULL OR mes >= ?) AND (? IS NULL OR mes <= ?) AND (? IS NULL OR especie = ?)
+                ORDER BY mes, especie
+            """, (mes_desde, mes_desde, mes_hasta, mes_hasta, especie, especie))
         except sqlite3.Error as e:
-            logging.error(f"Error al eliminar consulta: {e}")
-            return False
\ No newline at end of file
+            logger.error("Error al obtener consultas por especie y mes: %s", e)
+            return []
+
+    def get_mascotas_por_propietario(self, top=20):
+        """Devuelve [(id_propietario, nombre, total_mascotas)] de los `top` propietarios con más mascotas."""
+        try:
+            return self.fetchall("""
+                SELECT s.id_propietario, p.nombre, s.total
+                FROM stats_mascotas_propietario s
+                JOIN propietarios p ON p.id = s.id_propietario
+                ORDER BY s.total DESC, s.id_propietario
+                LIMIT ?
+            """, (top,))
+        except sqlite3.Error as e:
+            logger.error("Error al obtener mascotas por propietario: %s", e)
+            return []
+
+    def get_top_diagnosticos(self, top=10):
+        """Devuelve [(diagnostico, total)] de los diagnósticos más frecuentes (en minúsculas)."""
+        try:
+            return self.fetchall(
+                "SELECT diagnostico, total FROM stats_diagnosticos ORDER BY total DESC, diagnostico LIMIT ?",
+                (top,)
+            )
+        except sqlite3.Error as e:
+            logger.error("Error al obtener los diagnósticos más frecuentes: %s", e)
+            return []
+
+    def rebuild_stats(self):
+        """Recalcula las tablas de resumen desde cero (reparación). Devuelve True si se completó."""
+        inicio = time.perf_counter()
+        try:
+            with self.transaction():
+                for sentencia in schema.STATS_REBUILD:
+                    self.execute(sentencia)
+                if self.archivo:
+                    for sentencia in schema.STATS_ARCHIVO_REBUILD:
+                        self.execute(sentencia)
+        except sqlite3.Error as e:
+            logger.error("Error al reconstruir las estadísticas: %s", e)
+            return False
+        self._log_operacion("rebuild_stats", None, inicio, "Tablas de estadísticas reconstruidas.")
+        return True
+
+    # --- Búsqueda de texto completo ---
+    @staticmethod
+    def _fts_query(texto):
+        """Convierte texto libre en una consulta FTS5: cada palabra como prefijo, todas obligatorias."""
+        terminos = [t.replace('"', '""') for t in texto.split()]
+        return " ".join(f'"{t}"*' for t in terminos)
+
+    def search_consultas(self, texto, fecha_desde=None, fecha_hasta=None, limit=20, offset=0):
+        """
+        Busca consultas cuyo motivo o diagnóstico contenga todas las palabras de `texto`
+        (sin distinguir mayúsculas ni tildes), ordenadas por relevancia (bm25).
+        Las fechas opcionales (date) acotan el rango; limit/offset paginan el resultado.
+        """
+        consulta_fts = self._fts_query(texto)
+        if not consulta_fts:
+            return []
+        desde = fecha_desde.strftime("%Y-%m-%d") if fecha_desde else None
+        hasta = fecha_hasta.strftime("%Y-%m-%d") if fecha_hasta else None
+        try:
+            rows = self.fetchall("""
+                SELECT c.id, c.fecha, c.motivo, c.diagnostico, c.id_mascota, m.nombre
+                FROM consultas_fts f
+                JOIN consultas c ON c.id = f.rowid
+                JOIN mascotas m ON c.id_mascota = m.id
+                WHERE consultas_fts MATCH ?
+                  AND (? IS NULL OR c.fecha >= ?)
+                  AND (? IS NULL OR c.fecha <= ?)
+                ORDER BY f.rank
+                LIMIT ? OFFSET ?
+            """, (consulta_fts, desde, desde, hasta, hasta, limit, offset))
+            return list(map(Consulta.from_row, rows))
+        except sqlite3.Error as e:
+            logger.error("Error en la búsqueda de consultas '%s': %s", texto, e)
+            return []
+
+    # --- Operaciones masivas (pensadas para usarse dentro de transaction()) ---
+    def get_propietario_ids_by_nombres(self, nombres, lote=500):
+        """Devuelve un diccionario {nombre: id} resolviendo los nombres en lotes."""
+        nombres = list(dict.fromkeys(nombres))
+        ids = {}
+        for i in range(0, len(nombres), lote):
+            parte = nombres[i:i + lote]
+            marcadores = ", ".join("?" * len(parte))
+            ids.update(self.fetchall(f"SELECT nombre, id FROM propietarios WHERE nombre IN ({marcadores})", parte))
+        return ids
+
+    def get_existing_ids(self, tabla, ids):
+        """Devuelve el conjunto de los `ids` que existen en `tabla`, con una sola consulta."""
+        if tabla not in COLUMNAS_ACTUALIZABLES:
+            raise ValueError(f"Tabla desconocida: {tabla}")
+        ids = list(ids)
+        if not ids:
+            return set()
+        return {row[0] for row in self.fetchall(
+            f"SELECT id FROM {tabla} WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))}
+
+    def get_mascota_ids_by_propietario_y_nombre(self, pares, lote=500):
+        """Devuelve {(nombre_propietario, nombre_mascota): id_mascota} para los pares dados.
+
+        Si un propietario tiene varias mascotas con el mismo nombre se usa la de menor ID.
+        """
+        pares = set(pares)
+        propietarios = list({p for p, _ in pares})
+        ids = {}
+        for i in range(0, len(propietarios), lote):
+            parte = propietarios[i:i + lote]
+            marcadores = ", ".join("?" * len(parte))
+            rows = self.fetchall(f"""
+                SELECT p.nombre, m.nombre, MIN(m.id)
+                FROM mascotas m
+                JOIN propietarios p ON m.id_propietario = p.id
+                WHERE p.nombre IN ({marcadores})
+                GROUP BY p.nombre, m.nombre
+            """, parte)
+            for nombre_propietario, nombre_mascota, mascota_id in rows:
+                if (nombre_propietario, nombre_mascota) in pares:
+                    ids[(nombre_propietario, nombre_mascota)] = mascota_id
+        return ids
+
+    def insert_propietarios_bulk(self, filas):
+        """Inserta tuplas (nombre, telefono, direccion) ignorando nombres ya registrados.
+
+        Devuelve el número de filas insertadas.
+        """
+        return self.executemany(
+            "INSERT OR IGNORE INTO propietarios (nombre, telefono, direccion) VALUES (?, ?, ?)",
+            filas
+        ).rowcount
+
+    def insert_mascotas_bulk(self, filas):
+        """Inserta tuplas (nombre, especie, raza, edad, id_propietario). Devuelve las filas insertadas."""
+        return self.executemany(
+            "INSERT INTO mascotas (nombre, especie, raza, edad, id_propietario) VALUES (?, ?, ?, ?, ?)",
+            filas
+        ).rowcount
+
+    def insert_consultas_bulk(self, filas):
+        """Inserta tuplas (fecha 'YYYY-MM-DD', motivo, diagnostico, id_mascota). Devuelve las filas insertadas."""
+        return self.executemany(
+            "INSERT INTO consultas (fecha, motivo, diagnostico, id_mascota) VALUES (?, ?, ?, ?)",
+            filas
+        ).rowcount
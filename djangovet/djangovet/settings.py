@@ -10,11 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# La app web comparte database.py/models.py con la aplicación de consola (main.py),
+# que están en la carpeta superior del proyecto Django.
+PROJECT_ROOT = BASE_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -80,6 +87,30 @@ DATABASES = {
     }
 }
 
+# Base de datos de la clínica (la misma que usa main.py), accedida con DatabaseManager
+CLINICA_DB_PATH = PROJECT_ROOT / 'clinica_veterinaria.db'
+# Base de archivo de consultas antiguas (archive.py); None si no se archiva
+CLINICA_DB_ARCHIVO = None
+CLINICA_SLOW_QUERY_MS = 100.0
+CLINICA_SLOW_QUERY_LOG = BASE_DIR / 'consultas_lentas.log'
+# Hilos (y conexiones lectoras) para las vistas async y operaciones en cola antes de responder 503
+CLINICA_DB_WORKERS = 8
+CLINICA_DB_MAX_PENDIENTES = 64
+
+# Caché local del proceso (sin servicios externos). Cuenta aciertos y fallos: /debug/cache/
+CACHES = {
+    'default': {
+        'BACKEND': 'vet_sprint.cache_backends.StatsLocMemCache',
+        'LOCATION': 'clinica',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    }
+}
+# Segundos que se cachean las páginas estáticas (home, servicios) y los fragmentos con datos.
+# Los fragmentos se invalidan solos al cambiar los datos: su clave incluye la versión de la tabla.
+CLINICA_CACHE_PAGINAS = 60 * 60
+CLINICA_CACHE_FRAGMENTOS = 60 * 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
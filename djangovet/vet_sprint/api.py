@@ -0,0 +1,214 @@
+# vet_sprint/api.py
+"""Endpoints JSON sobre la base de datos de la clínica."""
+import asyncio
+import base64
+import hashlib
+import json
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from async_database import BaseDatosSaturadaError
+from .clinica import get_async_db_manager
+
+
+PAGE_SIZE = 50
+PAGE_SIZE_MAX = 500
+
+CAMPOS_PROPIETARIO = ('id', 'nombre', 'telefono', 'direccion')
+CAMPOS_MASCOTA = ('id', 'nombre', 'especie', 'raza', 'edad', 'propietario_id', 'propietario_nombre')
+CAMPOS_CONSULTA = ('id', 'fecha', 'motivo', 'diagnostico', 'mascota_id')
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def _propietario_dict(propietario):
+    return {
+        'id': propietario.id,
+        'nombre': propietario.nombre,
+        'telefono': propietario.telefono,
+        'direccion': propietario.direccion,
+    }
+
+
+def _mascota_dict(mascota):
+    return {
+        'id': mascota.id,
+        'nombre': mascota.nombre,
+        'especie': mascota.especie,
+        'raza': mascota.raza,
+        'edad': mascota.edad,
+        'propietario_id': mascota.propietario_id,
+        'propietario_nombre': mascota.propietario_nombre,
+    }
+
+
+def _consulta_dict(consulta):
+    return {
+        'id': consulta.id,
+        'fecha': consulta.fecha.isoformat(),
+        'motivo': consulta.motivo,
+        'diagnostico': consulta.diagnostico,
+        'mascota_id': consulta.mascota_id,
+    }
+
+
+def _json(datos, status=200):
+    return JsonResponse(datos, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def _codificar_cursor(clave):
+    return base64.urlsafe_b64encode(json.dumps(clave).encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ParametroInvalido('Cursor inválido.')
+
+
+def _cursor_id(clave):
+    """Clave de los listados por ID: un entero no negativo."""
+    if type(clave) is not int or not 0 <= clave < 2 ** 63:
+        raise ParametroInvalido('Cursor inválido.')
+    return clave
+
+
+def _cursor_consulta(clave):
+    """Clave del historial: [fecha 'YYYY-MM-DD', id]."""
+    if not (isinstance(clave, list) and len(clave) == 2 and isinstance(clave[0], str)):
+        raise ParametroInvalido('Cursor inválido.')
+    return clave[0], _cursor_id(clave[1])
+
+
+def _parametros_pagina(request, campos_validos):
+    """Lee ?limit= y ?fields= de la petición. Lanza ParametroInvalido si no son válidos."""
+    try:
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ParametroInvalido('El parámetro limit debe ser un entero.')
+    if not 1 <= limit <= PAGE_SIZE_MAX:
+        raise ParametroInvalido(f'El parámetro limit debe estar entre 1 y {PAGE_SIZE_MAX}.')
+    campos = request.GET.get('fields')
+    if not campos:
+        return limit, campos_validos
+    campos = tuple(c.strip() for c in campos.split(',') if c.strip())
+    desconocidos = [c for c in campos if c not in campos_validos]
+    if desconocidos:
+        raise ParametroInvalido(f"Campos desconocidos: {', '.join(desconocidos)}. "
+                                f"Disponibles: {', '.join(campos_validos)}.")
+    return limit, campos
+
+
+def _etag(versiones, tablas, request):
+    """
+    ETag de un recurso que depende de `tablas`. Se calcula con la tabla `cambios` (una
+    lectura mínima), así una petición sin cambios se responde con 304 sin tocar las tablas
+    de datos. No se envía Last-Modified: `cambios.actualizado` tiene resolución de segundos
+    y una escritura en el mismo segundo que la respuesta daría un 304 con datos viejos.
+    """
+    estado = ';'.join(f'{t}:{versiones.get(t, (0, None))[0]}' for t in tablas)
+    return '"%s"' % hashlib.sha1(f'{estado}|{request.get_full_path()}'.encode()).hexdigest()[:20]
+
+
+async def _listado(request, tablas, campos_validos, cargar_pagina, a_dict, clave_cursor, leer_cursor):
+    """
+    Esqueleto común de los listados paginados: validación de parámetros, GET condicional,
+    carga de la página siguiente al cursor y serialización de los campos pedidos.
+    `leer_cursor` valida la clave decodificada del cursor (ParametroInvalido si no sirve).
+    """
+    db = get_async_db_manager()
+    try:
+        limit, campos = _parametros_pagina(request, campos_validos)
+        cursor = request.GET.get('cursor')
+        despues_de = leer_cursor(_decodificar_cursor(cursor)) if cursor else None
+    except ParametroInvalido as e:
+        return _json({'error': str(e)}, status=400)
+
+    try:
+        versiones = await db.get_data_versions()
+        etag = _etag(versiones, tablas, request)
+        respuesta = get_conditional_response(request, etag=etag)
+        if respuesta is None:
+            # Se pide una fila de más para saber si hay página siguiente
+            filas = await cargar_pagina(db, despues_de, limit + 1)
+            if filas is None:
+                return _json({'error': 'Recurso no encontrado.'}, status=404)
+            siguiente = None
+            if len(filas) > limit:
+                filas = filas[:limit]
+                siguiente = _codificar_cursor(clave_cursor(filas[-1]))
+            datos = []
+            for fila in filas:
+                completo = a_dict(fila)
+                datos.append({c: completo[c] for c in campos})
+            respuesta = _json({'resultados': datos, 'siguiente': siguiente})
+    except BaseDatosSaturadaError:
+        return _json({'error': 'Servidor ocupado, intente de nuevo.'}, status=503)
+
+    if respuesta.status_code not in (200, 304):
+        return respuesta
+    respuesta.headers['ETag'] = etag
+    # Los clientes deben revalidar siempre; la revalidación es barata gracias al 304
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+@require_GET
+@gzip_page
+async def listar_propietarios(request):
+    """GET /api/propietarios/?limit=&cursor=&fields="""
+    async def cargar(db, despues_de, limit):
+        return await db.get_propietarios_page(despues_de or 0, limit)
+    return await _listado(request, ('propietarios',), CAMPOS_PROPIETARIO,
+                          cargar, _propietario_dict, lambda p: p.id, _cursor_id)
+
+
+@require_GET
+@gzip_page
+async def listar_mascotas(request):
+    """GET /api/mascotas/?limit=&cursor=&fields="""
+    async def cargar(db, despues_de, limit):
+        return await db.get_mascotas_page(despues_de or 0, limit)
+    # El listado incluye el nombre del propietario: cambia también si cambian los propietarios
+    return await _listado(request, ('mascotas', 'propietarios'), CAMPOS_MASCOTA,
+                          cargar, _mascota_dict, lambda m: m.id, _cursor_id)
+
+
+@require_GET
+@gzip_page
+async def listar_consultas_mascota(request, mascota_id):
+    """GET /api/mascotas/<id>/consultas/?limit=&cursor=&fields= (de la más reciente a la más antigua)"""
+    async def cargar(db, despues_de, limit):
+        mascota, consultas = await asyncio.gather(
+            db.get_mascota_by_id(mascota_id),
+            db.get_consultas_page_by_mascota_id(mascota_id, despues_de, limit),
+        )
+        return consultas if mascota is not None else None
+    return await _listado(request, ('mascotas', 'consultas'), CAMPOS_CONSULTA,
+                          cargar, _consulta_dict, lambda c: [c.fecha.isoformat(), c.id], _cursor_consulta)
+
+
+async def historia_clinica(request, mascota_id):
+    """
+    Historia clínica de una mascota. Es una vista async: mientras SQLite trabaja en el
+    executor, el worker ASGI sigue atendiendo otras peticiones.
+    Con ?completo=1 incluye las consultas archivadas (si hay base de archivo).
+    """
+    db = get_async_db_manager()
+    completo = request.GET.get('completo') in ('1', 'true')
+    try:
+        mascota, consultas = await asyncio.gather(
+            db.get_mascota_by_id(mascota_id),
+            db.get_consultas_by_mascota_id(mascota_id, completo),
+        )
+    except BaseDatosSaturadaError:
+        return _json({'error': 'Servidor ocupado, intente de nuevo.'}, status=503)
+    if mascota is None:
+        return _json({'error': f'No existe la mascota con ID {mascota_id}.'}, status=404)
+    return _json({'mascota': _mascota_dict(mascota), 'consultas': [_consulta_dict(c) for c in consultas]})
@@ -0,0 +1,52 @@
+# vet_sprint/cache_backends.py
+"""Backend de caché en memoria del proceso que además cuenta aciertos y fallos."""
+import threading
+from collections import Counter
+
+from django.core.cache.backends.locmem import LocMemCache
+
+# Django crea una instancia del backend por hilo: los contadores se comparten por LOCATION,
+# igual que el almacenamiento de LocMemCache.
+_contadores = {}
+_locks = {}
+_FALTA = object()
+
+
+def _categoria(clave):
+    if clave.startswith('views.decorators.cache.'):
+        return 'paginas'
+    if clave.startswith('template.cache.'):
+        return 'fragmento:' + clave.split('.')[2]
+    return 'otros'
+
+
+class StatsLocMemCache(LocMemCache):
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._contador = _contadores.setdefault(name, Counter())
+        self._stats_lock = _locks.setdefault(name, threading.Lock())
+
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, _FALTA, version=version)
+        resultado = 'aciertos' if valor is not _FALTA else 'fallos'
+        with self._stats_lock:
+            self._contador[(_categoria(key), resultado)] += 1
+        return default if valor is _FALTA else valor
+
+    def stats(self):
+        """Aciertos, fallos y tasa de aciertos por categoría (páginas, cada fragmento, otros)."""
+        with self._stats_lock:
+            contador = dict(self._contador)
+        categorias = {}
+        for (categoria, resultado), cantidad in sorted(contador.items()):
+            categorias.setdefault(categoria, {'aciertos': 0, 'fallos': 0})[resultado] = cantidad
+        for datos in categorias.values():
+            total = datos['aciertos'] + datos['fallos']
+            datos['hit_rate'] = round(datos['aciertos'] / total, 4) if total else 0.0
+        with self._lock:
+            entradas = len(self._cache)
+        return {'entradas': entradas, 'max_entradas': self._max_entries, 'categorias': categorias}
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._contador.clear()
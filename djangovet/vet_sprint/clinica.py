@@ -0,0 +1,46 @@
+# vet_sprint/clinica.py
+"""Acceso compartido a la base de datos de la clínica desde las vistas."""
+import threading
+
+from django.conf import settings
+
+from async_database import AsyncDatabaseManager
+from database import DatabaseManager
+
+_db_manager = None
+_async_db_manager = None
+_lock = threading.Lock()
+
+
+def get_db_manager():
+    """
+    Devuelve el DatabaseManager del proceso. Es seguro entre hilos (pool de lectores y
+    escritor serializado), así que todas las peticiones comparten la misma instancia.
+    """
+    global _db_manager
+    if _db_manager is None:
+        with _lock:
+            if _db_manager is None:
+                _db_manager = DatabaseManager(
+                    str(settings.CLINICA_DB_PATH),
+                    max_lectores=settings.CLINICA_DB_WORKERS,
+                    slow_query_ms=settings.CLINICA_SLOW_QUERY_MS,
+                    slow_query_log=str(settings.CLINICA_SLOW_QUERY_LOG),
+                    archivo=str(settings.CLINICA_DB_ARCHIVO) if settings.CLINICA_DB_ARCHIVO else None,
+                )
+    return _db_manager
+
+
+def get_async_db_manager():
+    """Versión asíncrona (para vistas async) sobre el mismo DatabaseManager."""
+    global _async_db_manager
+    if _async_db_manager is None:
+        db_manager = get_db_manager()
+        with _lock:
+            if _async_db_manager is None:
+                _async_db_manager = AsyncDatabaseManager(
+                    db_manager,
+                    max_workers=settings.CLINICA_DB_WORKERS,
+                    max_pendientes=settings.CLINICA_DB_MAX_PENDIENTES,
+                )
+    return _async_db_manager
@@ -1,3 +1,165 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from models import Consulta, Mascota, Propietario
+
+from . import clinica
+
+
+@override_settings(DEBUG=True)
+class DebugConsultasTests(SimpleTestCase):
+    def test_top_invalido_responde_400(self):
+        for top in ("x", "0", "-3"):
+            with self.subTest(top=top):
+                respuesta = self.client.get("/debug/consultas/", {"top": top})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn("top", respuesta.json()["error"])
+
+
+class ClinicaTemporalMixin:
+    """Apunta las vistas a una base de la clínica nueva en un directorio temporal."""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(CLINICA_DB_PATH=os.path.join(directorio.name, "clinica.db"),
+                                    CLINICA_DB_ARCHIVO=None, CLINICA_SLOW_QUERY_LOG=os.devnull)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        clinica._db_manager = clinica._async_db_manager = None
+        self.addCleanup(self._cerrar)
+        self.db = clinica.get_db_manager()
+
+    def _cerrar(self):
+        if clinica._async_db_manager is not None:
+            clinica._async_db_manager.close()
+        elif clinica._db_manager is not None:
+            clinica._db_manager.close_connection()
+        clinica._db_manager = clinica._async_db_manager = None
+
+
+def _cursor(clave):
+    return base64.urlsafe_b64encode(json.dumps(clave).encode()).decode().rstrip("=")
+
+
+class ApiListadosTests(ClinicaTemporalMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.propietarios = [self.db.insert_propietario(Propietario(nombre, "1", "x"))
+                             for nombre in ("Ana", "Luis", "Marta")]
+        self.mascota = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, self.propietarios[0].id))
+        for fecha in ("2024-01-01", "2024-02-01", "2024-03-01"):
+            self.db.insert_consulta(Consulta(fecha, "Control", "Sano", self.mascota.id))
+
+    def test_etag_y_304(self):
+        respuesta = self.client.get("/api/propietarios/")
+        self.assertEqual(respuesta.status_code, 200)
+        etag = respuesta.headers["ETag"]
+        self.assertNotIn("Last-Modified", respuesta.headers)
+        respuesta = self.client.get("/api/propietarios/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.headers["ETag"], etag)
+        # Una escritura en el mismo segundo cambia el ETag: no hay 304 con datos viejos
+        self.db.insert_propietario(Propietario("Sofía", "1", "x"))
+        respuesta = self.client.get("/api/propietarios/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta.headers["ETag"], etag)
+        self.assertEqual(len(respuesta.json()["resultados"]), 4)
+
+    def test_paginacion_por_cursor(self):
+        primera = self.client.get("/api/propietarios/", {"limit": 2}).json()
+        self.assertEqual([p["nombre"] for p in primera["resultados"]], ["Ana", "Luis"])
+        segunda = self.client.get("/api/propietarios/", {"limit": 2, "cursor": primera["siguiente"]}).json()
+        self.assertEqual(([p["nombre"] for p in segunda["resultados"]], segunda["siguiente"]), (["Marta"], None))
+
+        url = f"/api/mascotas/{self.mascota.id}/consultas/"
+        primera = self.client.get(url, {"limit": 2}).json()
+        self.assertEqual([c["fecha"] for c in primera["resultados"]], ["2024-03-01", "2024-02-01"])
+        segunda = self.client.get(url, {"limit": 2, "cursor": primera["siguiente"]}).json()
+        self.assertEqual(([c["fecha"] for c in segunda["resultados"]], segunda["siguiente"]), (["2024-01-01"], None))
+
+    def test_cursor_invalido_responde_400(self):
+        url_consultas = f"/api/mascotas/{self.mascota.id}/consultas/"
+        for url, cursor in (("/api/propietarios/", "W10"),  # []
+                            ("/api/propietarios/", "!!"),
+                            ("/api/propietarios/", _cursor(True)),
+                            ("/api/propietarios/", _cursor("3")),
+                            ("/api/mascotas/", _cursor(-1)),
+                            (url_consultas, _cursor(5)),
+                            (url_consultas, _cursor(["2024-02-01"])),
+                            (url_consultas, _cursor([20240201, 1])),
+                            (url_consultas, _cursor(["2024-02-01", "1"]))):
+            with self.subTest(url=url, cursor=cursor):
+                respuesta = self.client.get(url, {"cursor": cursor})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(respuesta.json()["error"], "Cursor inválido.")
+
+    def test_seleccion_de_campos(self):
+        datos = self.client.get("/api/mascotas/", {"fields": "id,propietario_nombre"}).json()
+        self.assertEqual(datos["resultados"], [{"id": self.mascota.id, "propietario_nombre": "Ana"}])
+        respuesta = self.client.get("/api/mascotas/", {"fields": "id,telefono"})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn("telefono", respuesta.json()["error"])
+
+
+@override_settings(CLINICA_DB_MAX_PENDIENTES=1)
+class SaturacionTests(ClinicaTemporalMixin, SimpleTestCase):
+    async def test_con_la_base_saturada_responde_503(self):
+        db = clinica.get_async_db_manager()
+        db.acquire_timeout = 0.05
+        liberar = threading.Event()
+        # AsyncClient atiende la vista en este mismo event loop: comparte el semáforo
+        ocupada = asyncio.create_task(db.run(liberar.wait))
+        await asyncio.sleep(0)
+        try:
+            for url in ("/api/mascotas/1/historia/", "/api/propietarios/"):
+                with self.subTest(url=url):
+                    respuesta = await self.async_client.get(url)
+                    self.assertEqual(respuesta.status_code, 503)
+                    self.assertIn("ocupado", respuesta.json()["error"])
+        finally:
+            liberar.set()
+            await ocupada
+        respuesta = await self.async_client.get("/api/mascotas/1/historia/")
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class FragmentosEnCacheTests(ClinicaTemporalMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        # Las claves de los fragmentos llevan la versión de la tabla, que vuelve a empezar
+        # en cada base nueva: no deben quedar fragmentos de otro test
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.db.insert_mascota(Mascota("Luna", "gato", None, 3, self.ana.id))
+
+    def _pagina(self):
+        return self.client.get("/contenido-dinamico/").content.decode()
+
+    def test_sin_cambios_no_consulta_las_tablas(self):
+        self.assertIn("Luna (gato) - Ana", self._pagina())
+        with mock.patch.object(self.db, "get_mascotas_page") as mascotas, \
+                mock.patch.object(self.db, "get_propietarios_page") as duenos:
+            self.assertIn("Luna (gato) - Ana", self._pagina())
+        mascotas.assert_not_called()
+        duenos.assert_not_called()
+
+    def test_una_escritura_renueva_los_fragmentos(self):
+        self._pagina()
+        self.db.update_propietario(self.ana.id, {"nombre": "Ana María"})
+        pagina = self._pagina()
+        # El listado de mascotas muestra el nombre del dueño: depende también de propietarios
+        self.assertIn("Luna (gato) - Ana María", pagina)
+        self.assertIn(">Ana María</a>", pagina)
+        self.db.insert_mascota(Mascota("Rex", "perro", None, 5, self.ana.id))
+        self.assertIn("Rex (perro) - Ana María", self._pagina())
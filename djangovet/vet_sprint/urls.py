@@ -1,10 +1,18 @@
 # C:\Users\Eusse\AppData\Local\Programs\DjangoP\sprint8\djangovet\vet_sprint\urls.py
 
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('servicios/', views.services, name='services'), # El nombre de la URL sigue siendo 'services'
     path('contenido-dinamico/', views.dynamic_content_placeholder, name='dynamic_placeholder'), # El nombre de la URL sigue siendo 'dynamic_placeholder'
+    path('reportes/', views.reportes, name='reportes'),
+    path('propietarios/<int:propietario_id>/', views.expediente_propietario, name='expediente_propietario'),
+    path('api/propietarios/', api.listar_propietarios, name='api_propietarios'),
+    path('api/mascotas/', api.listar_mascotas, name='api_mascotas'),
+    path('api/mascotas/<int:mascota_id>/consultas/', api.listar_consultas_mascota, name='api_consultas_mascota'),
+    path('api/mascotas/<int:mascota_id>/historia/', api.historia_clinica, name='api_historia_clinica'),
+    path('debug/consultas/', views.debug_consultas, name='debug_consultas'),
+    path('debug/cache/', views.debug_cache, name='debug_cache'),
 ]
\ No newline at end of file
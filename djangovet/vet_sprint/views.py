@@ -1,42 +1,142 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.cache import cache_page
+
+from .clinica import get_db_manager
 
 # Create your views here.
 # vet_app/views.py
 
+SERVICIOS = (
+    'Consultas generales y vacunación',
+    'Registros de usuarios y mascotas',
+    'Manejo de información de personas y mascotas',
+    'Eliminación de usuarios',
+)
+
+# Cantidad de filas que muestra cada sección de la página de información
+INFO_FILAS = 10
+# Filas de los rankings de la página de reportes
+REPORTES_TOP = 10
+# Consultas más recientes por mascota que muestra el expediente si no se indica ?ultimas=
+EXPEDIENTE_ULTIMAS = 10
+
 
+@cache_page(settings.CLINICA_CACHE_PAGINAS)
 def home(request):
     """
     Página de bienvenida
     """
     return render(request, 'vet_sprint/home.html', {'nombre_clinica': 'Clínica Veterinaria Amigos Peludos'})
 
+@cache_page(settings.CLINICA_CACHE_PAGINAS)
 def services(request):
     """
     Página de servicios
     """
     context = {
         'titulo': 'Nuestros Servicios Veterinarios',
-        'servicios_list': [
-            'Consultas generales y vacunación',
-            'Registros de usuarios y mascotas',
-            'Manejo de información de personas y mascotas',
-            'Eliminación de usuarios',
-         
-        ],
+        'servicios_list': SERVICIOS,
         'descripcion_adicional': 'Ofrecemos el mejor cuidado para tus mascotas.'
     }
     return render(request, 'vet_sprint/service.html', context)
 
 def dynamic_content_placeholder(request):
     """
-    Página con placeholders
+    Página con placeholders. Las secciones de mascotas y dueños muestran datos reales dentro
+    de fragmentos {% cache %} cuya clave incluye la versión de la tabla (tabla `cambios`):
+    las listas se pasan como funciones, así que solo se consultan si el fragmento no está
+    en caché o si los datos cambiaron.
     """
+    db_manager = get_db_manager()
+    versiones = db_manager.get_data_versions()
     context = {
         'page_title': 'Información',
         'sections': {
             'mascotas': 'Aquí se mostrarán las mascotas registradas.',
             'citas': 'Aquí se listarán las citas programadas.',
             'duenos': 'Aquí se presentará la información de los dueños.'
-        }
+        },
+        'cache_segundos': settings.CLINICA_CACHE_FRAGMENTOS,
+        'version_mascotas': '%s-%s' % (versiones.get('mascotas', (0,))[0], versiones.get('propietarios', (0,))[0]),
+        'version_duenos': versiones.get('propietarios', (0,))[0],
+        'mascotas': lambda: db_manager.get_mascotas_page(0, INFO_FILAS),
+        'duenos': lambda: db_manager.get_propietarios_page(0, INFO_FILAS),
+    }
+    return render(request, 'vet_sprint/info.html', context)
+
+def reportes(request):
+    """
+    Reportes de la clínica. Se leen de las tablas de resumen que mantienen los triggers,
+    por eso no dependen del volumen de consultas registradas.
+    """
+    db_manager = get_db_manager()
+    # <input type="month"> envía AAAA-MM; cualquier otro valor se ignora
+    desde = request.GET.get('desde') or None
+    hasta = request.GET.get('hasta') or None
+    desde = desde if desde and len(desde) == 7 else None
+    hasta = hasta if hasta and len(hasta) == 7 else None
+    context = {
+        'page_title': 'Reportes',
+        'desde': desde,
+        'hasta': hasta,
+        'consultas_por_especie': db_manager.get_consultas_por_especie_mes(desde, hasta),
+        'mascotas_por_propietario': db_manager.get_mascotas_por_propietario(REPORTES_TOP),
+        'top_diagnosticos': db_manager.get_top_diagnosticos(REPORTES_TOP),
+    }
+    return render(request, 'vet_sprint/reportes.html', context)
+
+def expediente_propietario(request, propietario_id):
+    """
+    Expediente de un propietario: sus mascotas y las consultas de cada una, cargadas con
+    tres consultas a la base sin importar cuántas mascotas tenga. ?ultimas=N limita las
+    consultas por mascota (vacío: todas) y ?completo=1 incluye las archivadas.
+    """
+    ultimas = request.GET.get('ultimas')
+    if ultimas is None:
+        ultimas = EXPEDIENTE_ULTIMAS
+    else:
+        ultimas = int(ultimas) if ultimas.isdigit() and int(ultimas) > 0 else None
+    completo = request.GET.get('completo') in ('1', 'true')
+    expediente = get_db_manager().get_expediente_propietario(propietario_id, ultimas, historial_completo=completo)
+    if expediente is None:
+        raise Http404('No existe el propietario.')
+    context = {
+        'page_title': f'Expediente de {expediente.propietario.nombre}',
+        'expediente': expediente,
+        'ultimas': ultimas,
+        'completo': completo,
+    }
+    return render(request, 'vet_sprint/expediente.html', context)
+
+def debug_consultas(request):
+    """
+    Resumen de las sentencias SQL ejecutadas contra la base de la clínica (solo con DEBUG)
+    """
+    if not settings.DEBUG:
+        raise Http404
+    top = request.GET.get('top', '20')
+    if not top.isdigit() or int(top) < 1:
+        return JsonResponse({'error': 'El parámetro top debe ser un entero positivo.'}, status=400,
+                            json_dumps_params={'ensure_ascii': False})
+    db_manager = get_db_manager()
+    datos = {
+        'umbral_lentas_ms': db_manager.query_stats.slow_threshold_ms,
+        'sentencias': db_manager.query_stats.summary(top=int(top)),
+        'cache': db_manager.cache_stats(),
+    }
+    return JsonResponse(datos, json_dumps_params={'ensure_ascii': False, 'indent': 2})
+
+def debug_cache(request):
+    """
+    Aciertos y fallos de la caché de Django y de la caché de entidades de DatabaseManager (solo con DEBUG)
+    """
+    if not settings.DEBUG:
+        raise Http404
+    datos = {
+        'django': cache.stats() if hasattr(cache, 'stats') else None,
+        'entidades': get_db_manager().cache_stats(),
     }
-    return render(request, 'vet_sprint/info.html', context)
\ No newline at end of file
+    return JsonResponse(datos, json_dumps_params={'ensure_ascii': False, 'indent': 2})
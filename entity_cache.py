@@ -0,0 +1,81 @@
+# entity_cache.py
+"""Caché LRU con caducidad (TTL) para las búsquedas de entidades por ID."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class EntityCache:
+    """
+    Caché acotada: al superar `max_size` se descarta la entrada usada hace más tiempo,
+    y una entrada con más de `ttl` segundos se trata como ausente (ttl=None: sin caducidad).
+    Es segura entre hilos y cuenta aciertos/fallos para poder dimensionarla.
+
+    Para no guardar un valor leído antes de una invalidación concurrente, el llamador
+    toma `generation` antes de consultar la base y la pasa a put(): si entretanto hubo
+    alguna invalidación, el valor se descarta.
+    """
+
+    def __init__(self, max_size=1024, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                valor, guardado = entrada
+                if self.ttl is None or time.monotonic() - guardado < self.ttl:
+                    self._datos.move_to_end(clave)
+                    self.hits += 1
+                    return valor
+                del self._datos[clave]
+            self.misses += 1
+            return None
+
+    def put(self, clave, valor, generation=None):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._datos[clave] = (valor, time.monotonic())
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_size:
+                self._datos.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, clave):
+        with self._lock:
+            self.generation += 1
+            self._datos.pop(clave, None)
+
+    def invalidate_where(self, condicion):
+        """Elimina las entradas cuyo valor cumple `condicion(valor)`."""
+        with self._lock:
+            self.generation += 1
+            for clave in [c for c, (valor, _) in self._datos.items() if condicion(valor)]:
+                del self._datos[clave]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._datos.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._datos),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,117 @@
+# log_config.py
+"""
+Configuración del logging de la aplicación.
+
+Los módulos registran con su propio logger (logging.getLogger(__name__)) y con formato
+diferido ("... %s", valor), de modo que un mensaje filtrado por nivel no cuesta nada.
+Los registros que pasan el filtro se encolan y un hilo en segundo plano (QueueListener)
+los formatea como JSON y los escribe en un archivo con rotación: una operación de base de
+datos nunca espera a que se escriba el log.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+LOG_FILE = "clinica_veterinaria.log"
+# Campos estructurados que se pueden adjuntar con extra={...}
+CAMPOS_EXTRA = ("operacion", "entidad_id", "duracion_ms", "filas")
+
+_listeners = []
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro: ts, nivel, logger, mensaje y los CAMPOS_EXTRA presentes."""
+
+    def format(self, record):
+        datos = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        for campo in CAMPOS_EXTRA:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                datos[campo] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos["excepcion"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class _QueueHandlerDiferido(logging.handlers.QueueHandler):
+    """
+    QueueHandler que NO formatea el mensaje en el hilo que registra (el de la base de datos):
+    el formateo queda para el hilo del listener. Solo se convierte la traza de una excepción,
+    que no debe sobrevivir al hilo que la produjo.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def handler_en_segundo_plano(*handlers):
+    """
+    Devuelve un handler que solo encola los registros; un QueueListener los entrega a
+    `handlers` desde su propio hilo. El listener se detiene (vaciando la cola) al salir.
+    """
+    cola = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(cola, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return _QueueHandlerDiferido(cola)
+
+
+def detener_logging():
+    """Escribe lo que quede en cola y detiene los hilos de logging."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(detener_logging)
+
+
+def _niveles_desde_entorno():
+    """CLINICA_LOG_LEVELS="database=WARNING,services=DEBUG" -> {"database": "WARNING", ...}"""
+    niveles = {}
+    for par in os.environ.get("CLINICA_LOG_LEVELS", "").split(","):
+        if "=" in par:
+            modulo, nivel = par.split("=", 1)
+            niveles[modulo.strip()] = nivel.strip().upper()
+    return niveles
+
+
+def setup_logging(log_file=LOG_FILE, level=logging.INFO, niveles=None,
+                  max_bytes=10 * 1024 * 1024, backups=5, rotar_cada=None):
+    """
+    Configura el logger raíz con escritura en segundo plano.
+
+    - Rotación por tamaño (`max_bytes`) o, si se indica `rotar_cada` ('midnight', 'H', ...),
+      por tiempo; se conservan `backups` archivos anteriores.
+    - `niveles` fija el nivel de módulos concretos ({"database": "WARNING"}); la variable de
+      entorno CLINICA_LOG_LEVELS tiene prioridad sobre ese diccionario.
+    """
+    raiz = logging.getLogger()
+    if any(isinstance(h, _QueueHandlerDiferido) for h in raiz.handlers):
+        return  # Ya configurado (p. ej. main() llamado dos veces en el mismo proceso)
+
+    if rotar_cada:
+        archivo = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotar_cada, backupCount=backups, encoding="utf-8", delay=True)
+    else:
+        archivo = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+    archivo.setFormatter(JsonFormatter())
+
+    raiz.addHandler(handler_en_segundo_plano(archivo))
+    raiz.setLevel(level)
+    for modulo, nivel in {**(niveles or {}), **_niveles_desde_entorno()}.items():
+        logging.getLogger(modulo).setLevel(nivel)
@@ -1,49 +1,148 @@
+import time
+_INICIO = time.perf_counter()  # Referencia del informe de arranque (--startup-report)
 
+import json
 import logging
-from services import SistemaVeterinaria
-from ui import UIUtils
+import sys
+from types import SimpleNamespace
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Opción de salida del menú: conserva su número aunque se agreguen opciones
+OPCION_SALIR = '12'
+
+# Valores de las opciones de línea de comandos cuando no se indican
+ARGUMENTOS_POR_DEFECTO = {
+    'db': 'clinica_veterinaria.db',
+    'archivo': None,
+    'batch': None,
+    'tamano_grupo': 100,
+    'todo_o_nada': False,
+    'startup_report': False,
+}
 
 
 # cd C:\Users\Eusse\AppData\Local\Programs\sprint8\djangovet
 # py manage.py runserver
 # http://127.0.0.1:8000/
 
-def setup_logging():
-    """Configura el logging para la aplicación."""
-    logging.basicConfig(
-        filename="clinica_veterinaria.log",
-        encoding='utf-8',
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        level=logging.INFO
-    )
+def ejecutar_lote(args):
+    """Modo por lotes: ejecuta comandos JSON (uno por línea) y escribe los resultados en JSON."""
+    from batch import BatchRunner
+    from database import DatabaseManager
+
+    try:
+        entrada = sys.stdin if args.batch == '-' else open(args.batch, encoding='utf-8')
+    except OSError as e:
+        print(f"No se pudo abrir el archivo de comandos: {e}", file=sys.stderr)
+        return 1
+    db_manager = DatabaseManager(args.db, archivo=args.archivo)
+    try:
+        runner = BatchRunner(db_manager, args.tamano_grupo, args.todo_o_nada)
+        resumen = runner.ejecutar(entrada)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        db_manager.close_connection()
+    # El resumen va a stderr para que stdout contenga solo los resultados
+    print(json.dumps({'resumen': resumen}, ensure_ascii=False), file=sys.stderr)
+    return 0 if not resumen['errores'] else 1
+
+def leer_argumentos(argv):
+    """Opciones de línea de comandos. Sin opciones (el arranque habitual) no se carga argparse."""
+    if not argv:
+        return SimpleNamespace(**ARGUMENTOS_POR_DEFECTO)
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sistema Veterinaria Amigos Peludos.")
+    parser.add_argument('--db', help="Base de datos")
+    parser.add_argument('--archivo', help="Base de datos de archivo de consultas antiguas (ver archive.py)")
+    parser.add_argument('--batch', metavar='ARCHIVO',
+                        help="Ejecuta comandos JSON (uno por línea) sin interacción; '-' lee de stdin")
+    parser.add_argument('--tamano-grupo', type=int, help="Comandos por transacción en modo --batch")
+    parser.add_argument('--todo-o-nada', action='store_true',
+                        help="En modo --batch, deshace todo si falla cualquier comando")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="Muestra cuánto tarda cada fase del arranque y termina sin abrir el menú")
+    parser.set_defaults(**ARGUMENTOS_POR_DEFECTO)
+    return parser.parse_args(argv)
 
-def main():
+def informe_arranque(fases, db_manager):
+    """
+    Imprime la duración de cada fase del arranque hasta que el menú está listo y, aparte,
+    la de la primera operación de datos (abrir la conexión y verificar el esquema), que
+    en el uso normal ocurre recién cuando el usuario elige una opción.
+    """
+    print("Informe de arranque (ms)")
+    anterior = _INICIO
+    for fase, instante in fases:
+        print(f"  {fase:<28} {(instante - anterior) * 1000:>8.1f}")
+        anterior = instante
+    print(f"  {'menú listo':<28} {(anterior - _INICIO) * 1000:>8.1f}")
+
+    inicio = time.perf_counter()
+    db_manager.connect()
+    print(f"  {'primera operación de datos':<28} {(time.perf_counter() - inicio) * 1000:>8.1f}"
+          f"  (conexión + esquema, {db_manager.migraciones_aplicadas or 0} migraciones aplicadas)")
+
+def mostrar_menu(ui):
+    ui.print_title("Sistema Veterinaria Amigos Peludos")
+
+    print("Gestión de Registros")
+    print("1. Registrar nueva mascota")
+    print("2. Registrar nueva consulta")
+    print("\nConsultar Registros")
+    print("3. Ver lista de propietarios")
+    print("4. Ver lista de mascotas")
+    print("5. Ver historia clínica de una mascota")
+    print("\nActualizar Registros")
+    print("6. Actualizar propietario")
+    print("7. Actualizar mascota")
+    print("8. Actualizar consulta")
+    print("\nEliminar Registros")
+    print("9. Eliminar propietario")
+    print("10. Eliminar mascota")
+    print("11. Eliminar consulta")
+    print("\n12. Salir del sistema")
+    # Las opciones nuevas van después de las originales: los números ya aprendidos no cambian
+    print("\nBúsquedas y Reportes")
+    print("13. Buscar consultas por motivo o diagnóstico")
+    print("14. Ver estadísticas de consultas SQL")
+    print("15. Ver reporte de la clínica")
+    print("16. Ver expediente completo de un propietario")
+
+def main(argv=None):
     """Función principal que ejecuta el sistema de la veterinaria."""
+    fases = [('importaciones', time.perf_counter())]
+    args = leer_argumentos(sys.argv[1:] if argv is None else argv)
+    fases.append(('argumentos', time.perf_counter()))
+
     setup_logging()
-    logging.info("Se inició la aplicación")
-    
-    sistema = SistemaVeterinaria()
-    
+    fases.append(('logging', time.perf_counter()))
+    if args.batch:
+        return ejecutar_lote(args)
+
+    # El menú no necesita la base: DatabaseManager no abre la conexión hasta la primera operación
+    from database import DatabaseManager
+    from services import SistemaVeterinaria
+    from ui import UIUtils
+
+    sistema = SistemaVeterinaria(DatabaseManager(args.db, archivo=args.archivo))
+    fases.append(('sistema (sin conexión)', time.perf_counter()))
+    if args.startup_report:
+        try:
+            informe_arranque(fases, sistema.db_manager)
+        finally:
+            sistema.cerrar_sistema()
+        return 0
+
+    logger.info("Se inició la aplicación")
+
     try:
         while True:
-            UIUtils.print_title("Sistema Veterinaria Amigos Peludos")
-
-            print("Gestión de Registros")
-            print("1. Registrar nueva mascota")
-            print("2. Registrar nueva consulta")
-            print("\nConsultar Registros")
-            print("3. Ver lista de propietarios")
-            print("4. Ver lista de mascotas")
-            print("5. Ver historia clínica de una mascota")
-            print("\nActualizar Registros")
-            print("6. Actualizar propietario")
-            print("7. Actualizar mascota")
-            print("8. Actualizar consulta")
-            print("\nEliminar Registros")
-            print("9. Eliminar propietario")
-            print("10. Eliminar mascota")
-            print("11. Eliminar consulta")
-            print("\n12. Salir del sistema")
+            mostrar_menu(UIUtils)
 
             opcion = input("\nElija una opción: ").strip()
 
@@ -59,27 +158,31 @@ def main():
                 '9': sistema.eliminar_propietario,
                 '10': sistema.eliminar_mascota,
                 '11': sistema.eliminar_consulta,
+                '13': sistema.buscar_consultas,
+                '14': sistema.estadisticas_consultas,
+                '15': sistema.reporte_clinica,
+                '16': sistema.expediente_propietario,
             }
 
             if opcion in opciones:
                 opciones[opcion]()
-            elif opcion == '12':
+            elif opcion == OPCION_SALIR:
                 print("¡Gracias por usar el sistema! Hasta luego.")
-                logging.info("Se cerró la aplicación")
+                logger.info("Se cerró la aplicación")
                 break
             else:
                 UIUtils.print_message("Opción inválida. Por favor, intente nuevamente.")
             
             # Pausa para que el usuario pueda leer el resultado antes de limpiar la consola o mostrar el menú de nuevo
-            if opcion != '12':
+            if opcion != OPCION_SALIR:
                 input("\nPresione Enter para continuar...")
 
     except Exception as e:
-        logging.critical(f"Ocurrió un error crítico inesperado: {e}", exc_info=True)
+        logger.critical("Ocurrió un error crítico inesperado: %s", e, exc_info=True)
         print(f"\nOcurrió un error inesperado: {e}")
         print("Por favor, revise el archivo de log 'clinica_veterinaria.log' para más detalles.")
     finally:
         sistema.cerrar_sistema()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,13 +1,47 @@
 # models.py
-from datetime import datetime, date
+from datetime import date, datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8192)
+def parse_fecha_iso(fecha):
+    """
+    Convierte 'YYYY-MM-DD' en date. Las fechas que vienen de la base ('2025-06-05') usan
+    date.fromisoformat, mucho más barato que strptime; el resto ('2025-6-5') pasa por
+    strptime como siempre. Al estar cacheado, las consultas del mismo día comparten el
+    mismo objeto date (menos memoria).
+    """
+    if len(fecha) == 10 and fecha[4] == "-" and fecha[7] == "-":
+        try:
+            return date.fromisoformat(fecha)
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(fecha, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Formato de fecha de la cadena incorrecto. Esperado YYYY-MM-DD.") from None
+
+
+# Los modelos usan __slots__ (sin __dict__ por instancia) y ofrecen from_row(), que
+# hidrata directamente desde una fila de SQLite en el orden de columnas de database.py
+# sin pasar por las validaciones de __init__.
 
 class Propietario:
+    __slots__ = ("id", "nombre", "telefono", "direccion")
+
     def __init__(self, nombre, telefono, direccion, id=None):
         self.id = id
         self.nombre = nombre
         self.telefono = telefono
         self.direccion = direccion
 
+    @classmethod
+    def from_row(cls, row):
+        """Fila (id, nombre, telefono, direccion)."""
+        propietario = cls.__new__(cls)
+        propietario.id, propietario.nombre, propietario.telefono, propietario.direccion = row
+        return propietario
+
     def __str__(self):
         return (
             f"ID Propietario: {self.id}\n"
@@ -17,6 +51,8 @@ class Propietario:
         )
 
 class Mascota:
+    __slots__ = ("id", "nombre", "especie", "raza", "edad", "propietario_id", "propietario_nombre")
+
     def __init__(self, nombre, especie, raza, edad, propietario_id, id=None, propietario_nombre=None):
         self.id = id
         self.nombre = nombre
@@ -26,6 +62,14 @@ class Mascota:
         self.propietario_id = propietario_id
         self.propietario_nombre = propietario_nombre
 
+    @classmethod
+    def from_row(cls, row):
+        """Fila (id, nombre, especie, raza, edad, id_propietario, nombre_propietario)."""
+        mascota = cls.__new__(cls)
+        (mascota.id, mascota.nombre, mascota.especie, mascota.raza, mascota.edad,
+         mascota.propietario_id, mascota.propietario_nombre) = row
+        return mascota
+
     def __str__(self):
         propietario_display = self.propietario_nombre if self.propietario_nombre else f"ID Propietario: {self.propietario_id}"
         return (
@@ -38,15 +82,14 @@ class Mascota:
         )
 
 class Consulta:
+    __slots__ = ("id", "fecha", "motivo", "diagnostico", "mascota_id", "mascota_nombre")
+
     def __init__(self, fecha, motivo, diagnostico, mascota_id, id=None, mascota_nombre=None):
         self.id = id
         if isinstance(fecha, date):
             self.fecha = fecha
         elif isinstance(fecha, str):
-            try:
-                self.fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
-            except ValueError:
-                raise ValueError("Formato de fecha de la cadena incorrecto. Esperado YYYY-MM-DD.")
+            self.fecha = parse_fecha_iso(fecha)
         else:
             raise ValueError("El argumento 'fecha' debe ser una cadena (YYYY-MM-DD) o un objeto datetime.date")
         self.motivo = motivo
@@ -54,6 +97,14 @@ class Consulta:
         self.mascota_id = mascota_id
         self.mascota_nombre = mascota_nombre
 
+    @classmethod
+    def from_row(cls, row):
+        """Fila (id, fecha 'YYYY-MM-DD', motivo, diagnostico, id_mascota, nombre_mascota)."""
+        consulta = cls.__new__(cls)
+        consulta.id, fecha, consulta.motivo, consulta.diagnostico, consulta.mascota_id, consulta.mascota_nombre = row
+        consulta.fecha = parse_fecha_iso(fecha)
+        return consulta
+
     def __str__(self):
         return (
             f"ID Consulta: {self.id}\n"
@@ -61,4 +112,25 @@ class Consulta:
             f"Motivo: {self.motivo}\n"
             f"Diagnóstico: {self.diagnostico}\n"
             f"Mascota: {self.mascota_nombre if self.mascota_nombre else f'ID Mascota: {self.mascota_id}'}"
-        )
\ No newline at end of file
+        )
+
+
+# Expediente completo de un propietario (DatabaseManager.get_expediente_propietario)
+
+class ExpedienteMascota:
+    __slots__ = ("mascota", "consultas", "total_consultas")
+
+    def __init__(self, mascota, consultas=None, total_consultas=0):
+        self.mascota = mascota
+        # De la más reciente a la más antigua; con un límite, solo las últimas
+        self.consultas = consultas if consultas is not None else []
+        # Todas las que tiene la mascota, aunque `consultas` esté limitada
+        self.total_consultas = total_consultas
+
+
+class Expediente:
+    __slots__ = ("propietario", "mascotas")
+
+    def __init__(self, propietario, mascotas=None):
+        self.propietario = propietario
+        self.mascotas = mascotas if mascotas is not None else []  # ExpedienteMascota, por ID de mascota
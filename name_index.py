@@ -0,0 +1,196 @@
+# name_index.py
+"""Índice en memoria de nombres para búsquedas aproximadas (sin tildes y con errores de tipeo)."""
+import heapq
+import threading
+import unicodedata
+from itertools import combinations
+
+
+def normalizar(texto):
+    """
+    Palabras de `texto` sin tildes, en minúsculas y sin signos:
+    "  José  PÉREZ-Núñez " -> ["jose", "perez", "nunez"].
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+    return "".join(c if c.isalnum() else " " for c in sin_tildes).split()
+
+
+def trigramas(palabra):
+    """Trigramas de la palabra con relleno, como pg_trgm: "ana" -> {"  a", " an", "ana", "na "}."""
+    relleno = f"  {palabra} "
+    return frozenset(relleno[i:i + 3] for i in range(len(relleno) - 2))
+
+
+class NameIndex:
+    """
+    Índice de trigramas sobre las palabras de los nombres. Cada palabra distinta se indexa
+    una sola vez (hay muchas menos palabras que nombres: "Pérez" se repite en miles de
+    propietarios), así que una búsqueda compara la consulta con el vocabulario y luego
+    cruza los conjuntos de IDs de las palabras parecidas, sin recorrer todos los nombres.
+
+    La similitud de un nombre es la suma, por cada palabra buscada, de la similitud de su
+    palabra más parecida en el nombre, dividida por las palabras buscadas (cada palabra de
+    más en el nombre cuenta media). "Jose Perez" contra "José Pérez" da 1.0 y contra
+    "José Pérez Gómez" 0.8. Es segura entre hilos.
+
+    La similitud no se calcula nombre por nombre: todos los candidatos que tienen la misma
+    cantidad de palabras y la misma mejor parecida para cada palabra buscada suman lo mismo,
+    así que se reparten en esos grupos con operaciones de conjuntos y solo se ordenan por
+    nombre los del grupo que llega al límite de resultados. Los nombres a los que les falta
+    alguna palabra buscada solo se reparten si los que las tienen todas no llenan el límite.
+    """
+
+    def __init__(self, umbral_palabra=0.4):
+        # Similitud mínima para considerar parecidas dos palabras
+        self.umbral_palabra = umbral_palabra
+        self._nombres = {}      # id -> (nombre, palabras)
+        self._ids = {}          # palabra -> {id}
+        self._vocabulario = {}  # palabra -> trigramas
+        self._palabras = {}     # trigrama -> {palabra}
+        self._largos = {}       # cantidad de palabras -> {id}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._nombres)
+
+    def add(self, entidad_id, nombre):
+        """Indexa (o reemplaza) el nombre de `entidad_id`."""
+        palabras = tuple(dict.fromkeys(normalizar(nombre)))
+        with self._lock:
+            self._quitar(entidad_id)
+            self._nombres[entidad_id] = (nombre, palabras)
+            self._largos.setdefault(len(palabras), set()).add(entidad_id)
+            for palabra in palabras:
+                ids = self._ids.get(palabra)
+                if ids is None:
+                    ids = self._ids[palabra] = set()
+                    self._vocabulario[palabra] = tris = trigramas(palabra)
+                    for tri in tris:
+                        self._palabras.setdefault(tri, set()).add(palabra)
+                ids.add(entidad_id)
+
+    def remove(self, entidad_id):
+        with self._lock:
+            self._quitar(entidad_id)
+
+    def _quitar(self, entidad_id):
+        entrada = self._nombres.pop(entidad_id, None)
+        if entrada is None:
+            return
+        largo = self._largos[len(entrada[1])]
+        largo.discard(entidad_id)
+        if not largo:
+            del self._largos[len(entrada[1])]
+        for palabra in entrada[1]:
+            ids = self._ids[palabra]
+            ids.discard(entidad_id)
+            if not ids:
+                # Última aparición: la palabra sale del vocabulario
+                del self._ids[palabra]
+                for tri in self._vocabulario.pop(palabra):
+                    palabras = self._palabras[tri]
+                    palabras.discard(palabra)
+                    if not palabras:
+                        del self._palabras[tri]
+
+    def _parecidas(self, palabra):
+        """{palabra del vocabulario: similitud} de las palabras parecidas a `palabra`."""
+        tris = trigramas(palabra)
+        comunes = {}
+        for tri in tris:
+            for candidata in self._palabras.get(tri, ()):
+                comunes[candidata] = comunes.get(candidata, 0) + 1
+        parecidas = {}
+        for candidata, n in comunes.items():
+            # Coeficiente de Jaccard entre los trigramas de las dos palabras
+            similitud = n / (len(tris) + len(self._vocabulario[candidata]) - n)
+            if similitud >= self.umbral_palabra:
+                parecidas[candidata] = similitud
+        return parecidas
+
+    def _niveles(self, similares):
+        """[(similitud, {id})] de los nombres con cada palabra parecida, de mayor a menor similitud."""
+        por_similitud = {}
+        for palabra, similitud in similares.items():
+            por_similitud.setdefault(similitud, []).append(self._ids[palabra])
+        return [(similitud, ids[0] if len(ids) == 1 else set().union(*ids))
+                for similitud, ids in sorted(por_similitud.items(), reverse=True)]
+
+    def _agrupar(self, candidatos, niveles, umbral, tope, todas, por_similitud):
+        """
+        Reparte `candidatos` en grupos de igual similitud y agrega a `por_similitud`
+        ({similitud: [{id}]}) los que llegan al umbral. `todas` indica que cada candidato
+        tiene alguna parecida de todas las palabras buscadas.
+        """
+        k = len(niveles)
+        # `tope` es la suma si cada palabra buscada encontrara su mejor parecida: descarta,
+        # sin calcular nada, los largos de nombre que no llegan al umbral
+        grupos = []
+        for largo, ids in self._largos.items():
+            if tope >= umbral * (k + max(0, largo - k) / 2):
+                parte = candidatos & ids
+                if parte:
+                    grupos.append((largo, 0.0, parte))
+        # Cada palabra buscada reparte los grupos según su mejor parecida en el nombre. Con
+        # `todas`, lo que queda al llegar al último nivel está en ese nivel.
+        for ids_palabra in niveles:
+            repartidos = []
+            for largo, total, ids in grupos:
+                for n, (similitud, con_palabra) in enumerate(ids_palabra, 1):
+                    parte = ids if todas and n == len(ids_palabra) else ids & con_palabra
+                    if parte:
+                        repartidos.append((largo, total + similitud, parte))
+                        ids = ids - parte
+                if ids:
+                    repartidos.append((largo, total, ids))
+            grupos = repartidos
+        for largo, total, ids in grupos:
+            similitud = total / (k + max(0, largo - k) / 2)
+            if similitud >= umbral:
+                por_similitud.setdefault(similitud, []).append(ids)
+
+    def search(self, texto, limit=5, umbral=0.6):
+        """[(id, nombre, similitud)] de los `limit` nombres más parecidos a `texto` con similitud >= `umbral`."""
+        consulta = list(dict.fromkeys(normalizar(texto)))
+        if not consulta or limit <= 0:
+            return []
+        k = len(consulta)
+        # Faltar m palabras limita la similitud a (k - m) / k: solo hacen falta los
+        # nombres que contienen al menos `requeridas` de las palabras buscadas
+        requeridas = max(1, k - int(k * (1 - umbral) + 1e-9))
+        with self._lock:
+            niveles = [self._niveles(self._parecidas(palabra)) for palabra in consulta]
+            conjuntos = [ids[0][1] if len(ids) == 1 else set().union(*(c for _, c in ids)) for ids in niveles]
+            mejores = [ids[0][0] if ids else 0.0 for ids in niveles]
+            tope = sum(mejores)
+            # Primero los nombres con todas las palabras buscadas (la intersección empieza
+            # por el conjunto más chico)
+            con_todas = conjuntos[0] if k == 1 else set.intersection(*sorted(conjuntos, key=len))
+            por_similitud = {}
+            self._agrupar(con_todas, niveles, umbral, tope, True, por_similitud)
+            # A un nombre al que le falta una palabra no le alcanza para superar esta cota: si
+            # ya hay `limit` resultados por encima, no hace falta buscar entre esos
+            cota = (tope - min(mejores)) / k
+            if requeridas < k and sum(len(ids) for similitud, partes in por_similitud.items()
+                                      if similitud > cota for ids in partes) < limit:
+                incompletos = set().union(*(set.intersection(*grupo)
+                                            for grupo in combinations(conjuntos, requeridas))) - con_todas
+                self._agrupar(incompletos, niveles, umbral, tope, False, por_similitud)
+            resultados = []
+            for similitud in sorted(por_similitud, reverse=True):
+                faltan = limit - len(resultados)
+                if faltan <= 0:
+                    break
+                primeros = heapq.nsmallest(faltan, ((self._nombres[i][0], i) for parte in por_similitud[similitud]
+                                                    for i in parte))
+                resultados.extend((i, nombre, similitud) for nombre, i in primeros)
+        return resultados
+
+    def clear(self):
+        with self._lock:
+            self._nombres.clear()
+            self._ids.clear()
+            self._vocabulario.clear()
+            self._palabras.clear()
+            self._largos.clear()
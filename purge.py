@@ -0,0 +1,246 @@
+# purge.py
+"""
+Purga en bloque según políticas de retención.
+
+Uso (desde la carpeta del proyecto):
+    python purge.py propietarios_inactivos --anios 10 --simular   # solo cuenta lo que se borraría
+    python purge.py propietarios_inactivos --anios 10
+    python purge.py consultas_antiguas --antes-de 2015-01-01 --lote 2000
+
+Políticas:
+- propietarios_inactivos: propietarios cuya última consulta (de cualquiera de sus mascotas)
+  es anterior al corte. Se borran con sus mascotas e historias clínicas. Los que nunca
+  tuvieron una consulta no cuentan como inactivos: no hay ninguna fecha que lo indique.
+- mascotas_inactivas: lo mismo por mascota (se borra con su historia clínica).
+- consultas_antiguas: consultas anteriores al corte.
+Con --archivo las consultas archivadas también cuentan como actividad, y la purga se
+lleva las archivadas de lo que borra (ver archive.py).
+
+Las víctimas de cada lote salen de recorrer propietarios o mascotas en orden de ID,
+continuando desde el último ID del lote anterior, buscando la última consulta de cada uno
+en el índice (id_mascota, fecha). --simular cuenta con esa misma consulta, así el conteo
+coincide con lo que se borra. Cada lote
+es una transacción corta: entre lotes se libera la conexión escritora, así el resto del
+programa puede seguir escribiendo durante una purga larga. Los triggers mantienen al día
+la búsqueda, las estadísticas y la versión de los datos, igual que en un borrado normal.
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import date
+
+from database import DatabaseManager
+from log_config import setup_logging
+from models import parse_fecha_iso
+
+logger = logging.getLogger(__name__)
+
+TABLAS = ("propietarios", "mascotas", "consultas")
+
+# Fecha de la última consulta de la mascota `m` ('' si no tiene ninguna), por el índice
+# (id_mascota, fecha). Con base de archivo cuentan también las consultas archivadas: una
+# mascota cuyo historial entero está archivado no debe parecer sin consultas ni más activa.
+_ULTIMA = "COALESCE((SELECT MAX(fecha) FROM consultas WHERE id_mascota = m.id), '')"
+_ULTIMA_CON_ARCHIVO = (f"max({_ULTIMA}, "
+                       "COALESCE((SELECT MAX(fecha) FROM consultas_archivo WHERE id_mascota = m.id), ''))")
+
+# tabla: de dónde se borra (el resto lo borra el ON DELETE CASCADE)
+# victimas: los siguientes IDs a borrar (:corte, :despues_de, :limite), en orden; {ultima}
+#   es _ULTIMA o _ULTIMA_CON_ARCHIVO
+# conteo: filas exactas que se borrarían en (propietarios, mascotas, consultas); {victimas}
+#   es la sentencia de victimas sin límite, así el conteo y el borrado eligen las mismas filas
+# dependientes: (mascotas, consultas) que arrastra el cascade de los IDs :ids (lista JSON)
+Politica = namedtuple("Politica", "tabla descripcion victimas conteo dependientes")
+
+POLITICAS = {
+    "propietarios_inactivos": Politica(
+        "propietarios",
+        "propietarios sin consultas desde el corte, con sus mascotas e historias",
+        """
+        SELECT id FROM (
+            SELECT p.id, (SELECT MAX({ultima}) FROM mascotas m WHERE m.id_propietario = p.id) AS ultima
+            FROM propietarios p
+            WHERE p.id > :despues_de
+        )
+        WHERE NULLIF(ultima, '') < :corte
+        ORDER BY id
+        LIMIT :limite
+        """,
+        """
+        WITH victimas AS MATERIALIZED ({victimas}),
+        sus_mascotas AS MATERIALIZED (
+            SELECT id FROM mascotas WHERE id_propietario IN (SELECT id FROM victimas)
+        )
+        SELECT (SELECT COUNT(*) FROM victimas),
+               (SELECT COUNT(*) FROM sus_mascotas),
+               (SELECT COUNT(*) FROM consultas WHERE id_mascota IN (SELECT id FROM sus_mascotas))
+        """,
+        """
+        WITH sus_mascotas AS MATERIALIZED (
+            SELECT id FROM mascotas WHERE id_propietario IN (SELECT value FROM json_each(:ids))
+        )
+        SELECT (SELECT COUNT(*) FROM sus_mascotas),
+               (SELECT COUNT(*) FROM consultas WHERE id_mascota IN (SELECT id FROM sus_mascotas))
+        """,
+    ),
+    "mascotas_inactivas": Politica(
+        "mascotas",
+        "mascotas sin consultas desde el corte, con sus historias",
+        """
+        SELECT id FROM (
+            SELECT m.id, {ultima} AS ultima FROM mascotas m WHERE m.id > :despues_de
+        )
+        WHERE NULLIF(ultima, '') < :corte
+        ORDER BY id
+        LIMIT :limite
+        """,
+        """
+        WITH victimas AS MATERIALIZED ({victimas})
+        SELECT 0, (SELECT COUNT(*) FROM victimas),
+               (SELECT COUNT(*) FROM consultas WHERE id_mascota IN (SELECT id FROM victimas))
+        """,
+        "SELECT 0, COUNT(*) FROM consultas WHERE id_mascota IN (SELECT value FROM json_each(:ids))",
+    ),
+    # Las consultas borradas desaparecen del índice por fecha: cada lote empieza por el
+    # principio del índice sin volver a pasar por filas ya descartadas.
+    "consultas_antiguas": Politica(
+        "consultas",
+        "consultas anteriores al corte",
+        "SELECT id FROM consultas WHERE fecha < :corte ORDER BY fecha LIMIT :limite",
+        "SELECT 0, 0, COUNT(*) FROM consultas WHERE fecha < :corte",
+        None,
+    ),
+}
+
+
+def fecha_de_corte(anios, hoy=None):
+    """Fecha de hace `anios` años, en formato 'YYYY-MM-DD' (un 29 de febrero pasa al 28)."""
+    hoy = hoy or date.today()
+    try:
+        corte = hoy.replace(year=hoy.year - anios)
+    except ValueError:
+        corte = hoy.replace(year=hoy.year - anios, day=28)
+    return corte.isoformat()
+
+
+def _politica(nombre):
+    try:
+        return POLITICAS[nombre]
+    except KeyError:
+        raise ValueError(f"Política desconocida: {nombre}. Opciones: {', '.join(POLITICAS)}") from None
+
+
+def _victimas(db_manager, definicion):
+    """Sentencia de las víctimas de la política, con las consultas archivadas si hay base de archivo."""
+    return definicion.victimas.format(ultima=_ULTIMA_CON_ARCHIVO if db_manager.archivo else _ULTIMA)
+
+
+def contar(db_manager, politica, corte):
+    """Filas exactas que borraría la purga, por tabla: {"propietarios": n, "mascotas": n, "consultas": n}."""
+    definicion = _politica(politica)
+    conteo = definicion.conteo.format(victimas=_victimas(db_manager, definicion))
+    # LIMIT -1: sin límite
+    return dict(zip(TABLAS, db_manager.fetchone(conteo, {"corte": corte, "despues_de": 0, "limite": -1})))
+
+
+def purgar(db_manager, politica, corte, lote=500, pausa=0.01, progress=None):
+    """
+    Borra, en lotes de `lote` filas de la tabla de la política, todo lo que la política
+    selecciona con fecha de corte `corte` ('YYYY-MM-DD', exclusiva). Devuelve un resumen con
+    las filas previstas y borradas por tabla, los lotes y la duración del lote más largo
+    (el tiempo máximo que la purga retuvo la conexión escritora).
+    `progress(politica, resumen, previstas)` se llama después de cada lote.
+    """
+    if lote <= 0:
+        raise ValueError("lote debe ser mayor que cero")
+    definicion = _politica(politica)
+    victimas = _victimas(db_manager, definicion)
+    previstas = contar(db_manager, politica, corte)
+    resumen = {"politica": politica, "corte": corte, "previstas": previstas,
+               "lotes": 0, "max_lote_ms": 0.0, **dict.fromkeys(TABLAS, 0)}
+    inicio = time.perf_counter()
+    despues_de = 0
+    while True:
+        inicio_lote = time.perf_counter()
+        with db_manager.transaction():
+            ids = [row[0] for row in db_manager.fetchall(
+                victimas, {"corte": corte, "despues_de": despues_de, "limite": lote})]
+            if not ids:
+                break
+            mascotas, consultas = (db_manager.fetchone(definicion.dependientes, {"ids": json.dumps(ids)})
+                                   if definicion.dependientes else (0, 0))
+            borradas = db_manager.delete_many(definicion.tabla, ids)
+            if borradas is None:
+                raise sqlite3.DatabaseError(f"No se pudo borrar un lote de {definicion.tabla} (ver el log).")
+        resumen[definicion.tabla] += borradas
+        resumen["mascotas"] += mascotas
+        resumen["consultas"] += consultas
+        resumen["lotes"] += 1
+        resumen["max_lote_ms"] = max(resumen["max_lote_ms"], (time.perf_counter() - inicio_lote) * 1000)
+        despues_de = ids[-1]
+        if progress:
+            progress(politica, resumen, previstas)
+        time.sleep(pausa)  # Aquí entran las escrituras que estaban esperando
+
+    resumen["segundos"] = time.perf_counter() - inicio
+    logger.info("Purga %s (corte %s): %s propietarios, %s mascotas y %s consultas eliminadas.",
+                politica, corte, resumen["propietarios"], resumen["mascotas"], resumen["consultas"],
+                extra={"operacion": f"purga_{politica}", "filas": sum(resumen[t] for t in TABLAS),
+                       "duracion_ms": round(resumen["segundos"] * 1000, 1)})
+    return resumen
+
+
+def _fecha(valor):
+    try:
+        return parse_fecha_iso(valor).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError("Use el formato AAAA-MM-DD, por ejemplo 2015-01-01.")
+
+
+def _filas(conteo):
+    return ", ".join(f"{conteo[tabla]} {tabla}" for tabla in TABLAS)
+
+
+def _mostrar_progreso(politica, resumen, previstas):
+    tabla = POLITICAS[politica].tabla
+    print(f"  lote {resumen['lotes']}: {resumen[tabla]}/{previstas[tabla]} {tabla} "
+          f"({resumen['max_lote_ms']:.0f} ms el lote más largo)", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Purga de datos según políticas de retención.")
+    parser.add_argument("politica", choices=tuple(POLITICAS))
+    corte = parser.add_mutually_exclusive_group(required=True)
+    corte.add_argument("--anios", type=int, help="Inactividad (o antigüedad) mínima en años")
+    corte.add_argument("--antes-de", type=_fecha, help="Fecha de corte (AAAA-MM-DD, exclusiva)")
+    parser.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos")
+    parser.add_argument("--archivo", help="Base de datos de archivo de consultas antiguas (ver archive.py)")
+    parser.add_argument("--lote", type=int, default=500, help="Filas por transacción")
+    parser.add_argument("--simular", action="store_true", help="Solo cuenta las filas que se borrarían")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    fecha = args.antes_de or fecha_de_corte(args.anios)
+    db_manager = DatabaseManager(args.db, archivo=args.archivo)
+    try:
+        print(f"Política {args.politica}: {POLITICAS[args.politica].descripcion} (corte {fecha}).")
+        if args.simular:
+            print(f"Se borrarían {_filas(contar(db_manager, args.politica, fecha))}.")
+            return 0
+        resumen = purgar(db_manager, args.politica, fecha, args.lote, progress=_mostrar_progreso)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"La purga se detuvo: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db_manager.close_connection()
+
+    print(f"Eliminados {_filas(resumen)} en {resumen['lotes']} lotes ({resumen['segundos']:.2f} s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
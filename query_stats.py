@@ -0,0 +1,107 @@
+# query_stats.py
+"""
+Instrumentación de las sentencias SQL de DatabaseManager.
+
+Por cada sentencia (normalizada) acumula llamadas, filas, tiempo total/máximo y un
+histograma de latencias. Las que superan el umbral se escriben en el log de consultas
+lentas junto con su EXPLAIN QUERY PLAN.
+"""
+import bisect
+import logging
+import re
+import threading
+
+from log_config import handler_en_segundo_plano
+
+# Límites superiores (ms) de los cubos del histograma; el último cubo es "más de 1000 ms"
+HISTOGRAM_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+_ESPACIOS = re.compile(r"\s+")
+
+slow_logger = logging.getLogger("consultas_lentas")
+
+
+def normalizar_sql(sql):
+    return _ESPACIOS.sub(" ", sql).strip()
+
+
+class _Estadistica:
+    __slots__ = ("llamadas", "filas", "total_ms", "max_ms", "histograma")
+
+    def __init__(self):
+        self.llamadas = 0
+        self.filas = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histograma = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+
+class QueryStats:
+    def __init__(self, slow_threshold_ms=100.0, slow_log_path="consultas_lentas.log"):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._stats = {}
+        self._normalizadas = {}  # Cache texto original -> texto normalizado
+        self._lock = threading.Lock()
+        if slow_log_path and not slow_logger.handlers:
+            handler = logging.FileHandler(slow_log_path, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+            # Se escribe desde un hilo aparte: registrar una consulta lenta no la hace más lenta
+            slow_logger.addHandler(handler_en_segundo_plano(handler))
+            slow_logger.setLevel(logging.WARNING)
+            slow_logger.propagate = False
+
+    def record(self, sql, params, elapsed_ms, filas, conn):
+        """Hook de DatabaseManager: se llama después de cada sentencia ejecutada."""
+        clave = self._normalizadas.get(sql)
+        if clave is None:
+            clave = self._normalizadas.setdefault(sql, normalizar_sql(sql))
+        with self._lock:
+            estadistica = self._stats.get(clave)
+            if estadistica is None:
+                estadistica = self._stats[clave] = _Estadistica()
+            estadistica.llamadas += 1
+            estadistica.filas += max(filas, 0)
+            estadistica.total_ms += elapsed_ms
+            if elapsed_ms > estadistica.max_ms:
+                estadistica.max_ms = elapsed_ms
+            estadistica.histograma[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, elapsed_ms)] += 1
+        if self.slow_threshold_ms is not None and elapsed_ms >= self.slow_threshold_ms:
+            self._log_slow(clave, params, elapsed_ms, filas, conn)
+
+    def _log_slow(self, sql, params, elapsed_ms, filas, conn):
+        plan = self.explain(conn, sql, params)
+        slow_logger.warning("%.1f ms, %s filas: %s | params=%r | plan: %s",
+                            elapsed_ms, filas, sql, params, ' ; '.join(plan) or 'n/d')
+
+    @staticmethod
+    def explain(conn, sql, params=()):
+        """Devuelve el EXPLAIN QUERY PLAN de la sentencia como lista de líneas."""
+        if not sql.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")):
+            return []
+        try:
+            return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        except Exception as e:  # El plan es informativo: nunca debe romper la operación original
+            return [f"(sin plan: {e})"]
+
+    def summary(self, top=None, orden="total_ms"):
+        """Lista de estadísticas por sentencia, de mayor a menor según `orden`."""
+        with self._lock:
+            filas = [
+                {
+                    "sql": sql,
+                    "llamadas": e.llamadas,
+                    "filas": e.filas,
+                    "total_ms": round(e.total_ms, 3),
+                    "media_ms": round(e.total_ms / e.llamadas, 4),
+                    "max_ms": round(e.max_ms, 3),
+                    "histograma": dict(zip([f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"],
+                                           e.histograma)),
+                }
+                for sql, e in self._stats.items()
+            ]
+        filas.sort(key=lambda f: f[orden], reverse=True)
+        return filas[:top] if top else filas
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,81 @@
+# reportes.py
+"""
+Reportes de la clínica sobre las tablas de resumen que mantienen los triggers.
+
+Uso:
+    python reportes.py [--db clinica_veterinaria.db] [--desde 2024-01] [--hasta 2024-12] [--top 10]
+    python reportes.py --reconstruir    # recalcula las tablas de resumen (reparación)
+
+Con base de archivo (archive.py) hay que indicarla con --archivo: las consultas archivadas
+siguen contando en los reportes y --reconstruir sin ella las dejaría fuera.
+
+Leer un reporte no recorre las tablas de consultas ni de mascotas, así que tarda lo mismo
+con un mes de datos que con años.
+"""
+import argparse
+import re
+import sys
+import time
+
+from database import DatabaseManager
+
+_MES = re.compile(r"^\d{4}-\d{2}$")
+
+
+def imprimir_reporte(db_manager, mes_desde=None, mes_hasta=None, top=10):
+    print("Consultas por especie y mes")
+    filas = db_manager.get_consultas_por_especie_mes(mes_desde, mes_hasta)
+    if not filas:
+        print("  (sin consultas en el período)")
+    for especie, mes, total in filas:
+        print(f"  {mes}  {especie or '(sin especie)':<20} {total:>8}")
+
+    print(f"\nPropietarios con más mascotas (top {top})")
+    filas = db_manager.get_mascotas_por_propietario(top)
+    if not filas:
+        print("  (sin mascotas registradas)")
+    for propietario_id, nombre, total in filas:
+        print(f"  {nombre:<30} (ID: {propietario_id}) {total:>6}")
+
+    print(f"\nDiagnósticos más frecuentes (top {top})")
+    filas = db_manager.get_top_diagnosticos(top)
+    if not filas:
+        print("  (sin diagnósticos registrados)")
+    for diagnostico, total in filas:
+        print(f"  {diagnostico:<40} {total:>8}")
+
+
+def _mes(valor):
+    if not _MES.match(valor):
+        raise argparse.ArgumentTypeError("Use el formato AAAA-MM, por ejemplo 2024-06.")
+    return valor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reportes de la Clínica Veterinaria.")
+    parser.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos")
+    parser.add_argument("--archivo", help="Base de datos de archivo de consultas antiguas (ver archive.py)")
+    parser.add_argument("--desde", type=_mes, help="Primer mes (AAAA-MM) del reporte por especie")
+    parser.add_argument("--hasta", type=_mes, help="Último mes (AAAA-MM) del reporte por especie")
+    parser.add_argument("--top", type=int, default=10, help="Filas de los rankings")
+    parser.add_argument("--reconstruir", action="store_true",
+                        help="Recalcula las tablas de resumen desde las tablas de datos")
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.db, archivo=args.archivo)
+    try:
+        if args.reconstruir:
+            inicio = time.perf_counter()
+            if not db_manager.rebuild_stats():
+                print("No se pudieron reconstruir las estadísticas (ver clinica_veterinaria.log).", file=sys.stderr)
+                return 1
+            print(f"Estadísticas reconstruidas en {time.perf_counter() - inicio:.2f} s.")
+            return 0
+        imprimir_reporte(db_manager, args.desde, args.hasta, args.top)
+    finally:
+        db_manager.close_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
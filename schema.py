@@ -0,0 +1,465 @@
+# schema.py
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+La versión aplicada se guarda en PRAGMA user_version. Cada migración es una lista de
+sentencias que se ejecutan en una sola transacción junto con el cambio de versión, de
+modo que una base existente se actualiza en su lugar y nunca queda a medio migrar.
+Para cambiar el esquema se AGREGA una migración al final; nunca se editan las anteriores.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _triggers_cambios(tabla):
+    """Triggers que registran en `cambios` cada modificación de `tabla`."""
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS cambios_{tabla}_{evento.lower()} AFTER {evento} ON {tabla} BEGIN
+            UPDATE cambios SET version = version + 1, actualizado = datetime('now')
+            WHERE tabla = '{tabla}';
+        END
+        """
+        for evento in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+# Recalcula desde cero las tablas de resumen (migración 6 y DatabaseManager.rebuild_stats)
+STATS_REBUILD = [
+    "DELETE FROM stats_consultas_especie_mes",
+    "DELETE FROM stats_mascotas_propietario",
+    "DELETE FROM stats_diagnosticos",
+    """
+    INSERT INTO stats_consultas_especie_mes (especie, mes, total)
+    SELECT COALESCE(m.especie, ''), substr(c.fecha, 1, 7), COUNT(*)
+    FROM consultas c JOIN mascotas m ON c.id_mascota = m.id
+    GROUP BY 1, 2
+    """,
+    """
+    INSERT INTO stats_mascotas_propietario (id_propietario, total)
+    SELECT id_propietario, COUNT(*) FROM mascotas
+    WHERE id_propietario IS NOT NULL
+    GROUP BY id_propietario
+    """,
+    """
+    INSERT INTO stats_diagnosticos (diagnostico, total)
+    SELECT lower(trim(diagnostico)), COUNT(*) FROM consultas
+    WHERE trim(COALESCE(diagnostico, '')) <> ''
+    GROUP BY 1
+    """,
+]
+
+
+def _sumar_especie_mes(especie, mes, delta):
+    return f"""
+            INSERT INTO stats_consultas_especie_mes (especie, mes, total) VALUES ({especie}, {mes}, {delta})
+            ON CONFLICT (especie, mes) DO UPDATE SET total = total + excluded.total;"""
+
+
+def _sumar_diagnostico(diagnostico, delta):
+    return f"""
+            INSERT INTO stats_diagnosticos (diagnostico, total)
+            SELECT lower(trim({diagnostico})), {delta} WHERE trim(COALESCE({diagnostico}, '')) <> ''
+            ON CONFLICT (diagnostico) DO UPDATE SET total = total + excluded.total;"""
+
+
+def _sumar_mascotas(propietario, delta):
+    return f"""
+            INSERT INTO stats_mascotas_propietario (id_propietario, total)
+            SELECT {propietario}, {delta} WHERE {propietario} IS NOT NULL
+            ON CONFLICT (id_propietario) DO UPDATE SET total = total + excluded.total;"""
+
+
+_ESPECIE_DE = "(SELECT COALESCE(especie, '') FROM mascotas WHERE id = {}.id_mascota)"
+
+
+def _sumar_consulta_especie_mes(fila, delta):
+    """
+    Suma la consulta `fila` ('new'/'old') a su especie y mes. Si la mascota no existe no
+    inserta nada, así el error que se informa es el de la clave foránea y no un NOT NULL
+    de la tabla de resumen.
+    """
+    return f"""
+            INSERT INTO stats_consultas_especie_mes (especie, mes, total)
+            SELECT COALESCE(especie, ''), substr({fila}.fecha, 1, 7), {delta} FROM mascotas WHERE id = {fila}.id_mascota
+            ON CONFLICT (especie, mes) DO UPDATE SET total = total + excluded.total;"""
+_LIMPIAR_CEROS = """
+            DELETE FROM stats_consultas_especie_mes WHERE total <= 0;
+            DELETE FROM stats_diagnosticos WHERE total <= 0;
+            DELETE FROM stats_mascotas_propietario WHERE total <= 0;"""
+
+
+MIGRATIONS = [
+    # 1: Tablas base. IF NOT EXISTS porque las bases creadas antes de existir las
+    #    migraciones ya las tienen (con user_version = 0).
+    [
+        """
+        CREATE TABLE IF NOT EXISTS propietarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL UNIQUE,
+            telefono TEXT,
+            direccion TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS mascotas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            especie TEXT,
+            raza TEXT,
+            edad INTEGER,
+            id_propietario INTEGER,
+            FOREIGN KEY (id_propietario) REFERENCES propietarios(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS consultas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            motivo TEXT,
+            diagnostico TEXT,
+            id_mascota INTEGER,
+            FOREIGN KEY (id_mascota) REFERENCES mascotas(id) ON DELETE CASCADE
+        )
+        """,
+    ],
+    # 2: Índices para el historial clínico (filtro por mascota ordenado por fecha),
+    #    para los ON DELETE CASCADE y para la búsqueda de propietarios por nombre (LIKE).
+    [
+        "CREATE INDEX IF NOT EXISTS idx_consultas_mascota_fecha ON consultas (id_mascota, fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_mascotas_propietario ON mascotas (id_propietario)",
+        "CREATE INDEX IF NOT EXISTS idx_propietarios_nombre_nocase ON propietarios (nombre COLLATE NOCASE)",
+    ],
+    # 3: Puntos de control de bulk_import.py.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            fuente TEXT NOT NULL,
+            entidad TEXT NOT NULL,
+            filas_procesadas INTEGER NOT NULL,
+            actualizado TEXT NOT NULL,
+            PRIMARY KEY (fuente, entidad)
+        )
+        """,
+    ],
+    # 4: Índice de texto completo (FTS5) sobre motivo y diagnóstico de las consultas.
+    #    Tabla de contenido externo: el texto vive solo en `consultas` y los triggers
+    #    mantienen el índice sincronizado con cada INSERT, UPDATE y DELETE.
+    [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS consultas_fts USING fts5(
+            motivo, diagnostico,
+            content='consultas', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS consultas_fts_ai AFTER INSERT ON consultas BEGIN
+            INSERT INTO consultas_fts (rowid, motivo, diagnostico)
+            VALUES (new.id, new.motivo, new.diagnostico);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS consultas_fts_ad AFTER DELETE ON consultas BEGIN
+            INSERT INTO consultas_fts (consultas_fts, rowid, motivo, diagnostico)
+            VALUES ('delete', old.id, old.motivo, old.diagnostico);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS consultas_fts_au AFTER UPDATE OF motivo, diagnostico ON consultas BEGIN
+            INSERT INTO consultas_fts (consultas_fts, rowid, motivo, diagnostico)
+            VALUES ('delete', old.id, old.motivo, old.diagnostico);
+            INSERT INTO consultas_fts (rowid, motivo, diagnostico)
+            VALUES (new.id, new.motivo, new.diagnostico);
+        END
+        """,
+        # Indexa las consultas que ya existían
+        "INSERT INTO consultas_fts (consultas_fts) VALUES ('rebuild')",
+    ],
+    # 5: Versión y fecha de última modificación de cada tabla, para ETag/Last-Modified y
+    #    para invalidar cachés sin tener que consultar las tablas grandes.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS cambios (
+            tabla TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            actualizado TEXT NOT NULL
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO cambios (tabla, version, actualizado) VALUES
+            ('propietarios', 0, datetime('now')),
+            ('mascotas', 0, datetime('now')),
+            ('consultas', 0, datetime('now'))
+        """,
+        *_triggers_cambios("propietarios"),
+        *_triggers_cambios("mascotas"),
+        *_triggers_cambios("consultas"),
+    ],
+    # 6: Tablas de resumen para los reportes (consultas por especie y mes, mascotas por
+    #    propietario, diagnósticos más frecuentes), mantenidas por triggers en cada escritura.
+    #    Al borrar una mascota, su BEFORE DELETE descuenta sus consultas por especie/mes
+    #    mientras la mascota aún existe; las consultas que luego borra el ON DELETE CASCADE
+    #    ya no encuentran la mascota y no vuelven a descontar.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS stats_consultas_especie_mes (
+            especie TEXT NOT NULL,
+            mes TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (especie, mes)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_mascotas_propietario (
+            id_propietario INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_diagnosticos (
+            diagnostico TEXT PRIMARY KEY,
+            total INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_stats_consultas_mes ON stats_consultas_especie_mes (mes)",
+        # Los índices sobre total sirven para los "top N" y para borrar los contadores en cero
+        "CREATE INDEX IF NOT EXISTS idx_stats_consultas_total ON stats_consultas_especie_mes (total)",
+        "CREATE INDEX IF NOT EXISTS idx_stats_mascotas_total ON stats_mascotas_propietario (total)",
+        "CREATE INDEX IF NOT EXISTS idx_stats_diagnosticos_total ON stats_diagnosticos (total)",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_consultas_ai AFTER INSERT ON consultas BEGIN
+            {_sumar_especie_mes(_ESPECIE_DE.format("new"), "substr(new.fecha, 1, 7)", 1)}
+            {_sumar_diagnostico("new.diagnostico", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_consultas_ad AFTER DELETE ON consultas BEGIN
+            UPDATE stats_consultas_especie_mes SET total = total - 1
+            WHERE especie = {_ESPECIE_DE.format("old")} AND mes = substr(old.fecha, 1, 7);
+            {_sumar_diagnostico("old.diagnostico", -1)}
+            {_LIMPIAR_CEROS}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_consultas_au AFTER UPDATE OF fecha, id_mascota, diagnostico ON consultas BEGIN
+            UPDATE stats_consultas_especie_mes SET total = total - 1
+            WHERE especie = {_ESPECIE_DE.format("old")} AND mes = substr(old.fecha, 1, 7);
+            {_sumar_especie_mes(_ESPECIE_DE.format("new"), "substr(new.fecha, 1, 7)", 1)}
+            {_sumar_diagnostico("old.diagnostico", -1)}
+            {_sumar_diagnostico("new.diagnostico", 1)}
+            {_LIMPIAR_CEROS}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_mascotas_ai AFTER INSERT ON mascotas BEGIN
+            {_sumar_mascotas("new.id_propietario", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_mascotas_bd BEFORE DELETE ON mascotas BEGIN
+            UPDATE stats_consultas_especie_mes
+            SET total = total - (SELECT COUNT(*) FROM consultas
+                                 WHERE id_mascota = old.id AND substr(fecha, 1, 7) = stats_consultas_especie_mes.mes)
+            WHERE especie = COALESCE(old.especie, '')
+              AND mes IN (SELECT substr(fecha, 1, 7) FROM consultas WHERE id_mascota = old.id);
+            {_sumar_mascotas("old.id_propietario", -1)}
+            {_LIMPIAR_CEROS}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_mascotas_au AFTER UPDATE OF especie, id_propietario ON mascotas BEGIN
+            UPDATE stats_consultas_especie_mes
+            SET total = total - (SELECT COUNT(*) FROM consultas
+                                 WHERE id_mascota = old.id AND substr(fecha, 1, 7) = stats_consultas_especie_mes.mes)
+            WHERE especie = COALESCE(old.especie, '')
+              AND mes IN (SELECT substr(fecha, 1, 7) FROM consultas WHERE id_mascota = old.id);
+            INSERT INTO stats_consultas_especie_mes (especie, mes, total)
+            SELECT COALESCE(new.especie, ''), substr(fecha, 1, 7), COUNT(*) FROM consultas
+            WHERE id_mascota = new.id GROUP BY 2
+            ON CONFLICT (especie, mes) DO UPDATE SET total = total + excluded.total;
+            {_sumar_mascotas("old.id_propietario", -1)}
+            {_sumar_mascotas("new.id_propietario", 1)}
+            {_LIMPIAR_CEROS}
+        END
+        """,
+        *STATS_REBUILD,
+    ],
+    # 7: Índice por fecha para las políticas de retención de purge.py (consultas anteriores
+    #    a una fecha de corte, recorridas en orden sin ordenar en memoria).
+    [
+        "CREATE INDEX IF NOT EXISTS idx_consultas_fecha ON consultas (fecha)",
+    ],
+    # 8: Los triggers de consultas de la migración 6 fallaban con "NOT NULL constraint
+    #    failed" cuando la consulta apuntaba a una mascota inexistente, ocultando el error
+    #    de la clave foránea. Se recrean sin sumar nada en ese caso.
+    [
+        "DROP TRIGGER IF EXISTS stats_consultas_ai",
+        "DROP TRIGGER IF EXISTS stats_consultas_au",
+        f"""
+        CREATE TRIGGER stats_consultas_ai AFTER INSERT ON consultas BEGIN
+            {_sumar_consulta_especie_mes("new", 1)}
+            {_sumar_diagnostico("new.diagnostico", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER stats_consultas_au AFTER UPDATE OF fecha, id_mascota, diagnostico ON consultas BEGIN
+            UPDATE stats_consultas_especie_mes SET total = total - 1
+            WHERE especie = {_ESPECIE_DE.format("old")} AND mes = substr(old.fecha, 1, 7);
+            {_sumar_consulta_especie_mes("new", 1)}
+            {_sumar_diagnostico("old.diagnostico", -1)}
+            {_sumar_diagnostico("new.diagnostico", 1)}
+            {_LIMPIAR_CEROS}
+        END
+        """,
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+# --- Archivo de consultas antiguas (archive.py) ---
+# Base aparte, adjuntada con ATTACH en cada conexión bajo este alias. Su tabla se llama
+# consultas_archivo (y no consultas) para que los triggers, que no admiten nombres con
+# prefijo de base, la encuentren sin ambigüedad.
+ARCHIVO = "archivo"
+
+ARCHIVO_MIGRATIONS = [
+    # 1: Consultas archivadas, con el mismo ID que tenían en la base principal.
+    [
+        f"""
+        CREATE TABLE IF NOT EXISTS {ARCHIVO}.consultas_archivo (
+            id INTEGER PRIMARY KEY,
+            fecha TEXT NOT NULL,
+            motivo TEXT,
+            diagnostico TEXT,
+            id_mascota INTEGER
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS {ARCHIVO}.idx_consultas_archivo_mascota_fecha "
+        "ON consultas_archivo (id_mascota, fecha)",
+    ],
+]
+
+ARCHIVO_VERSION = len(ARCHIVO_MIGRATIONS)
+
+
+def _stats_archivadas(filtro):
+    """
+    Suma a las tablas de resumen las consultas archivadas que cumplen `filtro`. Las dos
+    sentencias cruzan con mascotas: una archivada huérfana (su mascota se borró sin la
+    base de archivo adjunta) no cuenta en ningún reporte.
+    """
+    return [
+        f"""
+        INSERT INTO stats_consultas_especie_mes (especie, mes, total)
+        SELECT COALESCE(m.especie, ''), substr(a.fecha, 1, 7), COUNT(*)
+        FROM consultas_archivo a JOIN mascotas m ON a.id_mascota = m.id
+        WHERE {filtro}
+        GROUP BY 1, 2
+        ON CONFLICT (especie, mes) DO UPDATE SET total = total + excluded.total
+        """,
+        f"""
+        INSERT INTO stats_diagnosticos (diagnostico, total)
+        SELECT lower(trim(a.diagnostico)), COUNT(*)
+        FROM consultas_archivo a JOIN mascotas m ON a.id_mascota = m.id
+        WHERE {filtro} AND trim(COALESCE(a.diagnostico, '')) <> ''
+        GROUP BY 1
+        ON CONFLICT (diagnostico) DO UPDATE SET total = total + excluded.total
+        """,
+    ]
+
+
+# Las consultas archivadas siguen contando en los reportes: tras STATS_REBUILD se suman
+# todas y, al archivar, se vuelven a sumar las que el borrado de la tabla principal descontó.
+STATS_ARCHIVO_REBUILD = _stats_archivadas("1")
+STATS_ARCHIVO_IDS = _stats_archivadas("a.id IN (SELECT value FROM json_each(?))")
+
+_DESCONTAR_ARCHIVADAS = """
+            UPDATE stats_consultas_especie_mes
+            SET total = total - (SELECT COUNT(*) FROM consultas_archivo
+                                 WHERE id_mascota = old.id AND substr(fecha, 1, 7) = stats_consultas_especie_mes.mes)
+            WHERE especie = COALESCE(old.especie, '')
+              AND mes IN (SELECT substr(fecha, 1, 7) FROM consultas_archivo WHERE id_mascota = old.id);"""
+
+# Triggers TEMP de la conexión escritora: hacen con las consultas archivadas lo que los
+# triggers de la migración 6 y el ON DELETE CASCADE hacen con las de la base principal.
+ARCHIVO_TRIGGERS = [
+    f"""
+    CREATE TEMP TRIGGER IF NOT EXISTS archivo_mascotas_bd BEFORE DELETE ON main.mascotas BEGIN
+        {_DESCONTAR_ARCHIVADAS}
+        UPDATE stats_diagnosticos
+        SET total = total - (SELECT COUNT(*) FROM consultas_archivo
+                             WHERE id_mascota = old.id AND lower(trim(diagnostico)) = stats_diagnosticos.diagnostico)
+        WHERE diagnostico IN (SELECT lower(trim(diagnostico)) FROM consultas_archivo WHERE id_mascota = old.id);
+        DELETE FROM consultas_archivo WHERE id_mascota = old.id;
+        {_LIMPIAR_CEROS}
+    END
+    """,
+    f"""
+    CREATE TEMP TRIGGER IF NOT EXISTS archivo_mascotas_au AFTER UPDATE OF especie ON main.mascotas BEGIN
+        {_DESCONTAR_ARCHIVADAS}
+        INSERT INTO stats_consultas_especie_mes (especie, mes, total)
+        SELECT COALESCE(new.especie, ''), substr(fecha, 1, 7), COUNT(*) FROM consultas_archivo
+        WHERE id_mascota = new.id GROUP BY 2
+        ON CONFLICT (especie, mes) DO UPDATE SET total = total + excluded.total;
+        {_LIMPIAR_CEROS}
+    END
+    """,
+]
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Aplica las migraciones pendientes y devuelve cuántas se aplicaron.
+    Si el esquema ya está al día solo cuesta leer PRAGMA user_version.
+    """
+    if get_version(conn) >= SCHEMA_VERSION:
+        return 0
+
+    if conn.in_transaction:
+        conn.commit()
+    # IMMEDIATE toma el bloqueo de escritura antes de releer la versión, así dos
+    # procesos que arrancan a la vez no aplican la misma migración dos veces.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = get_version(conn)
+        for numero in range(version + 1, SCHEMA_VERSION + 1):
+            for sentencia in MIGRATIONS[numero - 1]:
+                conn.execute(sentencia)
+            logger.info("Migración de esquema %s aplicada.", numero)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return max(SCHEMA_VERSION - version, 0)
+
+
+def preparar_archivo(conn):
+    """
+    Deja al día el esquema de la base de archivo (ya adjuntada como ARCHIVO) y crea los
+    triggers TEMP de `conn`. Devuelve cuántas migraciones del archivo se aplicaron.
+    """
+    version = conn.execute(f"PRAGMA {ARCHIVO}.user_version").fetchone()[0]
+    if version < ARCHIVO_VERSION:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for numero in range(version + 1, ARCHIVO_VERSION + 1):
+                for sentencia in ARCHIVO_MIGRATIONS[numero - 1]:
+                    conn.execute(sentencia)
+            conn.execute(f"PRAGMA {ARCHIVO}.user_version = {ARCHIVO_VERSION}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    for sentencia in ARCHIVO_TRIGGERS:
+        conn.execute(sentencia)
+    return max(ARCHIVO_VERSION - version, 0)
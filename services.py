@@ -5,40 +5,68 @@ from models import Propietario, Mascota, Consulta
 from database import DatabaseManager
 from ui import UIUtils
 
+logger = logging.getLogger(__name__)
+
+LISTADO_PAGE_SIZE = 50  # Registros por pantalla en los listados
+
 class SistemaVeterinaria:
-    def __init__(self):
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DatabaseManager()
 
     def _get_propietario_or_create(self, owner_name):
+        """
+        Devuelve el propietario existente o, si el usuario lo confirma, uno nuevo SIN
+        guardar (id None). El nuevo se registra en la misma transacción que la mascota.
+        """
         propietario = self.db_manager.get_propietario_by_nombre(owner_name)
         if not propietario:
             UIUtils.print_message(f"El propietario '{owner_name}' no está registrado.")
+            propietario = self._elegir_propietario_parecido(owner_name)
+            if propietario:
+                return propietario
             if UIUtils.confirm_action("¿Desea registrarlo ahora?"):
                 nombre = input("Nombre del NUEVO dueño: ").strip()
                 propietario_existente = self.db_manager.get_propietario_by_nombre(nombre)
                 if propietario_existente:
                     print(f"El propietario '{nombre}' ya existe. Asignando mascota a este propietario.")
                     return propietario_existente
+                if nombre != owner_name:
+                    propietario_existente = self._elegir_propietario_parecido(nombre)
+                    if propietario_existente:
+                        return propietario_existente
                 telefono = input("Teléfono del NUEVO dueño: ")
                 direccion = input("Dirección del NUEVO dueño: ")
-                propietario = Propietario(nombre, telefono, direccion)
-                propietario_registrado = self.db_manager.insert_propietario(propietario)
-                if propietario_registrado:
-                    print("Dueño registrado con éxito.")
-                    logging.info(f"Dueño: {propietario_registrado.nombre} (ID: {propietario_registrado.id}) registrado.")
-                return propietario_registrado
+                return Propietario(nombre, telefono, direccion)
             else:
                 UIUtils.print_message("Operación cancelada. Propietario no encontrado ni registrado.")
-                logging.info("Registro de mascota/operación cancelada: propietario no encontrado/registrado.")
+                logger.info("Registro de mascota/operación cancelada: propietario no encontrado/registrado.")
                 return None
         return propietario
 
+    def _elegir_propietario_parecido(self, nombre):
+        """
+        Muestra los propietarios con un nombre parecido (sin tildes, con errores de tipeo)
+        para no registrar dos veces al mismo. Devuelve el elegido o None.
+        """
+        parecidos = self.db_manager.search_propietarios(nombre)
+        if not parecidos:
+            return None
+        print(f"Propietarios ya registrados con un nombre parecido a '{nombre}':")
+        for numero, (propietario, _) in enumerate(parecidos, 1):
+            print(f"  {numero}. {propietario.nombre} (ID {propietario.id}, Tel: {propietario.telefono or '-'})")
+        opcion = input("Número del propietario a usar (Enter si no es ninguno): ").strip()
+        if opcion.isdigit() and 1 <= int(opcion) <= len(parecidos):
+            propietario = parecidos[int(opcion) - 1][0]
+            logger.info("Se usó el propietario existente '%s' para '%s'.", propietario.nombre, nombre)
+            return propietario
+        return None
+
     def _get_mascota(self, prompt="Ingrese el ID de la mascota: "):
         mascota_id = UIUtils.get_int_input(prompt, "ID de mascota inválido.")
         mascota = self.db_manager.get_mascota_by_id(mascota_id)
         if not mascota:
             UIUtils.print_message(f"No se encontró ninguna mascota con el ID: {mascota_id}.")
-            logging.info(f"Mascota con ID {mascota_id} no encontrada.")
+            logger.info("Mascota con ID %s no encontrada.", mascota_id)
         return mascota
 
     def _get_propietario(self, prompt="Ingrese el ID del propietario: "):
@@ -46,7 +74,7 @@ class SistemaVeterinaria:
         propietario = self.db_manager.get_propietario_by_id(propietario_id)
         if not propietario:
             UIUtils.print_message(f"No se encontró ningún propietario con el ID: {propietario_id}.")
-            logging.info(f"Propietario con ID {propietario_id} no encontrado.")
+            logger.info("Propietario con ID %s no encontrado.", propietario_id)
         return propietario
 
     def _get_consulta(self, prompt="Ingrese el ID de la consulta: "):
@@ -54,7 +82,7 @@ class SistemaVeterinaria:
         consulta = self.db_manager.get_consulta_by_id(consulta_id)
         if not consulta:
             UIUtils.print_message(f"No se encontró ninguna consulta con el ID: {consulta_id}.")
-            logging.info(f"Consulta con ID {consulta_id} no encontrada.")
+            logger.info("Consulta con ID %s no encontrada.", consulta_id)
         return consulta
 
     def registrar_mascota(self):
@@ -74,11 +102,26 @@ class SistemaVeterinaria:
         if not propietario:
             return
 
-        mascota = Mascota(nombre_mascota, especie_mascota, raza_mascota, edad_mascota, propietario.id)
-        mascota_registrada = self.db_manager.insert_mascota(mascota)
+        # Dueño nuevo y mascota se guardan juntos: o se registran ambos o ninguno
+        dueno_nuevo = propietario.id is None
+        with self.db_manager.transaction():
+            if dueno_nuevo:
+                propietario = self.db_manager.insert_propietario(propietario)
+                if not propietario:
+                    UIUtils.print_message("No se pudo registrar el dueño. Intente nuevamente.")
+                    return
+
+            mascota = Mascota(nombre_mascota, especie_mascota, raza_mascota, edad_mascota, propietario.id)
+            mascota_registrada = self.db_manager.insert_mascota(mascota)
+            if not mascota_registrada:
+                self.db_manager.set_rollback()
+
+        if mascota_registrada and dueno_nuevo:
+            print("Dueño registrado con éxito.")
+            logger.info("Dueño: %s (ID: %s) registrado.", propietario.nombre, propietario.id)
         if mascota_registrada:
             print(f"\n - Mascota '{mascota_registrada.nombre}' registrada con ID: {mascota_registrada.id}, del dueño: {propietario.nombre}.")
-            logging.info(f"Mascota: {mascota_registrada.nombre} (ID: {mascota_registrada.id}), del dueño: {propietario.nombre} (ID: {propietario.id}) registrada.")
+            logger.info("Mascota: %s (ID: %s), del dueño: %s (ID: %s) registrada.", mascota_registrada.nombre, mascota_registrada.id, propietario.nombre, propietario.id)
         else:
             UIUtils.print_message("No se pudo registrar la mascota. Intente nuevamente.")
 
@@ -97,35 +140,41 @@ class SistemaVeterinaria:
         consulta_registrada = self.db_manager.insert_consulta(consulta)
         if consulta_registrada:
             print("Consulta registrada con éxito.")
-            logging.info(f"Consulta (ID: {consulta_registrada.id}) de la mascota: {mascota.nombre} (ID: {mascota.id}) registrada.")
+            logger.info("Consulta (ID: %s) de la mascota: %s (ID: %s) registrada.", consulta_registrada.id, mascota.nombre, mascota.id)
         else:
             UIUtils.print_message("No se pudo registrar la consulta.")
 
+    def _imprimir_paginado(self, get_page, page_size=LISTADO_PAGE_SIZE):
+        """Imprime los registros página a página. Devuelve cuántos se mostraron."""
+        mostrados = 0
+        after_id = 0
+        while True:
+            page = get_page(after_id, page_size)
+            for registro in page:
+                print(registro)
+                print("-" * 30)
+            mostrados += len(page)
+            if len(page) < page_size:
+                return mostrados
+            after_id = page[-1].id
+            if input(f"\nMostrados {mostrados}. Enter para ver más, 'q' para terminar: ").strip().lower() == 'q':
+                return mostrados
+
     def listar_propietarios(self):
         UIUtils.print_title("Lista de Propietarios")
-        propietarios = self.db_manager.get_all_propietarios()
-        if not propietarios:
+        if not self._imprimir_paginado(self.db_manager.get_propietarios_page):
             UIUtils.print_message("No existen propietarios registrados.")
-            logging.info("Lista de propietarios consultada: No hay registros.")
+            logger.info("Lista de propietarios consultada: No hay registros.")
             return
-
-        for prop in propietarios:
-            print(prop)
-            print("-" * 30)
-        logging.info("Propietarios registrados consultados.")
+        logger.info("Propietarios registrados consultados.")
 
     def listar_mascotas(self):
         UIUtils.print_title("Lista de Mascotas Registradas")
-        mascotas = self.db_manager.get_all_mascotas()
-        if not mascotas:
+        if not self._imprimir_paginado(self.db_manager.get_mascotas_page):
             UIUtils.print_message("No existen mascotas registradas.")
-            logging.info("Lista de mascotas consultada: No hay registros.")
+            logger.info("Lista de mascotas consultada: No hay registros.")
             return
-
-        for mascota in mascotas:
-            print(mascota)
-            print("-" * 30)
-        logging.info("Mascotas registradas consultadas.")
+        logger.info("Mascotas registradas consultadas.")
 
     def historia_clinica(self):
         UIUtils.print_title("Historia Clínica")
@@ -133,17 +182,70 @@ class SistemaVeterinaria:
         if not mascota:
             return
 
-        consultas = self.db_manager.get_consultas_by_mascota_id(mascota.id)
+        completo = bool(self.db_manager.archivo) and UIUtils.confirm_action("¿Incluir las consultas archivadas?")
+        consultas = self.db_manager.get_consultas_by_mascota_id(mascota.id, historial_completo=completo)
         if not consultas:
             UIUtils.print_message(f"No hay consultas registradas para {mascota.nombre} (ID: {mascota.id}).")
-            logging.info(f"No se encontraron consultas para la mascota ID: {mascota.id}.")
+            logger.info("No se encontraron consultas para la mascota ID: %s.", mascota.id)
             return
 
         print(f"\nHistorial clínico de {mascota.nombre} (ID: {mascota.id}):")
         for consulta in consultas:
             print(consulta)
             print("-" * 30)
-        logging.info(f"Historia clínica de la mascota ID: {mascota.id} consultada.")
+        logger.info("Historia clínica de la mascota ID: %s consultada.", mascota.id)
+
+    def expediente_propietario(self):
+        UIUtils.print_title("Expediente del Propietario")
+        propietario_id = UIUtils.get_int_input("Ingrese el ID del propietario: ", "ID de propietario inválido.")
+        ultimas = input("Consultas más recientes a mostrar por mascota (Enter para todas): ").strip()
+        ultimas = int(ultimas) if ultimas.isdigit() and int(ultimas) > 0 else None
+        completo = bool(self.db_manager.archivo) and UIUtils.confirm_action("¿Incluir las consultas archivadas?")
+        expediente = self.db_manager.get_expediente_propietario(propietario_id, ultimas, historial_completo=completo)
+        if not expediente:
+            UIUtils.print_message(f"No se encontró ningún propietario con el ID: {propietario_id}.")
+            logger.info("Propietario con ID %s no encontrado.", propietario_id)
+            return
+
+        print(expediente.propietario)
+        if not expediente.mascotas:
+            UIUtils.print_message(f"{expediente.propietario.nombre} no tiene mascotas registradas.")
+        for ficha in expediente.mascotas:
+            print("\n" + "=" * 30)
+            print(ficha.mascota)
+            if not ficha.consultas:
+                print("\nSin consultas registradas.")
+                continue
+            print(f"\nConsultas ({len(ficha.consultas)} de {ficha.total_consultas}, de la más reciente):")
+            for consulta in ficha.consultas:
+                print(consulta)
+                print("-" * 30)
+        logger.info("Expediente del propietario ID: %s consultado.", propietario_id)
+
+    def buscar_consultas(self):
+        UIUtils.print_title("Buscar Consultas")
+        texto = input("Palabras a buscar en motivo o diagnóstico: ").strip()
+        if not texto:
+            UIUtils.print_message("No se ingresó texto para buscar.")
+            return
+        desde = UIUtils.get_optional_date_input("Desde la fecha (dd-mm-aaaa, Enter para omitir): ")
+        hasta = UIUtils.get_optional_date_input("Hasta la fecha (dd-mm-aaaa, Enter para omitir): ")
+
+        mostradas = 0
+        while True:
+            consultas = self.db_manager.search_consultas(texto, desde, hasta, limit=LISTADO_PAGE_SIZE, offset=mostradas)
+            for consulta in consultas:
+                print(consulta)
+                print("-" * 30)
+            mostradas += len(consultas)
+            if len(consultas) < LISTADO_PAGE_SIZE:
+                break
+            if input(f"\nMostradas {mostradas}. Enter para ver más, 'q' para terminar: ").strip().lower() == 'q':
+                break
+
+        if not mostradas:
+            UIUtils.print_message(f"No se encontraron consultas para '{texto}'.")
+        logger.info("Búsqueda de consultas '%s': %s resultados mostrados.", texto, mostradas)
 
     def actualizar_propietario(self):
         UIUtils.print_title("Actualizar Propietario")
@@ -160,7 +262,7 @@ class SistemaVeterinaria:
             existente = self.db_manager.get_propietario_by_nombre(nombre)
             if existente and existente.id != propietario.id:
                 print(f"Error: El nombre '{nombre}' ya está siendo usado por otro propietario (ID: {existente.id}).")
-                logging.warning(f"Intento de actualizar propietario ID {propietario.id} a nombre duplicado: {nombre}")
+                logger.warning("Intento de actualizar propietario ID %s a nombre duplicado: %s", propietario.id, nombre)
                 return
             new_data['nombre'] = nombre
 
@@ -175,7 +277,7 @@ class SistemaVeterinaria:
         if new_data:
             if self.db_manager.update_propietario(propietario.id, new_data):
                 print("Propietario actualizado con éxito.")
-                logging.info(f"Propietario ID {propietario.id} actualizado.")
+                logger.info("Propietario ID %s actualizado.", propietario.id)
             else:
                 UIUtils.print_message("No se pudo actualizar el propietario.")
         else:
@@ -208,7 +310,7 @@ class SistemaVeterinaria:
                 new_data['edad'] = edad
             except ValueError:
                 print("Edad inválida. Se mantendrá la edad actual.")
-                logging.warning(f"Intento de actualizar edad de mascota {mascota.id} con valor inválido: '{edad_str}'")
+                logger.warning("Intento de actualizar edad de mascota %s con valor inválido: '%s'", mascota.id, edad_str)
 
         if UIUtils.confirm_action("¿Desea cambiar el propietario de esta mascota?"):
             nombre_nuevo_propietario = input("Ingrese el nombre del nuevo propietario: ").strip()
@@ -218,12 +320,12 @@ class SistemaVeterinaria:
                 print(f"Propietario de la mascota cambiado a: {nuevo_propietario.nombre}.")
             else:
                 UIUtils.print_message("Propietario no encontrado. No se cambió el propietario.")
-                logging.warning(f"Intento de cambiar propietario de mascota {mascota.id} a uno no existente: {nombre_nuevo_propietario}")
+                logger.warning("Intento de cambiar propietario de mascota %s a uno no existente: %s", mascota.id, nombre_nuevo_propietario)
 
         if new_data:
             if self.db_manager.update_mascota(mascota.id, new_data):
                 print("Mascota actualizada con éxito.")
-                logging.info(f"Mascota ID {mascota.id} actualizada.")
+                logger.info("Mascota ID %s actualizada.", mascota.id)
             else:
                 UIUtils.print_message("No se pudo actualizar la mascota.")
         else:
@@ -245,7 +347,7 @@ class SistemaVeterinaria:
                 new_data['fecha'] = datetime.strptime(fecha_str, "%d-%m-%Y").date()
             except ValueError:
                 print("Formato de fecha incorrecto. Se mantendrá la fecha actual.")
-                logging.warning(f"Intento de actualizar fecha de consulta {consulta.id} con formato inválido: {fecha_str}")
+                logger.warning("Intento de actualizar fecha de consulta %s con formato inválido: %s", consulta.id, fecha_str)
 
         motivo = input(f"Nuevo motivo ({consulta.motivo}): ").strip()
         if motivo: new_data['motivo'] = motivo
@@ -256,7 +358,7 @@ class SistemaVeterinaria:
         if new_data:
             if self.db_manager.update_consulta(consulta.id, new_data):
                 print("Consulta actualizada con éxito.")
-                logging.info(f"Consulta ID {consulta.id} actualizada.")
+                logger.info("Consulta ID %s actualizada.", consulta.id)
             else:
                 UIUtils.print_message("No se pudo actualizar la consulta.")
         else:
@@ -270,12 +372,12 @@ class SistemaVeterinaria:
         if UIUtils.confirm_action(f"¿Está seguro de eliminar al propietario '{propietario.nombre}' (ID: {propietario.id})? Esto también eliminará SUS MASCOTAS y todas sus CONSULTAS."):
             if self.db_manager.delete_propietario(propietario.id):
                 print("Propietario y sus datos asociados eliminados con éxito.")
-                logging.info(f"Propietario ID {propietario.id} y datos asociados eliminados.")
+                logger.info("Propietario ID %s y datos asociados eliminados.", propietario.id)
             else:
                 UIUtils.print_message("No se pudo eliminar el propietario.")
         else:
             print("Operación cancelada.")
-            logging.info(f"Eliminación de propietario ID {propietario.id} cancelada.")
+            logger.info("Eliminación de propietario ID %s cancelada.", propietario.id)
 
     def eliminar_mascota(self):
         UIUtils.print_title("Eliminar Mascota")
@@ -285,12 +387,12 @@ class SistemaVeterinaria:
         if UIUtils.confirm_action(f"¿Está seguro de eliminar a la mascota '{mascota.nombre}' (ID: {mascota.id})? Esto también eliminará todas sus CONSULTAS."):
             if self.db_manager.delete_mascota(mascota.id):
                 print("Mascota y sus consultas eliminadas con éxito.")
-                logging.info(f"Mascota ID {mascota.id} y consultas asociadas eliminadas.")
+                logger.info("Mascota ID %s y consultas asociadas eliminadas.", mascota.id)
             else:
                 UIUtils.print_message("No se pudo eliminar la mascota.")
         else:
             print("Operación cancelada.")
-            logging.info(f"Eliminación de mascota ID {mascota.id} cancelada.")
+            logger.info("Eliminación de mascota ID %s cancelada.", mascota.id)
 
     def eliminar_consulta(self):
         UIUtils.print_title("Eliminar Consulta")
@@ -300,12 +402,45 @@ class SistemaVeterinaria:
         if UIUtils.confirm_action(f"¿Está seguro de eliminar la consulta con ID: {consulta.id} para la mascota '{consulta.mascota_nombre}'?"):
             if self.db_manager.delete_consulta(consulta.id):
                 print("Consulta eliminada con éxito.")
-                logging.info(f"Consulta ID {consulta.id} eliminada.")
+                logger.info("Consulta ID %s eliminada.", consulta.id)
             else:
                 UIUtils.print_message("No se pudo eliminar la consulta.")
         else:
             print("Operación cancelada.")
-            logging.info(f"Eliminación de consulta ID {consulta.id} cancelada.")
+            logger.info("Eliminación de consulta ID %s cancelada.", consulta.id)
+
+    def estadisticas_consultas(self):
+        UIUtils.print_title("Estadísticas de Consultas SQL")
+        resumen = self.db_manager.query_stats.summary(top=10)
+        if not resumen:
+            UIUtils.print_message("Aún no se ha ejecutado ninguna consulta en esta sesión.")
+        else:
+            print(f"{'Llamadas':>9} {'Total ms':>10} {'Media ms':>9} {'Máx ms':>9} {'Filas':>8}  Sentencia")
+            for fila in resumen:
+                sql = fila["sql"] if len(fila["sql"]) <= 70 else fila["sql"][:67] + "..."
+                print(f"{fila['llamadas']:>9} {fila['total_ms']:>10.2f} {fila['media_ms']:>9.3f} "
+                      f"{fila['max_ms']:>9.2f} {fila['filas']:>8}  {sql}")
+            umbral = self.db_manager.query_stats.slow_threshold_ms
+            print(f"\nLas sentencias de más de {umbral} ms se registran en 'consultas_lentas.log'.")
+
+        print("\nCaché de búsquedas por ID:")
+        for entidad, datos in self.db_manager.cache_stats().items():
+            print(f"  {entidad}: {datos['hits']} aciertos, {datos['misses']} fallos "
+                  f"({datos['hit_rate']:.0%}), {datos['size']}/{datos['max_size']} entradas")
+        logger.info("Estadísticas de consultas SQL consultadas.")
+
+    def reporte_clinica(self):
+        from reportes import imprimir_reporte  # Carga argparse/re: solo cuando se pide el reporte
+
+        UIUtils.print_title("Reporte de la Clínica")
+        desde = UIUtils.get_optional_date_input("Desde el mes de la fecha (dd-mm-aaaa, Enter para omitir): ")
+        hasta = UIUtils.get_optional_date_input("Hasta el mes de la fecha (dd-mm-aaaa, Enter para omitir): ")
+        imprimir_reporte(
+            self.db_manager,
+            desde.strftime("%Y-%m") if desde else None,
+            hasta.strftime("%Y-%m") if hasta else None,
+        )
+        logger.info("Reporte de la clínica consultado.")
 
     def cerrar_sistema(self):
         self.db_manager.close_connection()
\ No newline at end of file
@@ -0,0 +1,264 @@
+# shards.py
+"""
+Varias sedes de la clínica, cada una con su propio archivo SQLite.
+
+Cada sede tiene su propio DatabaseManager (y por lo tanto su propio escritor): una sede
+con mucho movimiento no hace esperar a las demás, y agregar sedes reparte la carga en
+lugar de acumularla sobre un único candado de escritura.
+
+    router = ShardRouter({"centro": "clinica_centro.db", "norte": "clinica_norte.db"})
+    router.shard("norte").insert_mascota(mascota)      # CRUD: siempre en la sede indicada
+    for sede, consulta in router.iter_consultas("2025-01-01", "2025-01-31"):
+        ...                                            # todas las sedes, de la más reciente
+    imprimir_reporte(router)                           # reportes sumando todas las sedes
+
+Los IDs son propios de cada sede; los listados devuelven pares (sede, entidad). Los
+listados entre sedes leen todas las sedes en paralelo (un hilo por sede, que entrega
+las filas por lotes a una cola acotada) y las fusionan con heapq.merge: cada sede ya
+devuelve sus filas ordenadas, así que la fusión no ordena nada en memoria y el primer
+resultado llega sin esperar a que terminen las demás.
+
+Uso desde la línea de comandos, con la lista de sedes en un JSON {"sede": "archivo.db"}:
+    python shards.py sedes.json propietarios --limite 50
+    python shards.py sedes.json consultas --desde 2025-01-01 --hasta 2025-01-31
+    python shards.py sedes.json reporte --top 10
+"""
+import argparse
+import heapq
+import json
+import logging
+import queue
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from database import DatabaseManager
+from log_config import setup_logging
+from models import Consulta, Mascota, Propietario, parse_fecha_iso
+
+logger = logging.getLogger(__name__)
+
+# Fin del flujo de una sede en su cola
+_FIN = object()
+# COLLATE NOCASE solo pasa a minúsculas las letras ASCII: la fusión debe comparar igual
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _nocase(texto):
+    return (texto or "").translate(_NOCASE)
+
+
+class ShardRouter:
+    def __init__(self, sedes, lote=500, **opciones_db):
+        """
+        `sedes` es {sede: archivo} o {sede: {"db_name": archivo, ...opciones de DatabaseManager}}.
+        `opciones_db` se aplican a todas las sedes. `lote` son las filas que cada hilo
+        entrega de una vez en los listados entre sedes.
+        """
+        if not sedes:
+            raise ValueError("Se necesita al menos una sede.")
+        self.lote = lote
+        self.managers = {}
+        for sede, config in sedes.items():
+            opciones = {**opciones_db, **(config if isinstance(config, dict) else {"db_name": config})}
+            self.managers[sede] = DatabaseManager(**opciones)
+        self._executor = ThreadPoolExecutor(max_workers=len(self.managers), thread_name_prefix="clinica-sede")
+
+    @classmethod
+    def desde_json(cls, path, **opciones):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **opciones)
+
+    @property
+    def sedes(self):
+        return tuple(self.managers)
+
+    def shard(self, sede):
+        """DatabaseManager de la sede: las operaciones CRUD se hacen siempre sobre una sede."""
+        try:
+            return self.managers[sede]
+        except KeyError:
+            raise ValueError(f"Sede desconocida: {sede}. Sedes: {', '.join(self.managers)}") from None
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for db_manager in self.managers.values():
+            db_manager.close_connection()
+
+    # --- Consultas en paralelo ---
+    def en_paralelo(self, funcion):
+        """Ejecuta funcion(db_manager) en todas las sedes a la vez y devuelve {sede: resultado}."""
+        futuros = {sede: self._executor.submit(funcion, db) for sede, db in self.managers.items()}
+        return {sede: futuro.result() for sede, futuro in futuros.items()}
+
+    def _producir(self, sede, sql, params, convertir, cola, detener):
+        """Hilo de una sede: lee sus filas en orden y las encola por lotes."""
+        def poner(item):
+            # Con timeout: si quien consume abandona el listado, el hilo no queda bloqueado
+            while not detener.is_set():
+                try:
+                    cola.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            filas = self.managers[sede].iter_rows(sql, params, batch_size=self.lote)
+            try:
+                lote = []
+                for fila in filas:
+                    lote.append((sede, convertir(fila)))
+                    if len(lote) >= self.lote:
+                        if not poner(lote):
+                            return
+                        lote = []
+                if lote:
+                    poner(lote)
+            finally:
+                filas.close()
+        except Exception as e:  # Se relanza en el hilo que consume
+            poner(e)
+        finally:
+            poner(_FIN)
+
+    @staticmethod
+    def _consumir(cola):
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
+    def _fusionar(self, sql, params, convertir, clave, descendente=False):
+        """
+        Genera (sede, entidad) de todas las sedes en el orden de `clave`. `sql` debe devolver
+        las filas de cada sede ya ordenadas por esa misma clave.
+        """
+        detener = threading.Event()
+        hilos = []
+        flujos = []
+        for sede in self.managers:
+            cola = queue.Queue(maxsize=4)
+            hilo = threading.Thread(target=self._producir, args=(sede, sql, params, convertir, cola, detener),
+                                    name=f"clinica-sede-{sede}", daemon=True)
+            hilo.start()
+            hilos.append(hilo)
+            flujos.append(self._consumir(cola))
+        try:
+            yield from heapq.merge(*flujos, key=lambda par: clave(par[1]), reverse=descendente)
+        finally:
+            # Listado abandonado a medias: los hilos paran y devuelven sus conexiones lectoras
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+
+    # --- Listados entre sedes ---
+    def iter_propietarios(self):
+        """Propietarios de todas las sedes por nombre (sin distinguir mayúsculas), como (sede, propietario)."""
+        return self._fusionar(
+            "SELECT id, nombre, telefono, direccion FROM propietarios ORDER BY nombre COLLATE NOCASE, id",
+            (), Propietario.from_row, lambda p: _nocase(p.nombre))
+
+    def iter_mascotas(self):
+        """Mascotas de todas las sedes por nombre (sin distinguir mayúsculas), como (sede, mascota)."""
+        return self._fusionar("""
+            SELECT m.id, m.nombre, m.especie, m.raza, m.edad, m.id_propietario, p.nombre
+            FROM mascotas m
+            LEFT JOIN propietarios p ON m.id_propietario = p.id
+            ORDER BY m.nombre COLLATE NOCASE, m.id
+            """, (), Mascota.from_row, lambda m: _nocase(m.nombre))
+
+    def iter_consultas(self, fecha_desde=None, fecha_hasta=None):
+        """Consultas de todas las sedes de la más reciente a la más antigua, como (sede, consulta)."""
+        return self._fusionar("""
+            SELECT c.id, c.fecha, c.motivo, c.diagnostico, c.id_mascota, m.nombre
+            FROM consultas c
+            JOIN mascotas m ON c.id_mascota = m.id
+            WHERE (? IS NULL OR c.fecha >= ?) AND (? IS NULL OR c.fecha <= ?)
+            ORDER BY c.fecha DESC
+            """, (fecha_desde, fecha_desde, fecha_hasta, fecha_hasta), Consulta.from_row,
+            lambda c: c.fecha, descendente=True)
+
+    # --- Reportes entre sedes (mismas firmas que DatabaseManager, para reportes.py) ---
+    def get_consultas_por_especie_mes(self, mes_desde=None, mes_hasta=None, especie=None):
+        """[(especie, mes, total)] sumando todas las sedes, ordenado por mes y especie."""
+        totales = defaultdict(int)
+        for filas in self.en_paralelo(lambda db: db.get_consultas_por_especie_mes(mes_desde, mes_hasta, especie)).values():
+            for especie_fila, mes, total in filas:
+                totales[especie_fila, mes] += total
+        return sorted(((e, m, t) for (e, m), t in totales.items()), key=lambda fila: (fila[1], fila[0]))
+
+    def get_mascotas_por_propietario(self, top=20):
+        """
+        [("sede:id", nombre, total)] de los `top` propietarios con más mascotas. Cada
+        propietario está en una sola sede, así que alcanza con el top de cada una.
+        """
+        por_sede = self.en_paralelo(lambda db: db.get_mascotas_por_propietario(top))
+        flujos = ([(f"{sede}:{propietario_id}", nombre, total) for propietario_id, nombre, total in filas]
+                  for sede, filas in por_sede.items())
+        return list(islice(heapq.merge(*flujos, key=lambda fila: fila[2], reverse=True), top))
+
+    def get_top_diagnosticos(self, top=10):
+        """[(diagnostico, total)] sumando todas las sedes."""
+        totales = defaultdict(int)
+        # Un diagnóstico puede repartirse entre sedes: se suman completos antes de elegir el top
+        for filas in self.en_paralelo(lambda db: db.get_top_diagnosticos(-1)).values():
+            for diagnostico, total in filas:
+                totales[diagnostico] += total
+        return heapq.nsmallest(top, totales.items(), key=lambda par: (-par[1], par[0]))
+
+
+def _fecha(valor):
+    try:
+        return parse_fecha_iso(valor).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError("Use el formato AAAA-MM-DD, por ejemplo 2025-01-31.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Listados y reportes de todas las sedes de la clínica.")
+    parser.add_argument("sedes", help='JSON con las sedes: {"centro": "clinica_centro.db", ...}')
+    parser.add_argument("listado", choices=("propietarios", "mascotas", "consultas", "reporte"))
+    parser.add_argument("--limite", type=int, default=100, help="Filas a mostrar en los listados")
+    parser.add_argument("--desde", type=_fecha, help="Primera fecha de consulta (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=_fecha, help="Última fecha de consulta (AAAA-MM-DD)")
+    parser.add_argument("--top", type=int, default=10, help="Filas de los rankings del reporte")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    try:
+        router = ShardRouter.desde_json(args.sedes)
+    except (OSError, ValueError) as e:
+        print(f"No se pudieron leer las sedes: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.listado == "reporte":
+            from reportes import imprimir_reporte
+
+            imprimir_reporte(router, top=args.top)
+            return 0
+        if args.listado == "propietarios":
+            filas = router.iter_propietarios()
+        elif args.listado == "mascotas":
+            filas = router.iter_mascotas()
+        else:
+            filas = router.iter_consultas(args.desde, args.hasta)
+        try:
+            for sede, entidad in islice(filas, args.limite):
+                print(f"[{sede}]")
+                print(entidad)
+                print("-" * 30)
+        finally:
+            filas.close()
+    finally:
+        router.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
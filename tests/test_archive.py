@@ -0,0 +1,118 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import archive
+import purge
+import reportes
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class ArchivoTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.path = os.path.join(directorio.name, "clinica.db")
+        self.path_archivo = os.path.join(directorio.name, "archivo.db")
+        self.db = DatabaseManager(self.path, slow_query_log=None, archivo=self.path_archivo)
+        self.addCleanup(self.db.close_connection)
+        ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.luna = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, ana.id))
+        self.rex = self.db.insert_mascota(Mascota("Rex", "perro", None, 5, ana.id))
+        self.consultas = [self.db.insert_consulta(Consulta(fecha, "Control", diagnostico, mascota.id))
+                          for fecha, diagnostico, mascota in (("2010-01-01", "Otitis", self.luna),
+                                                              ("2011-02-02", "Sano", self.luna),
+                                                              ("2024-05-01", "Sano", self.luna),
+                                                              ("2009-03-03", "Sano", self.rex))]
+
+    def _reportes(self):
+        return (self.db.get_consultas_por_especie_mes(), self.db.get_mascotas_por_propietario(),
+                self.db.get_top_diagnosticos())
+
+    def test_archivar_mueve_las_antiguas_y_los_reportes_no_cambian(self):
+        reportes = self._reportes()
+        self.assertEqual(archive.contar(self.db, "2015-01-01"), 3)
+        resumen = archive.archivar(self.db, "2015-01-01", lote=2, pausa=0)
+        self.assertEqual((resumen["archivadas"], resumen["lotes"]), (3, 2))
+        estado = archive.estado(self.db)
+        self.assertEqual((estado["activas"]["consultas"], estado["archivadas"]["consultas"]), (1, 3))
+        self.assertEqual(self._reportes(), reportes)
+        self.assertTrue(self.db.rebuild_stats())
+        self.assertEqual(self._reportes(), reportes)
+
+    def test_historial_completo_incluye_las_archivadas(self):
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+        self.assertEqual([c.fecha.isoformat() for c in self.db.get_consultas_by_mascota_id(self.luna.id)],
+                         ["2024-05-01"])
+        completo = self.db.get_consultas_by_mascota_id(self.luna.id, historial_completo=True)
+        self.assertEqual([c.fecha.isoformat() for c in completo], ["2024-05-01", "2011-02-02", "2010-01-01"])
+        antigua = self.consultas[0].id
+        self.assertIsNone(self.db.get_consulta_by_id(antigua))
+        self.assertEqual(self.db.get_consulta_by_id(antigua, historial_completo=True).diagnostico, "Otitis")
+
+    def test_purga_cuenta_las_consultas_archivadas(self):
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+        # Rex solo tiene consultas archivadas: sigue siendo inactiva; Luna tiene una reciente
+        self.assertEqual(purge.contar(self.db, "mascotas_inactivas", "2015-01-01"),
+                         {"propietarios": 0, "mascotas": 1, "consultas": 0})
+        self.assertEqual(purge.contar(self.db, "mascotas_inactivas", "2012-01-01")["mascotas"], 1)
+        # Sin la consulta reciente, la última de Luna es la archivada del 2011-02-02
+        with self.db.transaction():
+            self.db.execute("DELETE FROM consultas WHERE id_mascota = ?", (self.luna.id,))
+        self.assertEqual(purge.contar(self.db, "mascotas_inactivas", "2011-02-02")["mascotas"], 1)
+        self.assertEqual(purge.contar(self.db, "mascotas_inactivas", "2011-02-03")["mascotas"], 2)
+        self.assertEqual(purge.contar(self.db, "propietarios_inactivos", "2011-02-02")["propietarios"], 0)
+        self.assertEqual(purge.contar(self.db, "propietarios_inactivos", "2011-02-03")["propietarios"], 1)
+
+    def test_purga_con_archivo_no_deja_archivadas_huerfanas(self):
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+        with redirect_stdout(io.StringIO()), mock.patch.object(purge, "setup_logging"):
+            self.assertEqual(purge.main(["mascotas_inactivas", "--antes-de", "2015-01-01", "--db", self.path,
+                                         "--archivo", self.path_archivo]), 0)
+        # Rex solo tenía una consulta, ya archivada: se purga y se lleva la archivada
+        self.assertEqual(self.db.fetchone("SELECT COUNT(*) FROM mascotas WHERE id = ?", (self.rex.id,))[0], 0)
+        self.assertEqual(self.db.fetchone("SELECT COUNT(*) FROM consultas_archivo "
+                                          "WHERE id_mascota NOT IN (SELECT id FROM mascotas)")[0], 0)
+        self.assertEqual(archive.estado(self.db)["archivadas"]["consultas"], 2)
+
+    def test_borrar_la_mascota_borra_sus_consultas_archivadas(self):
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+        self.assertTrue(self.db.delete_mascota(self.luna.id))
+        self.assertEqual(archive.estado(self.db)["archivadas"]["consultas"], 1)
+        self.assertEqual(self.db.get_consultas_por_especie_mes(), [("perro", "2009-03", 1)])
+
+    def test_una_consulta_copiada_y_no_borrada_aparece_una_vez(self):
+        # Como si el archivado se hubiera cortado entre la copia y el borrado
+        self.db.execute("""
+            INSERT INTO consultas_archivo (id, fecha, motivo, diagnostico, id_mascota)
+            SELECT id, fecha, motivo, diagnostico, id_mascota FROM consultas WHERE id = ?
+        """, (self.consultas[0].id,))
+        completo = self.db.get_consultas_by_mascota_id(self.luna.id, historial_completo=True)
+        self.assertEqual(len(completo), 3)
+
+    def test_reportes_reconstruir_con_archivo_conserva_las_archivadas(self):
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+        reportes_antes = self._reportes()
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(reportes.main(["--db", self.path, "--archivo", self.path_archivo, "--reconstruir"]), 0)
+        self.assertEqual(self._reportes(), reportes_antes)
+
+    def test_reconstruir_no_cuenta_las_archivadas_huerfanas(self):
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+        # Un programa sin la base de archivo borra a Rex: su consulta archivada queda huérfana
+        sin_archivo = DatabaseManager(self.path, slow_query_log=None)
+        self.addCleanup(sin_archivo.close_connection)
+        self.assertTrue(sin_archivo.delete_mascota(self.rex.id))
+        for _ in range(2):
+            self.assertTrue(self.db.rebuild_stats())
+            self.assertEqual(self.db.get_top_diagnosticos(), [("sano", 2), ("otitis", 1)])
+            self.assertEqual(self.db.get_consultas_por_especie_mes(),
+                             [("gato", "2010-01", 1), ("gato", "2011-02", 1), ("gato", "2024-05", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from database import DatabaseManager
+
+RAIZ_PROYECTO = Path(__file__).resolve().parents[1]
+
+# Presupuesto del arranque en frío del menú (main.py), medido por el propio proceso desde
+# su primera línea. Hoy ronda los 50 ms; el margen cubre máquinas de CI lentas.
+PRESUPUESTO_MENU_MS = 250
+# Tiempo de pared del proceso completo, intérprete incluido
+PRESUPUESTO_PROCESO_S = 3.0
+
+
+class ArranqueEnFrioTests(unittest.TestCase):
+    """Regresión del arranque rápido de la CLI (main.py --startup-report)."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+
+    def _arrancar(self):
+        inicio = time.perf_counter()
+        proceso = subprocess.run(
+            [sys.executable, str(RAIZ_PROYECTO / "main.py"), "--startup-report"],
+            cwd=self.directorio, capture_output=True, text=True, timeout=60,
+        )
+        segundos = time.perf_counter() - inicio
+        self.assertEqual(proceso.returncode, 0, proceso.stderr)
+        fases = {
+            m.group(1).strip(): float(m.group(2))
+            for m in re.finditer(r"^  (.+?)\s+(\d+\.\d)\b", proceso.stdout, re.MULTILINE)
+        }
+        return fases, proceso.stdout, segundos
+
+    def test_menu_listo_dentro_del_presupuesto(self):
+        self._arrancar()  # La primera vez crea la base y aplica las migraciones
+        fases, salida, segundos = self._arrancar()
+        self.assertLess(fases["menú listo"], PRESUPUESTO_MENU_MS, salida)
+        self.assertLess(segundos, PRESUPUESTO_PROCESO_S, salida)
+
+    def test_arranque_con_esquema_al_dia_no_ejecuta_ddl(self):
+        _, salida, _ = self._arrancar()
+        self.assertIn("migraciones aplicadas", salida)
+        self.assertNotIn(" 0 migraciones aplicadas", salida)
+        _, salida, _ = self._arrancar()
+        self.assertIn(" 0 migraciones aplicadas", salida)
+
+    def test_el_manager_no_abre_la_base_hasta_la_primera_operacion(self):
+        path = os.path.join(self.directorio, "diferida.db")
+        db_manager = DatabaseManager(path, slow_query_log=None)
+        self.addCleanup(db_manager.close_connection)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(db_manager.get_all_propietarios(), [])
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
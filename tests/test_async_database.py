@@ -0,0 +1,47 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from async_database import AsyncDatabaseManager, BaseDatosSaturadaError
+from database import DatabaseManager
+from models import Propietario
+
+
+class AsyncDatabaseManagerTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        db_manager = DatabaseManager(os.path.join(directorio.name, "async.db"), slow_query_log=None)
+        self.db = AsyncDatabaseManager(db_manager, max_workers=2, max_pendientes=2, acquire_timeout=0.05)
+        self.addCleanup(self.db.close)
+
+    async def test_opera_en_el_executor(self):
+        ana = await self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.assertEqual((await self.db.get_propietario_by_id(ana.id)).nombre, "Ana")
+
+    async def test_con_el_limite_lleno_lanza_saturada(self):
+        liberar = threading.Event()
+        ocupadas = [asyncio.create_task(self.db.run(liberar.wait)) for _ in range(self.db.max_pendientes)]
+        await asyncio.sleep(0)
+        try:
+            with self.assertRaises(BaseDatosSaturadaError):
+                await self.db.get_propietarios_page()
+        finally:
+            liberar.set()
+            await asyncio.gather(*ocupadas)
+        # Al liberarse los turnos se vuelve a atender
+        self.assertEqual(await self.db.get_propietarios_page(), [])
+
+    async def test_un_error_libera_el_turno(self):
+        def falla():
+            raise ValueError("falla")
+        for _ in range(self.db.max_pendientes + 1):
+            with self.assertRaises(ValueError):
+                await self.db.run(falla)
+        self.assertEqual(await self.db.get_propietarios_page(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
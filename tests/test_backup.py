@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import archive
+from backup import BackupManager, destino_del_archivo
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class BackupManagerTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self.db = DatabaseManager(os.path.join(self.directorio, "clinica.db"), slow_query_log=None,
+                                  archivo=os.path.join(self.directorio, "archivo.db"))
+        self.addCleanup(self.db.close_connection)
+        with self.db.transaction():
+            for i in range(500):
+                self.db.insert_propietario(Propietario(f"Propietario {i}", str(i), "Calle " * 20))
+        self.backups = BackupManager(self.db, os.path.join(self.directorio, "backups"), paginas_por_paso=4, pausa=0)
+
+    @staticmethod
+    def _contar(path, tabla):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_las_escrituras_siguen_durante_la_copia(self):
+        terminado = threading.Event()
+        escritas = []
+
+        def escribir():
+            while not terminado.is_set():
+                escritas.append(self.db.insert_propietario(Propietario(f"Nuevo {len(escritas)}", "0", "x")))
+
+        hilo = threading.Thread(target=escribir)
+        hilo.start()
+        try:
+            metricas = self.backups.crear_snapshot()
+        finally:
+            terminado.set()
+            hilo.join()
+        self.assertGreater(metricas["pasos"], 1)
+        self.assertTrue(all(escritas))
+        self.assertEqual(self.backups.verificar(metricas["archivo"]), [])
+        # La copia es una instantánea: las 500 iniciales y, como mucho, las escritas hasta el final
+        copiados = self._contar(metricas["archivo"], "propietarios")
+        self.assertGreaterEqual(copiados, 500)
+        self.assertLessEqual(copiados, 500 + len(escritas))
+
+    def test_copia_y_restaura_tambien_la_base_de_archivo(self):
+        propietario = self.db.get_all_propietarios()[0]
+        mascota = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, propietario.id))
+        self.db.insert_consulta(Consulta("2010-01-01", "Control", "Sano", mascota.id))
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+
+        metricas = self.backups.crear_snapshot()
+        self.assertEqual(metricas["copia_archivo"], destino_del_archivo(metricas["archivo"]))
+        self.assertEqual(self._contar(metricas["copia_archivo"], "consultas_archivo"), 1)
+        self.assertEqual(self.backups.listar(), [metricas["archivo"]])
+
+        self.db.delete_mascota(mascota.id)
+        self.assertEqual(self.db.get_consultas_by_mascota_id(mascota.id, historial_completo=True), [])
+        self.backups.restaurar(metricas["archivo"])
+        self.assertEqual(len(self.db.get_consultas_by_mascota_id(mascota.id, historial_completo=True)), 1)
+
+    def test_dentro_de_una_transaccion_no_se_copia(self):
+        with self.db.transaction(), self.assertRaises(RuntimeError):
+            self.backups.crear_snapshot()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+from batch import OPERACIONES, BatchRunner
+from database import DatabaseManager
+from models import Propietario
+
+
+class BatchRunnerTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self.db = DatabaseManager(os.path.join(self.directorio, "lotes.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+
+    def _ejecutar(self, comandos, **opciones):
+        salida = io.StringIO()
+        resumen = BatchRunner(self.db, salida=salida, **opciones).ejecutar(json.dumps(c) for c in comandos)
+        return resumen, [json.loads(linea) for linea in salida.getvalue().splitlines()]
+
+    def _mascota(self, nombre, edad=3):
+        return {"op": "registrar_mascota", "nombre": nombre, "especie": "gato", "edad": edad, "propietario": "Ana"}
+
+    def test_un_comando_que_falla_se_deshace_solo(self):
+        resumen, resultados = self._ejecutar([self._mascota("Luna"), self._mascota("Tom", edad=-1),
+                                              self._mascota("Mia")], tamano_grupo=2)
+        self.assertEqual([r["ok"] for r in resultados], [True, False, True])
+        self.assertEqual((resumen["errores"], resumen["transacciones"]), (1, 2))
+        self.assertEqual([m.nombre for m in self.db.get_mascotas_page()], ["Luna", "Mia"])
+
+    def test_todo_o_nada_deshace_el_archivo(self):
+        resumen, resultados = self._ejecutar([self._mascota("Luna"), self._mascota("Tom", edad="x")], todo_o_nada=True)
+        self.assertTrue(resumen["deshecho"])
+        self.assertTrue(all(r["deshecho"] for r in resultados))
+        self.assertEqual(self.db.get_propietarios_page(), [])
+
+    def test_un_error_de_sqlite_falla_solo_ese_comando(self):
+        falla = lambda db, args: db.execute("INSERT INTO propietarios (id, nombre) VALUES (1, 'Ana'), (1, 'Luis')")
+        with mock.patch.dict(OPERACIONES, {"falla": falla}):
+            resumen, resultados = self._ejecutar([{"op": "falla"}, self._mascota("Luna")])
+        self.assertEqual([r["ok"] for r in resultados], [False, True])
+        self.assertIn("UNIQUE", resultados[0]["error"])
+        self.assertEqual(len(self.db.get_propietarios_page()), 1)
+
+    def test_campos_de_texto_que_no_son_texto_fallan_solo_ese_comando(self):
+        comandos = [self._mascota("Luna"), {**self._mascota("Tom"), "propietario": 5},
+                    {"op": "buscar_consultas", "texto": 5}, {"op": "buscar_propietarios", "texto": ["ana"]},
+                    {"op": "registrar_propietario", "nombre": {"x": 1}}, self._mascota("Mia")]
+        resumen, resultados = self._ejecutar(comandos, tamano_grupo=10)
+        self.assertEqual([r["ok"] for r in resultados], [True, False, False, False, False, True])
+        self.assertIn("debe ser un texto", resultados[1]["error"])
+        self.assertEqual(resumen["errores"], 4)
+        self.assertEqual([m.nombre for m in self.db.get_mascotas_page()], ["Luna", "Mia"])
+
+    def test_un_error_inesperado_falla_solo_ese_comando(self):
+        def falla(db, args):
+            db.insert_propietario(Propietario("Luis", "1", "x"))
+            raise KeyError("inesperado")
+        with mock.patch.dict(OPERACIONES, {"falla": falla}):
+            _, resultados = self._ejecutar([self._mascota("Luna"), {"op": "falla"}])
+        self.assertEqual([r["ok"] for r in resultados], [True, False])
+        self.assertEqual([p.nombre for p in self.db.get_propietarios_page()], ["Ana"])
+
+    def test_limites_invalidos(self):
+        comandos = [{"op": "listar_propietarios", "limite": -1}, {"op": "listar_mascotas", "despues_de": "x"},
+                    {"op": "reporte", "top": 0}, {"op": "buscar_consultas", "texto": "vacuna", "limite": 1.5},
+                    {"op": "listar_propietarios"}]
+        _, resultados = self._ejecutar(comandos)
+        self.assertEqual([r["ok"] for r in resultados], [False, False, False, False, True])
+
+    def test_archivo_de_comandos_inexistente(self):
+        args = SimpleNamespace(**{**main.ARGUMENTOS_POR_DEFECTO, "db": os.path.join(self.directorio, "otra.db"),
+                                  "batch": os.path.join(self.directorio, "no_existe.jsonl")})
+        errores = io.StringIO()
+        with redirect_stderr(errores):
+            self.assertEqual(main.ejecutar_lote(args), 1)
+        self.assertIn("No se pudo abrir el archivo de comandos", errores.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
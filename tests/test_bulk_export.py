@@ -0,0 +1,46 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import archive
+from bulk_export import exportar
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class ExportarConsultasTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self.db = DatabaseManager(os.path.join(self.directorio, "clinica.db"), slow_query_log=None,
+                                  archivo=os.path.join(self.directorio, "archivo.db"))
+        self.addCleanup(self.db.close_connection)
+        ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        luna = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, ana.id))
+        rex = self.db.insert_mascota(Mascota("Rex", "perro", None, 5, ana.id))
+        for fecha, mascota in (("2024-05-01", luna), ("2010-01-01", luna), ("2011-02-02", rex), ("2024-01-01", rex)):
+            self.db.insert_consulta(Consulta(fecha, "Control", "Sano", mascota.id))
+        archive.archivar(self.db, "2015-01-01", pausa=0)
+
+    def _exportar(self, **opciones):
+        path = os.path.join(self.directorio, "consultas.csv")
+        resumen = exportar(self.db, "consultas", path, **opciones)
+        with open(path, encoding="utf-8", newline="") as f:
+            filas = [(fila["mascota"], fila["fecha"]) for fila in csv.DictReader(f)]
+        self.assertEqual(resumen["filas"], len(filas))
+        return filas
+
+    def test_incluye_las_archivadas_en_orden_por_mascota_y_fecha(self):
+        self.assertEqual(self._exportar(), [("Luna", "2010-01-01"), ("Luna", "2024-05-01"),
+                                            ("Rex", "2011-02-02"), ("Rex", "2024-01-01")])
+
+    def test_sin_archivadas_y_por_periodo(self):
+        self.assertEqual(self._exportar(historial_completo=False), [("Luna", "2024-05-01"), ("Rex", "2024-01-01")])
+        self.assertEqual(self._exportar(fecha_desde="2011-01-01", fecha_hasta="2024-02-01"),
+                         [("Rex", "2011-02-02"), ("Rex", "2024-01-01")])
+
+
+if __name__ == "__main__":
+    unittest.main()
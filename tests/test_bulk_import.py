@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+from bulk_import import BulkImporter
+from database import DatabaseManager
+from models import Mascota, Propietario
+
+
+class BulkImporterTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self.db = DatabaseManager(os.path.join(self.directorio, "importar.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        propietario = self.db.insert_propietario(Propietario("Ana Pérez", "555", "Calle 1"))
+        self.mascota = self.db.insert_mascota(Mascota("Luna", "gato", "Siamés", 3, propietario.id))
+        self.importer = BulkImporter(self.db, chunk_size=2)
+
+    def _archivo(self, nombre, contenido):
+        path = os.path.join(self.directorio, nombre)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        return path
+
+    def test_consulta_con_mascota_inexistente_se_rechaza(self):
+        path = self._archivo("consultas.csv", "fecha,motivo,diagnostico,id_mascota\n"
+                                              "2025-06-05,Vacuna,Sano,999\n"
+                                              f"05-06-2025,Control,Sano,{self.mascota.id}\n")
+        resumen = self.importer.importar("consultas", path)
+        self.assertEqual((resumen["insertadas"], resumen["rechazadas"]), (1, 1))
+        self.assertEqual(len(self.db.get_consultas_by_mascota_id(self.mascota.id)), 1)
+
+    def test_mascota_con_propietario_inexistente_se_rechaza(self):
+        path = self._archivo("mascotas.csv", "nombre,especie,raza,edad,id_propietario\n"
+                                             "Rex,perro,,5,999\n"
+                                             "Tom,gato,,2,abc\n")
+        resumen = self.importer.importar("mascotas", path)
+        self.assertEqual((resumen["insertadas"], resumen["rechazadas"]), (0, 2))
+
+    def test_lineas_jsonl_que_no_son_objetos_se_rechazan(self):
+        path = self._archivo("propietarios.jsonl", '{"nombre": "Luis Gómez"}\n[1, 2]\n"texto"\n{no es json\n'
+                                                   '{"nombre": "Ana Pérez"}\n')
+        resumen = self.importer.importar("propietarios", path)
+        # La última es un duplicado: también rechazada
+        self.assertEqual((resumen["procesadas"], resumen["insertadas"], resumen["rechazadas"]), (5, 1, 4))
+
+    def test_reanuda_desde_el_punto_de_control(self):
+        path = self._archivo("propietarios.csv", "nombre,telefono,direccion\nA,1,x\nB,2,y\nC,3,z\n")
+        self.importer.importar("propietarios", path)
+        self.assertEqual(self.importer.get_checkpoint("propietarios", path), 3)
+        resumen = self.importer.importar("propietarios", path)
+        self.assertEqual((resumen["omitidas_por_checkpoint"], resumen["procesadas"]), (3, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
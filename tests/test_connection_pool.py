@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from connection_pool import ConnectionPool
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.pool = ConnectionPool(os.path.join(directorio.name, "pool.db"), max_lectores=2, espera_lectora=0.1)
+        self.addCleanup(self.pool.close_all)
+
+    def test_pedir_mas_lectoras_de_las_que_hay_no_se_bloquea(self):
+        with self.pool.reading(), self.pool.reading():
+            with self.assertRaisesRegex(sqlite3.OperationalError, "max_lectores=2"):
+                with self.pool.reading():
+                    pass
+        # Las dos prestadas volvieron al pool
+        with self.pool.reading() as conn:
+            self.assertEqual(conn.execute("SELECT 1").fetchone(), (1,))
+
+    def test_lectora_prestada_durante_close_all_se_cierra_al_devolverse(self):
+        with self.pool.reading() as prestada:
+            with self.pool.reading() as libre:
+                pass
+            self.pool.close_all()
+            with self.assertRaises(sqlite3.ProgrammingError):
+                libre.execute("SELECT 1")
+            # La que estaba en uso sigue funcionando hasta devolverse
+            self.assertEqual(prestada.execute("SELECT 1").fetchone(), (1,))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            prestada.execute("SELECT 1")
+        with self.pool.reading() as conn:
+            self.assertIsNot(conn, prestada)
+            self.assertEqual(conn.execute("SELECT 1").fetchone(), (1,))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from database import DatabaseManager
+from entity_cache import EntityCache
+from models import Consulta, Mascota, Propietario
+
+
+class EntityCacheTests(unittest.TestCase):
+    def test_descarta_la_usada_hace_mas_tiempo(self):
+        cache = EntityCache(max_size=2, ttl=None)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+        self.assertEqual((cache.get(1), cache.get(2), cache.get(3)), ("a", None, "c"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_caducidad(self):
+        cache = EntityCache(ttl=10)
+        with mock.patch("entity_cache.time.monotonic", return_value=100.0):
+            cache.put(1, "a")
+        with mock.patch("entity_cache.time.monotonic", return_value=109.0):
+            self.assertEqual(cache.get(1), "a")
+        with mock.patch("entity_cache.time.monotonic", return_value=110.0):
+            self.assertIsNone(cache.get(1))
+
+    def test_no_guarda_un_valor_leido_antes_de_una_invalidacion(self):
+        cache = EntityCache()
+        generacion = cache.generation
+        cache.invalidate(1)
+        cache.put(1, "viejo", generacion)
+        self.assertIsNone(cache.get(1))
+
+
+class InvalidacionTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "cache.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        self.ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.luna = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, self.ana.id))
+        self.consulta = self.db.insert_consulta(Consulta("2024-01-01", "Control", "Sano", self.luna.id))
+        self._calentar()
+
+    def _calentar(self):
+        self.db.get_propietario_by_id(self.ana.id)
+        self.db.get_mascota_by_id(self.luna.id)
+        self.db.get_consulta_by_id(self.consulta.id)
+        self.assertEqual([self.db.cache_stats()[c]["size"] for c in ("propietarios", "mascotas", "consultas")],
+                         [1, 1, 1])
+
+    def test_actualizar_invalida_a_la_entidad_y_a_las_que_guardan_su_nombre(self):
+        self.assertTrue(self.db.update_propietario(self.ana.id, {"nombre": "Ana María"}))
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).nombre, "Ana María")
+        self.assertEqual(self.db.get_mascota_by_id(self.luna.id).propietario_nombre, "Ana María")
+        self.assertTrue(self.db.update_mascota(self.luna.id, {"nombre": "Lunita"}))
+        self.assertEqual(self.db.get_mascota_by_id(self.luna.id).nombre, "Lunita")
+        self.assertEqual(self.db.get_consulta_by_id(self.consulta.id).mascota_nombre, "Lunita")
+        self.assertTrue(self.db.update_consulta(self.consulta.id, {"diagnostico": "Otitis"}))
+        self.assertEqual(self.db.get_consulta_by_id(self.consulta.id).diagnostico, "Otitis")
+
+    def test_update_many_invalida_en_bloque(self):
+        self.assertEqual(self.db.update_many("mascotas", [(self.luna.id, {"nombre": "Lunita"})]), 1)
+        self.assertEqual(self.db.get_mascota_by_id(self.luna.id).nombre, "Lunita")
+        self.assertEqual(self.db.get_consulta_by_id(self.consulta.id).mascota_nombre, "Lunita")
+
+    def test_borrar_el_propietario_invalida_lo_que_borra_el_cascade(self):
+        self.assertTrue(self.db.delete_propietario(self.ana.id))
+        self.assertIsNone(self.db.get_propietario_by_id(self.ana.id))
+        self.assertIsNone(self.db.get_mascota_by_id(self.luna.id))
+        self.assertIsNone(self.db.get_consulta_by_id(self.consulta.id))
+
+    def test_delete_many_invalida_lo_que_borra_el_cascade(self):
+        self.assertEqual(self.db.delete_many("propietarios", [self.ana.id]), 1)
+        self.assertIsNone(self.db.get_propietario_by_id(self.ana.id))
+        self.assertIsNone(self.db.get_mascota_by_id(self.luna.id))
+        self.assertIsNone(self.db.get_consulta_by_id(self.consulta.id))
+
+    def test_delete_many_de_mascotas_invalida_sus_consultas(self):
+        self.assertEqual(self.db.delete_many("mascotas", [self.luna.id]), 1)
+        self.assertIsNone(self.db.get_mascota_by_id(self.luna.id))
+        self.assertIsNone(self.db.get_consulta_by_id(self.consulta.id))
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).nombre, "Ana")
+
+    def test_una_transaccion_deshecha_no_deja_datos_en_la_cache(self):
+        with self.db.transaction():
+            self.db.update_propietario(self.ana.id, {"nombre": "Ana María"})
+            # Lo leído dentro de la transacción no se guarda: aún puede deshacerse
+            self.assertEqual(self.db.get_propietario_by_id(self.ana.id).nombre, "Ana María")
+            self.db.set_rollback()
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).nombre, "Ana")
+        self.assertEqual(self.db.get_mascota_by_id(self.luna.id).propietario_nombre, "Ana")
+
+    def test_una_lectura_de_otro_hilo_antes_del_commit_no_sobrevive(self):
+        leido = []
+        with self.db.transaction():
+            self.db.update_propietario(self.ana.id, {"nombre": "Ana María"})
+            # Otro hilo lee el valor confirmado (el viejo) y lo guarda en la caché
+            hilo = threading.Thread(target=lambda: leido.append(self.db.get_propietario_by_id(self.ana.id).nombre))
+            hilo.start()
+            hilo.join()
+        self.assertEqual(leido, ["Ana"])
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).nombre, "Ana María")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import archive
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class ExpedienteTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "expediente.db"), slow_query_log=None,
+                                  archivo=os.path.join(directorio.name, "archivo.db"))
+        self.addCleanup(self.db.close_connection)
+        self.ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.luna = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, self.ana.id))
+        self.rex = self.db.insert_mascota(Mascota("Rex", "perro", None, 5, self.ana.id))
+        self.toby = self.db.insert_mascota(Mascota("Toby", "perro", None, 1, self.ana.id))
+        for fecha in ("2010-05-01", "2023-01-01", "2024-03-01", "2024-03-01", "2024-06-01"):
+            self.db.insert_consulta(Consulta(fecha, "Control", "Sano", self.luna.id))
+        self.db.insert_consulta(Consulta("2024-02-02", "Vacuna", "Sano", self.rex.id))
+        # Luis tiene una mascota sin consultas; Sofía, ninguna mascota
+        self.luis = self.db.insert_propietario(Propietario("Luis", "2", "y"))
+        self.db.insert_mascota(Mascota("Kira", "gato", None, 2, self.luis.id))
+        self.sofia = self.db.insert_propietario(Propietario("Sofía", "3", "z"))
+
+    def _fichas(self, expediente):
+        return {f.mascota.nombre: ([c.fecha.isoformat() for c in f.consultas], f.total_consultas)
+                for f in expediente.mascotas}
+
+    def test_todas_las_consultas_de_la_mas_reciente_a_la_mas_antigua(self):
+        expediente = self.db.get_expediente_propietario(self.ana.id)
+        self.assertEqual(expediente.propietario.nombre, "Ana")
+        self.assertEqual(self._fichas(expediente), {
+            "Luna": (["2024-06-01", "2024-03-01", "2024-03-01", "2023-01-01", "2010-05-01"], 5),
+            "Rex": (["2024-02-02"], 1),
+            "Toby": ([], 0),
+        })
+        luna = expediente.mascotas[0]
+        # Dos consultas el mismo día: primero la registrada después
+        self.assertGreater(luna.consultas[1].id, luna.consultas[2].id)
+        self.assertEqual({c.mascota_nombre for c in luna.consultas}, {"Luna"})
+
+    def test_limite_por_mascota_sin_perder_el_total(self):
+        expediente = self.db.get_expediente_propietario(self.ana.id, ultimas_consultas=2)
+        self.assertEqual(self._fichas(expediente), {
+            "Luna": (["2024-06-01", "2024-03-01"], 5),
+            "Rex": (["2024-02-02"], 1),
+            "Toby": ([], 0),
+        })
+        with self.assertRaises(ValueError):
+            self.db.get_expediente_propietario(self.ana.id, ultimas_consultas=0)
+
+    def test_propietarios_sin_consultas_o_sin_mascotas(self):
+        self.assertEqual(self._fichas(self.db.get_expediente_propietario(self.luis.id)), {"Kira": ([], 0)})
+        sofia = self.db.get_expediente_propietario(self.sofia.id, ultimas_consultas=3)
+        self.assertEqual((sofia.propietario.nombre, sofia.mascotas), ("Sofía", []))
+        self.assertIsNone(self.db.get_expediente_propietario(9999))
+
+    def test_historial_completo_con_archivadas(self):
+        archive.archivar(self.db, "2020-01-01", pausa=0)
+        self.assertEqual(self._fichas(self.db.get_expediente_propietario(self.ana.id, 10))["Luna"],
+                         (["2024-06-01", "2024-03-01", "2024-03-01", "2023-01-01"], 4))
+        completo = self.db.get_expediente_propietario(self.ana.id, 10, historial_completo=True)
+        self.assertEqual(self._fichas(completo)["Luna"],
+                         (["2024-06-01", "2024-03-01", "2024-03-01", "2023-01-01", "2010-05-01"], 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import log_config
+
+
+class _Hilo:
+    """Valor que anota en qué hilo se convirtió a texto."""
+
+    def __init__(self):
+        self.hilos = []
+
+    def __str__(self):
+        self.hilos.append(threading.current_thread().name)
+        return "valor"
+
+
+class SetupLoggingTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.path = os.path.join(directorio.name, "clinica.log")
+        raiz = logging.getLogger()
+        handlers, nivel = list(raiz.handlers), raiz.level
+        raiz.handlers[:] = []  # Solo el handler de setup_logging (p. ej. sin el de pytest)
+        self._archivos = []
+        def restaurar():
+            self._detener()
+            for archivo in self._archivos:
+                archivo.close()
+            raiz.handlers[:] = handlers
+            raiz.setLevel(nivel)
+            for nombre in ("prueba", "prueba.silenciado", "prueba.detallado"):
+                logging.getLogger(nombre).setLevel(logging.NOTSET)
+        self.addCleanup(restaurar)
+
+    def _detener(self):
+        """Vacía la cola y detiene el listener, guardando sus handlers para cerrarlos al final."""
+        for listener in log_config._listeners:
+            self._archivos.extend(listener.handlers)
+        log_config.detener_logging()
+
+    def _registros(self, path=None):
+        self._detener()
+        with open(path or self.path, encoding="utf-8") as f:
+            return [json.loads(linea) for linea in f]
+
+    def test_escribe_json_en_segundo_plano(self):
+        log_config.setup_logging(self.path)
+        log_config.setup_logging(self.path)  # La segunda llamada no agrega otro handler
+        valor = _Hilo()
+        logger = logging.getLogger("prueba")
+        logger.info("Propietario %s", valor, extra={"operacion": "insert_propietario", "entidad_id": 7,
+                                                    "duracion_ms": 1.5})
+        try:
+            raise ValueError("falla")
+        except ValueError:
+            logger.exception("Error al guardar")
+        registros = self._registros()
+        self.assertEqual(len(registros), 2)
+        self.assertEqual({k: registros[0][k] for k in ("nivel", "logger", "mensaje", "operacion", "entidad_id",
+                                                       "duracion_ms")},
+                         {"nivel": "INFO", "logger": "prueba", "mensaje": "Propietario valor",
+                          "operacion": "insert_propietario", "entidad_id": 7, "duracion_ms": 1.5})
+        self.assertIn("ValueError: falla", registros[1]["excepcion"])
+        # El mensaje se formatea en el hilo del listener, no en el que registra
+        self.assertNotEqual(valor.hilos, [])
+        self.assertNotIn(threading.current_thread().name, valor.hilos)
+
+    def test_niveles_por_modulo(self):
+        with mock.patch.dict(os.environ, {"CLINICA_LOG_LEVELS": "prueba.detallado=debug"}):
+            log_config.setup_logging(self.path, niveles={"prueba.silenciado": "WARNING",
+                                                         "prueba.detallado": "ERROR"})
+        logging.getLogger("prueba").debug("no")
+        logging.getLogger("prueba").info("general")
+        logging.getLogger("prueba.silenciado").info("no")
+        logging.getLogger("prueba.silenciado").warning("advertencia")
+        logging.getLogger("prueba.detallado").debug("detalle")
+        self.assertEqual([r["mensaje"] for r in self._registros()], ["general", "advertencia", "detalle"])
+
+    def test_rota_por_tamano(self):
+        log_config.setup_logging(self.path, max_bytes=2000, backups=2)
+        logger = logging.getLogger("prueba")
+        for i in range(100):
+            logger.info("Registro %s", i)
+        registros = self._registros()
+        self.assertTrue(os.path.exists(self.path + ".2"))
+        self.assertFalse(os.path.exists(self.path + ".3"))
+        self.assertEqual(registros[-1]["mensaje"], "Registro 99")
+        anteriores = self._registros(self.path + ".1")
+        self.assertEqual(int(anteriores[-1]["mensaje"].split()[1]) + 1, int(registros[0]["mensaje"].split()[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from datetime import date
+
+from models import Consulta, parse_fecha_iso
+
+
+class ParseFechaIsoTests(unittest.TestCase):
+    def test_fecha_iso_de_la_base(self):
+        self.assertEqual(parse_fecha_iso("2025-06-05"), date(2025, 6, 5))
+
+    def test_fecha_sin_ceros_como_strptime(self):
+        self.assertEqual(parse_fecha_iso("2025-6-5"), date(2025, 6, 5))
+        self.assertEqual(Consulta("2025-6-5", "Control", "Sano", 1).fecha, date(2025, 6, 5))
+
+    def test_fecha_invalida(self):
+        for fecha in ("2025-02-30", "05-06-2025", "20250605", ""):
+            with self.subTest(fecha=fecha), self.assertRaises(ValueError):
+                Consulta(fecha, "Control", "Sano", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
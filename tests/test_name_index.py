@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+import unittest
+
+from benchmark import APELLIDOS, NOMBRES
+from name_index import NameIndex, normalizar, trigramas
+
+# Presupuesto de una búsqueda con 100.000 nombres. Hoy la mediana ronda 0,8 ms y la más
+# lenta 4 ms; el margen cubre máquinas de CI lentas.
+PRESUPUESTO_MEDIANA_MS = 5.0
+PRESUPUESTO_MAXIMO_MS = 20.0
+
+
+def _similitud(consulta, palabras, umbral_palabra=0.4):
+    """La similitud que documenta NameIndex, calculada nombre por nombre."""
+    def parecido(a, b):
+        ta, tb = trigramas(a), trigramas(b)
+        jaccard = len(ta & tb) / len(ta | tb)
+        return jaccard if jaccard >= umbral_palabra else 0.0
+    total = sum(max((parecido(q, p) for p in palabras), default=0.0) for q in consulta)
+    return total / (len(consulta) + max(0, len(palabras) - len(consulta)) / 2)
+
+
+def _nombres(rnd, cantidad):
+    """Nombre y dos apellidos, con los más comunes mucho más frecuentes (distribución de Zipf)."""
+    pesos = lambda lista: [1 / (i + 1) for i in range(len(lista))]
+    nombres = rnd.choices(NOMBRES, pesos(NOMBRES), k=cantidad)
+    apellidos = rnd.choices(APELLIDOS, pesos(APELLIDOS), k=2 * cantidad)
+    return [f"{nombres[i]} {apellidos[2 * i]} {apellidos[2 * i + 1]}" for i in range(cantidad)]
+
+
+class NameIndexTests(unittest.TestCase):
+    def test_coincide_con_la_similitud_calculada_nombre_por_nombre(self):
+        rnd = random.Random(5)
+        palabras = NOMBRES + APELLIDOS + ["Josefa", "Josué", "Perea", "Pereira", "de la Cruz"]
+        nombres = {i: " ".join(rnd.choices(palabras, k=rnd.randint(1, 4))) for i in range(2000)}
+        indice = NameIndex()
+        for i, nombre in nombres.items():
+            indice.add(i, nombre)
+        for i in range(0, 2000, 7):
+            indice.remove(i)
+            del nombres[i]
+        for texto in ("Jose Perez", "maria garsia", "Ana", "Cruz Pereira Lopes", "Sofia de la Cruz", "xyz"):
+            for umbral in (0.4, 0.6, 0.8):
+                with self.subTest(texto=texto, umbral=umbral):
+                    consulta = list(dict.fromkeys(normalizar(texto)))
+                    esperado = sorted(
+                        ((i, nombre, s) for i, nombre in nombres.items()
+                         if (s := _similitud(consulta, tuple(dict.fromkeys(normalizar(nombre))))) >= umbral),
+                        key=lambda r: (-r[2], r[1], r[0]))[:10]
+                    obtenido = indice.search(texto, limit=10, umbral=umbral)
+                    self.assertEqual([r[:2] for r in obtenido], [r[:2] for r in esperado])
+                    for (_, _, s1), (_, _, s2) in zip(obtenido, esperado):
+                        self.assertAlmostEqual(s1, s2)
+
+
+class NameIndexLatenciaTests(unittest.TestCase):
+    """Regresión de la latencia de search() con 100.000 nombres."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.indice = NameIndex()
+        for i, nombre in enumerate(_nombres(random.Random(42), 100_000)):
+            cls.indice.add(i, nombre)
+
+    def test_busqueda_dentro_del_presupuesto(self):
+        rnd = random.Random(7)
+        consultas = ["Jose Perez", "ana", "Maria Garcia Lopez", "Luis Gomes", "sofia ramires torres",
+                     "Xavier Nadie"] + _nombres(rnd, 40)
+        self.indice.search("calentar")
+        tiempos = []
+        for texto in consultas:
+            inicio = time.perf_counter()
+            self.indice.search(texto)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        self.assertLess(statistics.median(tiempos), PRESUPUESTO_MEDIANA_MS, tiempos)
+        self.assertLess(max(tiempos), PRESUPUESTO_MAXIMO_MS, tiempos)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class PaginacionPorClaveTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "paginas.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        with self.db.transaction():
+            self.propietarios = [self.db.insert_propietario(Propietario(f"Propietario {i}", str(i), "x"))
+                                 for i in range(7)]
+            self.mascotas = [self.db.insert_mascota(Mascota(f"Mascota {i}", "gato", None, 1, p.id))
+                             for i, p in enumerate(self.propietarios)]
+
+    def test_paginas_de_propietarios(self):
+        primera = self.db.get_propietarios_page(limit=3)
+        segunda = self.db.get_propietarios_page(primera[-1].id, 3)
+        tercera = self.db.get_propietarios_page(segunda[-1].id, 3)
+        self.assertEqual([len(primera), len(segunda), len(tercera)], [3, 3, 1])
+        self.assertEqual([p.id for p in primera + segunda + tercera], [p.id for p in self.propietarios])
+        self.assertEqual(self.db.get_propietarios_page(tercera[-1].id, 3), [])
+
+    def test_una_baja_entre_paginas_no_repite_ni_salta_filas(self):
+        primera = self.db.get_mascotas_page(limit=3)
+        self.db.delete_mascota(primera[-1].id)
+        self.db.delete_mascota(self.mascotas[3].id)
+        resto = self.db.get_mascotas_page(primera[-1].id, 10)
+        self.assertEqual([m.id for m in resto], [m.id for m in self.mascotas[4:]])
+
+    def test_iteradores_recorren_todo_con_paginas_exactas(self):
+        for page_size in (1, 3, 7, 50):
+            with self.subTest(page_size=page_size):
+                self.assertEqual([p.id for p in self.db.iter_propietarios(page_size)],
+                                 [p.id for p in self.propietarios])
+                self.assertEqual([m.nombre for m in self.db.iter_mascotas(page_size)],
+                                 [m.nombre for m in self.mascotas])
+
+    def test_historial_por_paginas_con_fechas_repetidas(self):
+        mascota = self.mascotas[0]
+        with self.db.transaction():
+            for fecha in ("2025-01-10", "2025-03-01", "2025-03-01", "2025-03-01", "2024-12-31"):
+                self.db.insert_consulta(Consulta(fecha, "Control", "Sano", mascota.id))
+        vistas, antes = [], None
+        while True:
+            pagina = self.db.get_consultas_page_by_mascota_id(mascota.id, antes, limit=2)
+            if not pagina:
+                break
+            vistas.extend(pagina)
+            antes = (pagina[-1].fecha.isoformat(), pagina[-1].id)
+        completo = self.db.get_consultas_by_mascota_id(mascota.id)
+        self.assertEqual(len({c.id for c in vistas}), 5)
+        self.assertEqual([c.fecha for c in vistas], [c.fecha for c in completo])
+        self.assertEqual([c.fecha.isoformat() for c in vistas[:3]], ["2025-03-01"] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
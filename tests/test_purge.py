@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import purge
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class PurgaTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "purga.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        # Ana y Luis: inactivos desde 2010; Marta: una mascota vieja y otra reciente;
+        # Sofía: nunca tuvo consultas
+        with self.db.transaction():
+            for nombre, historias in (("Ana", [["2008-01-01", "2009-05-05"]]), ("Luis", [["2010-01-01"], []]),
+                                      ("Marta", [["2005-01-01"], ["2004-01-01", "2024-01-01"]]), ("Sofía", [[]])):
+                propietario = self.db.insert_propietario(Propietario(nombre, "1", "x"))
+                for i, fechas in enumerate(historias):
+                    mascota = self.db.insert_mascota(Mascota(f"{nombre} {i}", "gato", None, 1, propietario.id))
+                    for fecha in fechas:
+                        self.db.insert_consulta(Consulta(fecha, "Control", "Sano", mascota.id))
+
+    def _totales(self):
+        return {tabla: self.db.fetchone(f"SELECT COUNT(*) FROM {tabla}")[0] for tabla in purge.TABLAS}
+
+    def test_simular_cuenta_lo_mismo_que_borra(self):
+        for politica, esperado in (("propietarios_inactivos", {"propietarios": 2, "mascotas": 3, "consultas": 3}),
+                                   ("mascotas_inactivas", {"propietarios": 0, "mascotas": 3, "consultas": 4}),
+                                   ("consultas_antiguas", {"propietarios": 0, "mascotas": 0, "consultas": 5})):
+            with self.subTest(politica=politica):
+                self.assertEqual(purge.contar(self.db, politica, "2015-01-01"), esperado)
+        antes = self._totales()
+        resumen = purge.purgar(self.db, "propietarios_inactivos", "2015-01-01", lote=1, pausa=0)
+        self.assertEqual({tabla: resumen[tabla] for tabla in purge.TABLAS}, resumen["previstas"])
+        self.assertEqual(resumen["lotes"], 2)
+        self.assertEqual(self._totales(), {tabla: antes[tabla] - resumen[tabla] for tabla in purge.TABLAS})
+        self.assertEqual([p.nombre for p in self.db.get_propietarios_page()], ["Marta", "Sofía"])
+
+    def test_mascotas_inactivas_en_lotes(self):
+        resumen = purge.purgar(self.db, "mascotas_inactivas", "2015-01-01", lote=2, pausa=0)
+        self.assertEqual((resumen["mascotas"], resumen["consultas"], resumen["lotes"]), (3, 4, 2))
+        # Quedan la mascota con una consulta reciente y las que nunca tuvieron consultas
+        self.assertEqual(sorted(m.nombre for m in self.db.get_mascotas_page()), ["Luis 1", "Marta 1", "Sofía 0"])
+        self.assertEqual(purge.contar(self.db, "mascotas_inactivas", "2015-01-01"),
+                         {"propietarios": 0, "mascotas": 0, "consultas": 0})
+
+    def test_conteo_no_cuenta_mascotas_sin_propietario(self):
+        # Una mascota inactiva sin propietario no es un propietario inactivo
+        with self.db.transaction():
+            self.db.execute("INSERT INTO mascotas (nombre, especie, edad, id_propietario) VALUES ('Sin dueño', 'gato', 1, NULL)")
+            self.db.execute("INSERT INTO consultas (fecha, motivo, diagnostico, id_mascota) "
+                            "VALUES ('2001-01-01', 'Control', 'Sano', last_insert_rowid())")
+        previstas = purge.contar(self.db, "propietarios_inactivos", "2015-01-01")
+        self.assertEqual(previstas, {"propietarios": 2, "mascotas": 3, "consultas": 3})
+        resumen = purge.purgar(self.db, "propietarios_inactivos", "2015-01-01", pausa=0)
+        self.assertEqual({tabla: resumen[tabla] for tabla in purge.TABLAS}, previstas)
+        self.assertEqual(purge.contar(self.db, "mascotas_inactivas", "2015-01-01")["mascotas"], 2)
+
+    def test_fecha_de_corte(self):
+        self.assertEqual(purge.fecha_de_corte(10, date(2025, 6, 5)), "2015-06-05")
+        self.assertEqual(purge.fecha_de_corte(1, date(2024, 2, 29)), "2023-02-28")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import time
+import unittest
+
+from database import DatabaseManager
+from models import Propietario
+
+
+class InstrumentacionTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "stats.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        self.registradas = []
+        self.db.add_query_hook(lambda sql, params, elapsed_ms, filas, conn:
+                               self.registradas.append((sql, elapsed_ms, filas)))
+
+    def test_iter_rows_no_cuenta_el_tiempo_del_consumidor(self):
+        for i in range(3):
+            self.db.insert_propietario(Propietario(f"Dueño {i}", str(i), "x"))
+        sql = "SELECT id FROM propietarios ORDER BY id"
+        for _ in self.db.iter_rows(sql, batch_size=1):
+            time.sleep(0.05)
+        [(_, elapsed_ms, filas)] = [r for r in self.registradas if r[0] == sql]
+        self.assertEqual(filas, 3)
+        self.assertLess(elapsed_ms, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import schema
+from database import DatabaseManager
+
+
+class MigracionesTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.path = os.path.join(directorio.name, "esquema.db")
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_actualiza_una_base_anterior_a_las_migraciones_sin_perder_datos(self):
+        # Una base creada antes de existir las migraciones: solo las tablas, user_version = 0
+        conn = self._conectar()
+        for sentencia in schema.MIGRATIONS[0]:
+            conn.execute(sentencia)
+        conn.execute("INSERT INTO propietarios (nombre, telefono, direccion) VALUES ('Ana', '1', 'x')")
+        conn.execute("INSERT INTO mascotas (nombre, especie, edad, id_propietario) VALUES ('Luna', 'gato', 3, 1)")
+        conn.executemany("INSERT INTO consultas (fecha, motivo, diagnostico, id_mascota) VALUES (?, ?, ?, 1)",
+                         [("2024-01-10", "Rascado de orejas", "Otitis externa"), ("2024-02-01", "Control", "Sano")])
+        conn.commit()
+        conn.close()
+
+        db = DatabaseManager(self.path, slow_query_log=None)
+        self.addCleanup(db.close_connection)
+        self.assertEqual(db.fetchone("PRAGMA user_version")[0], schema.SCHEMA_VERSION)
+        self.assertEqual(db.get_propietario_by_id(1).nombre, "Ana")
+        self.assertEqual(len(db.get_consultas_by_mascota_id(1)), 2)
+        # Las tablas de resumen y la búsqueda se llenan con los datos que ya había
+        self.assertEqual(db.get_consultas_por_especie_mes(), [("gato", "2024-01", 1), ("gato", "2024-02", 1)])
+        self.assertEqual([c.diagnostico for c in db.search_consultas("otitis")], ["Otitis externa"])
+        indices = {row[0] for row in db.fetchall("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_consultas_mascota_fecha", indices)
+
+    def test_con_el_esquema_al_dia_no_ejecuta_ddl(self):
+        conn = self._conectar()
+        self.assertEqual(schema.migrate(conn), schema.SCHEMA_VERSION)
+        sentencias = []
+        conn.set_trace_callback(sentencias.append)
+        self.assertEqual(schema.migrate(conn), 0)
+        self.assertEqual(sentencias, ["PRAGMA user_version"])
+
+    def test_una_migracion_que_falla_no_deja_la_base_a_medio_migrar(self):
+        conn = self._conectar()
+        schema.migrate(conn)
+        rota = [["CREATE TABLE vacunas (id INTEGER PRIMARY KEY)", "CREATE INDEX idx_rota ON no_existe (x)"]]
+        with mock.patch.object(schema, "MIGRATIONS", schema.MIGRATIONS + rota), \
+                mock.patch.object(schema, "SCHEMA_VERSION", schema.SCHEMA_VERSION + 1):
+            with self.assertRaises(sqlite3.OperationalError):
+                schema.migrate(conn)
+        self.assertEqual(schema.get_version(conn), schema.SCHEMA_VERSION)
+        self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'vacunas'").fetchone())
+
+
+if __name__ == "__main__":
+    unittest.main()
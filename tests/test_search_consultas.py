@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class SearchConsultasTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "fts.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.luna = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, ana.id))
+        self.tos = self._consulta("2024-01-10", 'Tos "seca" (nocturna)', "Traqueítis")
+        self.otitis = self._consulta("2024-02-01", "Rascado de orejas, posible otitis", "Otitis externa")
+        self.control = self._consulta("2024-03-01", "Control anual", "Sano, descartada otitis previa")
+
+    def _consulta(self, fecha, motivo, diagnostico):
+        return self.db.insert_consulta(Consulta(fecha, motivo, diagnostico, self.luna.id))
+
+    def _ids(self, texto, **kwargs):
+        return [c.id for c in self.db.search_consultas(texto, **kwargs)]
+
+    def _indice_integro(self):
+        # Compara el índice con la tabla `consultas`; lanza sqlite3.DatabaseError si difieren
+        self.db.execute("INSERT INTO consultas_fts (consultas_fts, rank) VALUES ('integrity-check', 1)")
+
+    def test_los_triggers_mantienen_el_indice_al_dia(self):
+        self.assertEqual(self._ids("traqueitis"), [self.tos.id])
+        self.assertTrue(self.db.update_consulta(self.tos.id, {"diagnostico": "Bronquitis"}))
+        self.assertEqual(self._ids("traqueitis"), [])
+        self.assertEqual(self._ids("bronquitis"), [self.tos.id])
+        self.assertTrue(self.db.delete_consulta(self.tos.id))
+        self.assertEqual(self._ids("bronquitis"), [])
+        self.assertTrue(self.db.delete_mascota(self.luna.id))
+        self.assertEqual(self._ids("otitis"), [])
+        self._indice_integro()
+
+    def test_ordena_por_relevancia(self):
+        # "otitis" aparece en los dos campos de una consulta y una sola vez en la otra
+        self.assertEqual(self._ids("otitis"), [self.otitis.id, self.control.id])
+        self.assertEqual(self._ids("otitis externa"), [self.otitis.id])
+
+    def test_sin_tildes_ni_mayusculas_y_por_prefijo(self):
+        for texto in ("traqueitis", "TRAQUEÍTIS", "traque"):
+            with self.subTest(texto=texto):
+                self.assertEqual(self._ids(texto), [self.tos.id])
+
+    def test_comillas_y_operadores_se_buscan_como_texto(self):
+        for texto, esperado in (('"seca"', [self.tos.id]), ("tos)", [self.tos.id]), ('(nocturna', [self.tos.id]),
+                                # OR es una palabra más (obligatoria), no un operador
+                                ("tos OR otitis", []), ("-", []), ('"', []),
+                                ("*", []), ("", []), ("   ", [])):
+            with self.subTest(texto=texto):
+                with self.assertNoLogs("database", "ERROR"):
+                    self.assertEqual(self._ids(texto), esperado)
+
+    def test_fts_query(self):
+        self.assertEqual(DatabaseManager._fts_query('tos "seca"'), '"tos"* """seca"""*')
+        self.assertEqual(DatabaseManager._fts_query("  "), "")
+
+    def test_filtra_por_fecha_y_pagina(self):
+        self.assertEqual(self._ids("otitis", fecha_desde=date(2024, 2, 15)), [self.control.id])
+        self.assertEqual(self._ids("otitis", fecha_hasta=date(2024, 2, 15)), [self.otitis.id])
+        self.assertEqual(self._ids("otitis", limit=1, offset=1), [self.control.id])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from models import Propietario
+
+
+class SearchPropietariosTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.path = os.path.join(directorio.name, "nombres.db")
+        self.db = DatabaseManager(self.path, slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        self.jose = self.db.insert_propietario(Propietario("José Pérez", "1", "x"))
+
+    def _nombres(self, texto):
+        return [propietario.nombre for propietario, _ in self.db.search_propietarios(texto)]
+
+    def test_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self.db.search_propietarios("jose perez")[0][1], 1.0)
+        self.assertEqual(self._nombres("JOSE PERES"), ["José Pérez"])
+
+    def test_dentro_de_una_transaccion_no_se_guarda_la_version_sin_confirmar(self):
+        self.assertEqual(self._nombres("Jose Perez"), ["José Pérez"])
+        with self.db.transaction():
+            self.db.insert_propietario(Propietario("Carla Ruiz", "2", "y"))
+            self.assertEqual(self._nombres("Carla Ruiz"), [])
+            self.db.set_rollback()
+        # Si el índice hubiera tomado la versión leída dentro de la transacción
+        # deshecha, ya no coincidiría con la base y quedaría desincronizado
+        otra = DatabaseManager(self.path, slow_query_log=None)
+        self.addCleanup(otra.close_connection)
+        otra.insert_propietario(Propietario("Carla Ruiz", "3", "z"))
+        self.assertEqual(self._nombres("Carla Ruiz"), ["Carla Ruiz"])
+
+    def test_las_escrituras_confirmadas_actualizan_el_indice(self):
+        self.assertEqual(self._nombres("Luis Gomez"), [])
+        with self.db.transaction():
+            luis = self.db.insert_propietario(Propietario("Luis Gómez", "2", "y"))
+        self.assertEqual(self._nombres("Luis Gomez"), ["Luis Gómez"])
+        self.db.update_propietario(luis.id, {"nombre": "Luis Gómez Ruiz"})
+        self.db.delete_propietario(self.jose.id)
+        self.assertEqual(self._nombres("Luis Gomez Ruiz"), ["Luis Gómez Ruiz"])
+        self.assertEqual(self._nombres("Jose Perez"), [])
+
+    def test_sin_indice_dentro_de_una_transaccion_se_usa_uno_provisorio(self):
+        with self.db.transaction():
+            self.db.insert_propietario(Propietario("Marta Díaz", "2", "y"))
+            self.assertEqual(self._nombres("Marta Diaz"), ["Marta Díaz"])
+            self.db.set_rollback()
+        self.assertEqual(self._nombres("Marta Diaz"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+from models import Consulta, Mascota, Propietario
+from shards import ShardRouter
+
+
+class ShardRouterTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.router = ShardRouter({sede: os.path.join(directorio.name, f"{sede}.db") for sede in ("centro", "norte")},
+                                  lote=2, slow_query_log=None, max_lectores=1)
+        self.addCleanup(self.router.close)
+        datos = {
+            "centro": [("ana", [("2025-01-05", "Otitis"), ("2025-03-01", "Sano")]), ("Carla", [])],
+            "norte": [("Beto", [("2025-02-10", "Otitis"), ("2024-12-31", "Otitis")]), ("Álvaro", []),
+                      ("david", [("2025-01-20", "Sano")])],
+        }
+        for sede, propietarios in datos.items():
+            db = self.router.shard(sede)
+            for nombre, consultas in propietarios:
+                propietario = db.insert_propietario(Propietario(nombre, "1", "x"))
+                mascota = db.insert_mascota(Mascota(f"Mascota de {nombre}", "gato", None, 1, propietario.id))
+                for fecha, diagnostico in consultas:
+                    db.insert_consulta(Consulta(fecha, "Control", diagnostico, mascota.id))
+
+    def test_propietarios_fusionados_por_nombre(self):
+        # COLLATE NOCASE solo ignora mayúsculas ASCII: "Álvaro" va después de la "z"
+        self.assertEqual([(sede, p.nombre) for sede, p in self.router.iter_propietarios()],
+                         [("centro", "ana"), ("norte", "Beto"), ("centro", "Carla"), ("norte", "david"),
+                          ("norte", "Álvaro")])
+
+    def test_consultas_de_la_mas_reciente_a_la_mas_antigua(self):
+        fechas = [(sede, c.fecha.isoformat()) for sede, c in self.router.iter_consultas("2025-01-01", "2025-12-31")]
+        self.assertEqual(fechas, [("centro", "2025-03-01"), ("norte", "2025-02-10"), ("norte", "2025-01-20"),
+                                  ("centro", "2025-01-05")])
+
+    def test_listado_abandonado_devuelve_las_lectoras(self):
+        listado = self.router.iter_mascotas()
+        self.assertEqual(next(listado)[1].nombre, "Mascota de ana")
+        listado.close()
+        # Con una sola lectora por sede, esto se bloquearía si un hilo aún la retuviera
+        for sede in self.router.sedes:
+            self.assertEqual(len(self.router.shard(sede).get_mascotas_page()), len(self.router.shard(sede).fetchall(
+                "SELECT id FROM mascotas")))
+
+    def test_reportes_suman_las_sedes(self):
+        self.assertEqual(self.router.get_top_diagnosticos(), [("otitis", 3), ("sano", 2)])
+        self.assertEqual(self.router.get_consultas_por_especie_mes(),
+                         [("gato", "2024-12", 1), ("gato", "2025-01", 2), ("gato", "2025-02", 1),
+                          ("gato", "2025-03", 1)])
+        self.assertEqual(len(self.router.get_mascotas_por_propietario(top=3)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from models import Consulta, Mascota, Propietario
+
+
+class TablasDeResumenTests(unittest.TestCase):
+    """Los triggers de la migración 6 (y 8) mantienen los reportes iguales a un recálculo."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "stats.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+
+    def _reportes(self):
+        return (self.db.get_consultas_por_especie_mes(), self.db.get_mascotas_por_propietario(100),
+                self.db.get_top_diagnosticos(100))
+
+    def assertIgualAlRecalculo(self):
+        incrementales = self._reportes()
+        self.assertTrue(self.db.rebuild_stats())
+        self.assertEqual(incrementales, self._reportes())
+
+    def test_altas_cambios_y_bajas(self):
+        ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        luis = self.db.insert_propietario(Propietario("Luis", "2", "y"))
+        luna = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, ana.id))
+        rex = self.db.insert_mascota(Mascota("Rex", "perro", None, 5, ana.id))
+        consultas = [self.db.insert_consulta(Consulta(f"2025-0{mes}-10", "Control", diagnostico, mascota.id))
+                     for mes, diagnostico, mascota in ((1, "Sano", luna), (1, "Otitis", rex), (2, "Sano", rex))]
+        self.assertEqual(self.db.get_consultas_por_especie_mes(),
+                         [("gato", "2025-01", 1), ("perro", "2025-01", 1), ("perro", "2025-02", 1)])
+        self.assertEqual(self.db.get_top_diagnosticos(), [("sano", 2), ("otitis", 1)])
+        self.assertIgualAlRecalculo()
+
+        self.db.update_consulta(consultas[0].id, {"fecha": "2025-03-01", "diagnostico": "Otitis"})
+        self.db.update_mascota(rex.id, {"especie": "gato", "id_propietario": luis.id})
+        self.assertIgualAlRecalculo()
+        self.db.delete_mascota(luna.id)
+        self.db.delete_propietario(luis.id)
+        self.assertIgualAlRecalculo()
+        self.assertEqual(self._reportes(), ([], [], []))
+
+    def test_consulta_de_mascota_inexistente_informa_la_clave_foranea(self):
+        with self.assertRaisesRegex(sqlite3.IntegrityError, "FOREIGN KEY"):
+            self.db.execute("INSERT INTO consultas (fecha, motivo, diagnostico, id_mascota) VALUES (?, ?, ?, ?)",
+                            ("2025-06-05", "Vacuna", "Sano", 999))
+        self.assertEqual(self._reportes(), ([], [], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
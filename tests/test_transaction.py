@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from database import DatabaseManager
+from models import Propietario
+
+
+class TransaccionesAnidadasTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "tx.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+
+    def _nombres(self):
+        return [p.nombre for p in self.db.get_propietarios_page()]
+
+    def _insertar(self, nombre):
+        return self.db.insert_propietario(Propietario(nombre, "1", "x"))
+
+    def test_excepcion_en_un_savepoint_deshace_solo_ese_nivel(self):
+        with self.db.transaction():
+            self._insertar("Ana")
+            with self.assertRaises(RuntimeError), self.db.transaction():
+                self._insertar("Luis")
+                raise RuntimeError("falla el bloque interno")
+            self._insertar("Marta")
+        self.assertEqual(self._nombres(), ["Ana", "Marta"])
+
+    def test_set_rollback_en_el_nivel_interno(self):
+        with self.db.transaction():
+            ana = self._insertar("Ana")
+            with self.db.transaction():
+                self.db.update_propietario(ana.id, {"telefono": "999"})
+                self.db.set_rollback()
+        self.assertEqual(self.db.get_propietario_by_id(ana.id).telefono, "1")
+
+    def test_rollback_exterior_deshace_los_savepoints_confirmados(self):
+        with self.db.transaction():
+            self._insertar("Ana")
+            with self.db.transaction():
+                self._insertar("Luis")
+            self.db.set_rollback()
+        self.assertEqual(self._nombres(), [])
+        self.assertFalse(self.db.in_transaction)
+
+    def test_la_cache_no_conserva_lo_deshecho(self):
+        ana = self._insertar("Ana")
+        self.assertEqual(self.db.get_propietario_by_id(ana.id).nombre, "Ana")
+        with self.db.transaction():
+            self.db.update_propietario(ana.id, {"nombre": "Ana María"})
+            self.assertEqual(self.db.get_propietario_by_id(ana.id).nombre, "Ana María")
+            self.db.set_rollback()
+        self.assertEqual(self.db.get_propietario_by_id(ana.id).nombre, "Ana")
+
+
+class TransaccionesEntreProcesosTests(unittest.TestCase):
+    """Dos managers sobre el mismo archivo, como la CLI y Django a la vez."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        path = os.path.join(directorio.name, "compartida.db")
+        self.db = DatabaseManager(path, slow_query_log=None)
+        self.otro = DatabaseManager(path, slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        self.addCleanup(self.otro.close_connection)
+        self.ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.otro.connect()
+
+    def test_leer_y_luego_escribir_espera_al_otro_en_vez_de_fallar(self):
+        leido = threading.Event()
+        resultados = {}
+
+        def otro_proceso():
+            leido.wait()
+            # Espera (busy_timeout) a que la transacción del primero confirme
+            resultados["otro"] = self.otro.insert_propietario(Propietario("Luis", "2", "y"))
+
+        hilo = threading.Thread(target=otro_proceso)
+        hilo.start()
+        try:
+            with self.db.transaction():
+                self.assertIsNotNone(self.db.get_propietario_by_nombre("Ana"))
+                leido.set()
+                hilo.join(0.2)  # El otro intenta escribir mientras esta transacción sigue abierta
+                resultados["propio"] = self.db.update_propietario(self.ana.id, {"telefono": "999"})
+        finally:
+            leido.set()
+            hilo.join()
+        self.assertTrue(resultados["propio"])
+        self.assertIsNotNone(resultados["otro"])
+        self.assertEqual(sorted(p.nombre for p in self.db.get_propietarios_page()), ["Ana", "Luis"])
+
+
+if __name__ == "__main__":
+    unittest.main()
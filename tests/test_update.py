@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import database
+from database import DatabaseManager
+from models import Mascota, Propietario
+
+
+class ActualizacionTests(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = DatabaseManager(os.path.join(directorio.name, "update.db"), slow_query_log=None)
+        self.addCleanup(self.db.close_connection)
+        self.ana = self.db.insert_propietario(Propietario("Ana", "1", "x"))
+        self.luis = self.db.insert_propietario(Propietario("Luis", "2", "y"))
+        self.luna = self.db.insert_mascota(Mascota("Luna", "gato", None, 3, self.ana.id))
+
+    def _nombres(self):
+        return [row[0] for row in self.db.fetchall("SELECT nombre FROM propietarios ORDER BY id")]
+
+    def test_rechaza_columnas_fuera_de_la_lista(self):
+        for new_data in ({"id": 99}, {"nombre = 'x' --": "y"}, {"telefono": "3", "nombre; DROP TABLE mascotas": 1}):
+            with self.subTest(new_data=new_data):
+                with self.assertLogs("database", "ERROR") as logs:
+                    self.assertFalse(self.db.update_propietario(self.ana.id, new_data))
+                self.assertIn("Columnas no actualizables", logs.output[0])
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).telefono, "1")
+        self.assertEqual(self.db.fetchone("SELECT COUNT(*) FROM mascotas")[0], 1)
+        with self.assertLogs("database", "ERROR"):
+            self.assertIsNone(self.db.update_many("mascotas", [(self.luna.id, {"propietario": self.luis.id})]))
+        with self.assertLogs("database", "ERROR"):
+            self.assertIsNone(self.db.update_many("usuarios", [(1, {"nombre": "x"})]))
+
+    def test_el_orden_de_las_claves_no_cambia_la_sentencia(self):
+        sql_a, params_a = database._preparar_update("mascotas", 7, {"edad": 4, "nombre": "Luna"})
+        sql_b, params_b = database._preparar_update("mascotas", 7, {"nombre": "Luna", "edad": 4})
+        self.assertIs(sql_a, sql_b)
+        self.assertEqual(sql_a, "UPDATE mascotas SET nombre = ?, edad = ? WHERE id = ?")
+        self.assertEqual(params_a, ("Luna", 4, 7))
+        self.assertEqual(params_a, params_b)
+
+        self.db.query_stats.reset()
+        self.db.update_mascota(self.luna.id, {"edad": 4, "raza": "Siamés"})
+        self.db.update_mascota(self.luna.id, {"raza": "Persa", "edad": 5})
+        updates = [f for f in self.db.query_stats.summary() if f["sql"].startswith("UPDATE")]
+        self.assertEqual([f["llamadas"] for f in updates], [2])
+
+    def test_update_many_aplica_todo_o_nada(self):
+        # El segundo cambio repite un nombre (UNIQUE): no se aplica ninguno
+        with self.assertLogs("database", "ERROR"):
+            self.assertIsNone(self.db.update_many("propietarios", [(self.ana.id, {"telefono": "9"}),
+                                                                   (self.luis.id, {"nombre": "Ana"})]))
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).telefono, "1")
+        self.assertEqual(self._nombres(), ["Ana", "Luis"])
+        # Una columna desconocida se detecta antes de escribir
+        with self.assertLogs("database", "ERROR"):
+            self.assertIsNone(self.db.update_many("propietarios", [(self.ana.id, {"telefono": "9"}),
+                                                                   (self.luis.id, {"clave": "x"})]))
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).telefono, "1")
+        self.assertEqual(self.db.update_many("propietarios", [(self.ana.id, {"telefono": "9"}),
+                                                              (self.luis.id, {"nombre": "Luis Gómez"})]), 2)
+        self.assertEqual(self._nombres(), ["Ana", "Luis Gómez"])
+        self.assertEqual(self.db.get_propietario_by_id(self.ana.id).telefono, "9")
+
+
+if __name__ == "__main__":
+    unittest.main()
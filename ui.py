@@ -2,6 +2,8 @@
 from datetime import datetime
 import logging
 
+logger = logging.getLogger(__name__)
+
 class UIUtils:
     """Clase estática para utilidades de interfaz de usuario en consola."""
     @staticmethod
@@ -23,7 +25,7 @@ class UIUtils:
                 return value
             except ValueError:
                 print(error_msg)
-                logging.error(f"Entrada no numérica: '{prompt.strip()}'")
+                logger.error("Entrada no numérica: '%s'", prompt.strip())
 
     @staticmethod
     def get_date_input(prompt, error_msg="Formato de fecha incorrecto. Use dd-mm-aaaa. Ejemplo: 05-06-2025."):
@@ -34,7 +36,20 @@ class UIUtils:
                 return datetime.strptime(date_str, "%d-%m-%Y").date()
             except ValueError:
                 print(error_msg)
-                logging.error(f"Formato de fecha inválido: '{date_str}'")
+                logger.error("Formato de fecha inválido: '%s'", date_str)
+
+    @staticmethod
+    def get_optional_date_input(prompt, error_msg="Formato de fecha incorrecto. Use dd-mm-aaaa. Ejemplo: 05-06-2025."):
+        """Como get_date_input, pero devuelve None si el usuario deja la respuesta en blanco."""
+        while True:
+            date_str = input(prompt).strip()
+            if not date_str:
+                return None
+            try:
+                return datetime.strptime(date_str, "%d-%m-%Y").date()
+            except ValueError:
+                print(error_msg)
+                logger.error("Formato de fecha inválido: '%s'", date_str)
 
     @staticmethod
     def confirm_action(prompt):